@@ -0,0 +1,43 @@
+"""Add email_outbox table
+
+Revision ID: 012_email_outbox
+Revises: 011_refresh_tokens
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "012_email_outbox"
+down_revision: Union[str, None] = "011_refresh_tokens"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("to_email", sa.String(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("html", sa.Text(), nullable=True),
+        sa.Column("text", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(), server_default="pending", nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_email_outbox_id"), "email_outbox", ["id"], unique=False)
+    op.create_index("ix_email_outbox_status_next_attempt", "email_outbox", ["status", "next_attempt_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_outbox_status_next_attempt", table_name="email_outbox")
+    op.drop_index(op.f("ix_email_outbox_id"), table_name="email_outbox")
+    op.drop_table("email_outbox")
@@ -0,0 +1,82 @@
+"""Composite, unique and partial indexes for the per-user hot paths
+
+Revision ID: 013_hot_path_indexes
+Revises: 012_email_outbox
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "013_hot_path_indexes"
+down_revision: Union[str, None] = "012_email_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNDELIVERED = sa.text("status IN ('pending', 'sending')")
+
+
+def upgrade() -> None:
+    # The API only ever allowed one weight per user per day; drop any duplicates that slipped in
+    # through concurrent requests (keep the newest) before enforcing it.
+    op.execute(
+        "DELETE FROM weights WHERE id NOT IN (SELECT max(id) FROM weights GROUP BY user_id, date)"
+    )
+    op.create_index("uq_weights_user_date", "weights", ["user_id", "date"], unique=True)
+    op.drop_index(op.f("ix_weights_user_id"), table_name="weights")
+
+    op.create_index("ix_metric_entries_user_date", "metric_entries", ["user_id", "date"], unique=False)
+    op.drop_index(op.f("ix_metric_entries_user_id"), table_name="metric_entries")
+
+    # Goal and plan lists go newest first by id, which also makes them keyset-pageable
+    op.create_index("ix_goals_user_by_id", "goals", ["user_id", "id"], unique=False)
+    op.drop_index(op.f("ix_goals_user_id"), table_name="goals")
+
+    op.create_index("ix_workout_plans_user_by_id", "workout_plans", ["user_id", "id"], unique=False)
+    op.drop_index(op.f("ix_workout_plans_user_id"), table_name="workout_plans")
+
+    op.create_index("ix_exercises_owner_name", "exercises", ["owner_id", "name"], unique=False)
+    op.drop_index(op.f("ix_exercises_owner_id"), table_name="exercises")
+
+    op.create_index(
+        "ix_workout_plan_exercises_day_order", "workout_plan_exercises", ["plan_day_id", "order"], unique=False
+    )
+    op.drop_index(op.f("ix_workout_plan_exercises_plan_day_id"), table_name="workout_plan_exercises")
+    op.create_index(
+        op.f("ix_workout_plan_exercises_exercise_id"), "workout_plan_exercises", ["exercise_id"], unique=False
+    )
+
+    op.create_index(
+        "ix_email_outbox_due", "email_outbox", ["next_attempt_at"], unique=False,
+        sqlite_where=UNDELIVERED, postgresql_where=UNDELIVERED,
+    )
+    op.drop_index("ix_email_outbox_status_next_attempt", table_name="email_outbox")
+
+
+def downgrade() -> None:
+    op.create_index("ix_email_outbox_status_next_attempt", "email_outbox", ["status", "next_attempt_at"], unique=False)
+    op.drop_index("ix_email_outbox_due", table_name="email_outbox")
+
+    op.drop_index(op.f("ix_workout_plan_exercises_exercise_id"), table_name="workout_plan_exercises")
+    op.create_index(
+        op.f("ix_workout_plan_exercises_plan_day_id"), "workout_plan_exercises", ["plan_day_id"], unique=False
+    )
+    op.drop_index("ix_workout_plan_exercises_day_order", table_name="workout_plan_exercises")
+
+    op.create_index(op.f("ix_exercises_owner_id"), "exercises", ["owner_id"], unique=False)
+    op.drop_index("ix_exercises_owner_name", table_name="exercises")
+
+    op.create_index(op.f("ix_workout_plans_user_id"), "workout_plans", ["user_id"], unique=False)
+    op.drop_index("ix_workout_plans_user_by_id", table_name="workout_plans")
+
+    op.create_index(op.f("ix_goals_user_id"), "goals", ["user_id"], unique=False)
+    op.drop_index("ix_goals_user_by_id", table_name="goals")
+
+    op.create_index(op.f("ix_metric_entries_user_id"), "metric_entries", ["user_id"], unique=False)
+    op.drop_index("ix_metric_entries_user_date", table_name="metric_entries")
+
+    op.create_index(op.f("ix_weights_user_id"), "weights", ["user_id"], unique=False)
+    op.drop_index("uq_weights_user_date", table_name="weights")
@@ -0,0 +1,81 @@
+"""Store weight only in metric_entries and drop the weights table
+
+Every weights row becomes a metric_entries row with metric_type "weight" and value {"kg": ...}.
+Where a user has both on the same day, the more recently created value wins. /weights and the MCP
+weight tools read and write the metric rows from now on; a weight id is the metric entry id.
+
+Revision ID: 014_merge_weights
+Revises: 013_hot_path_indexes
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "014_merge_weights"
+down_revision: Union[str, None] = "013_hot_path_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SAME_DAY = "w.user_id = m.user_id AND w.date = m.date"
+
+
+def _kg_json(column: str) -> str:
+    fn = "json_build_object" if op.get_bind().dialect.name == "postgresql" else "json_object"
+    return f"{fn}('kg', {column})"
+
+
+def _kg_value(column: str) -> str:
+    if op.get_bind().dialect.name == "postgresql":
+        return f"CAST({column} ->> 'kg' AS DOUBLE PRECISION)"
+    return f"json_extract({column}, '$.kg')"
+
+
+def upgrade() -> None:
+    # Overlapping days: keep whichever entry was written last
+    op.execute(f"""
+        UPDATE metric_entries AS m
+        SET value = (SELECT {_kg_json('w.weight')} FROM weights w WHERE {SAME_DAY})
+        WHERE m.metric_type = 'weight'
+          AND EXISTS (SELECT 1 FROM weights w WHERE {SAME_DAY} AND w.created_at > m.created_at)
+    """)
+    op.execute(f"""
+        INSERT INTO metric_entries (user_id, metric_type, date, value, created_at)
+        SELECT w.user_id, 'weight', w.date, {_kg_json('w.weight')}, w.created_at
+        FROM weights w
+        WHERE NOT EXISTS (
+            SELECT 1 FROM metric_entries m WHERE m.metric_type = 'weight' AND {SAME_DAY}
+        )
+    """)
+
+    op.drop_index(op.f("ix_weights_date"), table_name="weights")
+    op.drop_index(op.f("ix_weights_id"), table_name="weights")
+    op.drop_index("uq_weights_user_date", table_name="weights")
+    op.drop_table("weights")
+
+
+def downgrade() -> None:
+    op.create_table(
+        "weights",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Float(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_weights_id"), "weights", ["id"], unique=False)
+    op.create_index(op.f("ix_weights_date"), "weights", ["date"], unique=False)
+    op.create_index("uq_weights_user_date", "weights", ["user_id", "date"], unique=True)
+
+    # Weight metric rows stay in metric_entries; they were readable through /metrics before too
+    op.execute(f"""
+        INSERT INTO weights (user_id, weight, date, created_at)
+        SELECT user_id, {_kg_value('value')}, date, created_at
+        FROM metric_entries
+        WHERE metric_type = 'weight'
+    """)
@@ -0,0 +1,65 @@
+"""Typed body_measurements table backfilled from metric_entries JSON
+
+Each body_measurements metric entry gets a row with one nullable float column per site. The metric
+entry keeps its id, source and created_at, and its JSON value becomes {}.
+
+Revision ID: 015_body_measurements
+Revises: 014_merge_weights
+Create Date: 2026-10-16
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "015_body_measurements"
+down_revision: Union[str, None] = "014_merge_weights"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.models.BODY_MEASUREMENT_SITES as of this revision
+SITES = (
+    "neck_cm", "shoulder_cm", "chest_cm", "arm_left_cm", "arm_right_cm", "forearm_left_cm", "forearm_right_cm",
+    "waist_cm", "abdomen_cm", "hips_cm", "thigh_left_cm", "thigh_right_cm", "calf_left_cm", "calf_right_cm",
+)
+
+
+def _site_value(site: str) -> str:
+    if op.get_bind().dialect.name == "postgresql":
+        return f"CAST(value ->> '{site}' AS DOUBLE PRECISION)"
+    return f"json_extract(value, '$.{site}')"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "body_measurements",
+        sa.Column("metric_entry_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        *[sa.Column(site, sa.Float(), nullable=True) for site in SITES],
+        sa.ForeignKeyConstraint(["metric_entry_id"], ["metric_entries.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("metric_entry_id"),
+        sa.UniqueConstraint("user_id", "date", name="uq_body_measurements_user_date"),
+    )
+
+    op.execute(f"""
+        INSERT INTO body_measurements (metric_entry_id, user_id, date, {", ".join(SITES)})
+        SELECT id, user_id, date, {", ".join(_site_value(site) for site in SITES)}
+        FROM metric_entries
+        WHERE metric_type = 'body_measurements'
+    """)
+    op.execute("UPDATE metric_entries SET value = '{}' WHERE metric_type = 'body_measurements'")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(f"SELECT metric_entry_id, {', '.join(SITES)} FROM body_measurements")).all()
+    update = sa.text("UPDATE metric_entries SET value = :value WHERE id = :id")
+    for row in rows:
+        value = {site: v for site, v in zip(SITES, row[1:]) if v is not None}
+        bind.execute(update, {"id": row[0], "value": json.dumps(value)})
+    op.drop_table("body_measurements")
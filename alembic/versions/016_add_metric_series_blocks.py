@@ -0,0 +1,38 @@
+"""Add metric_series_blocks for packed per-user yearly series
+
+The table stays empty until `series_blocks_enabled` is set; then run
+`python -m app.cli rebuild-series` once to build blocks for existing entries.
+
+Revision ID: 016_series_blocks
+Revises: 015_body_measurements
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "016_series_blocks"
+down_revision: Union[str, None] = "015_body_measurements"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "metric_series_blocks",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("metric_type", sa.String(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("days", sa.LargeBinary(), nullable=False),
+        sa.Column("values", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "metric_type", "year"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("metric_series_blocks")
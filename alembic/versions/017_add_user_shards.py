@@ -0,0 +1,34 @@
+"""Add user_shards directory for optional user sharding
+
+Only used with SHARD_STRATEGY=directory, in the shared database (DATABASE_URL).
+
+Revision ID: 017_user_shards
+Revises: 016_series_blocks
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "017_user_shards"
+down_revision: Union[str, None] = "016_series_blocks"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_shards",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_shards")
@@ -0,0 +1,35 @@
+"""Normalize metric_entries.source in batches
+
+The REST API only accepts "device" or "calculated", but the MCP tools stored `source` as given, so
+older rows can hold variants such as "Device" or " calculated ". Values are trimmed and lowercased,
+and blank values become NULL. Runs through app.backfill in committed key-range batches, so it can
+be interrupted and rerun on a large metric_entries table.
+
+Revision ID: 018_normalize_source
+Revises: 017_user_shards
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from app.backfill import batched_update
+
+
+revision: str = "018_normalize_source"
+down_revision: Union[str, None] = "017_user_shards"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    batched_update(
+        f"{revision}:metric_entries",
+        "metric_entries",
+        "source = CASE WHEN trim(source) = '' THEN NULL ELSE lower(trim(source)) END",
+        "source IS NOT NULL AND (source <> lower(trim(source)) OR trim(source) = '')",
+    )
+
+
+def downgrade() -> None:
+    # The original spellings are not kept; normalized values are valid before this revision too
+    pass
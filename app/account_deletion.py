@@ -0,0 +1,195 @@
+"""Set-based account deletion (admin endpoint and `python -m app.cli delete-user`).
+
+Deleting a User through the ORM cascade loads every plan, day, metric entry and goal into memory and
+then issues one DELETE per row. `delete_account` instead empties each child table for the user with
+`DELETE ... WHERE id IN (SELECT id ... LIMIT n)` in foreign-key order, committing after every chunk,
+so memory stays flat and no lock is held for long however much history the account has.
+
+Refresh tokens go first, so no new access tokens are issued. Anything the user writes while the
+chunks run is swept again in the transaction that removes their users row. With sharding on, every
+shard is swept (a directory entry may have moved), and the shard's stub users row goes with it.
+
+The endpoint runs the deletion as a background job. `account_deletions` keeps recent jobs and their
+per-table counts in memory, per process, for `GET /admin/deletions/{job_id}`.
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.dependencies import invalidate_user
+from app.models import (
+    BodyMeasurement,
+    Exercise,
+    Goal,
+    MetricEntry,
+    MetricSeriesBlock,
+    RefreshToken,
+    User,
+    UserShard,
+    WorkoutPlan,
+    WorkoutPlanDay,
+    WorkoutPlanExercise,
+)
+from app.sharding import shard_router
+
+logger = logging.getLogger(__name__)
+
+
+def _data_steps(user_id: int) -> list:
+    """(primary key, condition) per per-user table, children before parents."""
+    plans = select(WorkoutPlan.id).where(WorkoutPlan.user_id == user_id)
+    days = select(WorkoutPlanDay.id).where(WorkoutPlanDay.plan_id.in_(plans))
+    own_exercises = select(Exercise.id).where(Exercise.owner_id == user_id)
+    return [
+        (WorkoutPlanExercise.id, or_(
+            WorkoutPlanExercise.plan_day_id.in_(days), WorkoutPlanExercise.exercise_id.in_(own_exercises)
+        )),
+        (WorkoutPlanDay.id, WorkoutPlanDay.plan_id.in_(plans)),
+        (WorkoutPlan.id, WorkoutPlan.user_id == user_id),
+        (Exercise.id, Exercise.owner_id == user_id),
+        (BodyMeasurement.metric_entry_id, BodyMeasurement.user_id == user_id),
+        (MetricSeriesBlock.year, MetricSeriesBlock.user_id == user_id),
+        (MetricEntry.id, MetricEntry.user_id == user_id),
+        (Goal.id, Goal.user_id == user_id),
+    ]
+
+
+def _delete_chunks(db: Session, pk, condition, batch_size: int, deleted: dict) -> None:
+    """Delete matching rows `batch_size` at a time, committing each chunk."""
+    entity, table = pk.class_, pk.class_.__tablename__
+    # Series blocks are at most one row per metric and year, and have no single-column key to chunk on
+    chunked = entity is not MetricSeriesBlock
+    deleted.setdefault(table, 0)
+    while True:
+        where = pk.in_(select(pk).where(condition).limit(batch_size)) if chunked else condition
+        count = db.execute(delete(entity).where(where), execution_options={"synchronize_session": False}).rowcount
+        db.commit()
+        deleted[table] += count
+        if not chunked or count < batch_size:
+            return
+
+
+def _sweep(db: Session, steps: list, deleted: dict) -> None:
+    """Delete whatever is left in one statement per table, without committing."""
+    for pk, condition in steps:
+        table = pk.class_.__tablename__
+        result = db.execute(delete(pk.class_).where(condition), execution_options={"synchronize_session": False})
+        deleted[table] = deleted.get(table, 0) + result.rowcount
+
+
+def delete_account(user_id: int, batch_size: Optional[int] = None, deleted: Optional[dict] = None) -> dict:
+    """Delete a user and all their data. Returns rows deleted per table.
+
+    Pass a dict as `deleted` to watch the counts grow while this runs.
+    """
+    batch_size = batch_size or settings.account_deletion_batch_size
+    deleted = {} if deleted is None else deleted
+    steps = _data_steps(user_id)
+    shared = SessionLocal()
+    try:
+        _delete_chunks(shared, RefreshToken.id, RefreshToken.user_id == user_id, batch_size, deleted)
+        invalidate_user(user_id)
+
+        for db in shard_router.all_sessions() if shard_router is not None else [shared]:
+            try:
+                for pk, condition in steps:
+                    _delete_chunks(db, pk, condition, batch_size, deleted)
+                if db is not shared:
+                    _sweep(db, steps, deleted)
+                    db.execute(delete(User).where(User.id == user_id), execution_options={"synchronize_session": False})
+                    db.commit()
+            finally:
+                if db is not shared:
+                    db.close()
+
+        # Late writes, the directory entry and the users row go in one transaction
+        if shard_router is None:
+            _sweep(shared, steps, deleted)
+        _sweep(shared, [
+            (RefreshToken.id, RefreshToken.user_id == user_id),
+            (UserShard.user_id, UserShard.user_id == user_id),
+        ], deleted)
+        result = shared.execute(delete(User).where(User.id == user_id), execution_options={"synchronize_session": False})
+        deleted["users"] = result.rowcount
+        shared.commit()
+    finally:
+        shared.close()
+    invalidate_user(user_id)
+    if shard_router is not None:
+        shard_router.forget(user_id)
+    return deleted
+
+
+@dataclass
+class DeletionJob:
+    user_id: int
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "pending"  # pending | running | done | failed
+    deleted: dict = field(default_factory=dict)
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "deleted": dict(self.deleted),
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class AccountDeletions:
+    """Recent deletion jobs in this process, oldest dropped first beyond `max_jobs`."""
+
+    def __init__(self, max_jobs: int = 200):
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: int) -> tuple:
+        """(job, created). A user with a pending or running job gets that job back."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.user_id == user_id and job.status in ("pending", "running"):
+                    return job, False
+            job = DeletionJob(user_id=user_id)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            return job, True
+
+    def get(self, job_id: str) -> Optional[DeletionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def run(self, job: DeletionJob, batch_size: Optional[int] = None) -> None:
+        job.status, job.started_at = "running", datetime.utcnow()
+        try:
+            delete_account(job.user_id, batch_size, job.deleted)
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Deleting user %s failed", job.user_id)
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {s: statuses.count(s) for s in ("pending", "running", "done", "failed")}
+
+
+account_deletions = AccountDeletions()
@@ -1,16 +1,33 @@
+import hashlib
+import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.cache import TTLCache
+from app.config import settings
+
 import os
 
 # Configuration - use environment variable for production
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
+
+# Cost factor is tuned per deployment (see `python -m app.cli calibrate-bcrypt`).
+# min/max are pinned to the same value so hashes with any other cost are flagged for rehash on login.
+BCRYPT_ROUNDS = settings.bcrypt_rounds
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,6 +35,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify a password and, if its stored cost differs from BCRYPT_ROUNDS, return a fresh hash.
+
+    Returns (valid, new_hash); new_hash is None when the stored hash is already current.
+    """
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, get_password_hash(plain_password)
+    return True, None
+
+
 def get_password_hash(password: str) -> str:
     """Hash a password. Bcrypt has a 72-byte limit, so we truncate if necessary."""
     # Always ensure password is within 72 bytes before passing to passlib
@@ -70,15 +99,32 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[dict]:
-    """Verify and decode a JWT token"""
+# Verified claims keyed by a SHA-256 digest of the token. Each entry expires at the token's own
+# `exp`, so a cached token can never outlive its validity; invalid tokens are never cached.
+jwt_cache = TTLCache(maxsize=settings.jwt_cache_max_size, ttl=settings.jwt_cache_max_ttl_seconds)
+
+
+def _decode_token(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
 
 
+def verify_token(token: str) -> Optional[dict]:
+    """Verify and decode a JWT token"""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = jwt_cache.get(key)
+    if payload is None:
+        payload = _decode_token(token)
+        if payload is None:
+            return None
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            jwt_cache.set(key, payload, ttl=exp - time.time())
+    return dict(payload)
+
+
 def get_current_user_id(token: str) -> Optional[int]:
     """Extract user_id from JWT token"""
     payload = verify_token(token)
@@ -104,3 +150,13 @@ def verify_password_reset_token(token: str) -> Optional[int]:
     if payload.get("type") != "password_reset":
         return None
     return payload.get("user_id")
+
+
+def generate_refresh_token() -> str:
+    """Create an opaque, high-entropy refresh token. Only its hash is persisted."""
+    return secrets.token_urlsafe(48)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Digest used to store and look up refresh tokens (they are random, so no salt or bcrypt needed)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
@@ -0,0 +1,111 @@
+"""Batched data backfills for Alembic migrations.
+
+One UPDATE over metric_entries locks every row it touches until it commits, and on a large table
+runs past Neon's statement timeout. `batched_update` walks the table in primary-key order instead:
+
+- each batch covers `batch_size` consecutive keys and commits on its own, with a pause between
+  batches (`BACKFILL_BATCH_SIZE`, `BACKFILL_SLEEP_SECONDS`)
+- the last finished key is saved in `backfill_progress`, so rerunning a migration that died halfway
+  resumes after that key; the row is deleted once the backfill completes
+- progress and rows/s are logged to the `alembic.backfill` logger
+
+A batch and its checkpoint are separate commits, so a crash between them reruns that batch: the
+SET/WHERE pair must be idempotent (e.g. `SET x = ... WHERE x IS NULL`). Batches run in Alembic's
+autocommit block, which commits everything the migration run did before the backfill. Put the
+backfill in its own revision, after any schema change it needs. In offline mode (`--sql`) the whole
+UPDATE is emitted as one statement.
+"""
+import logging
+import time
+from typing import Optional
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.config import settings
+
+logger = logging.getLogger("alembic.backfill")
+
+# Kept off Base.metadata: migration bookkeeping, created on first use
+progress = sa.Table(
+    "backfill_progress",
+    sa.MetaData(),
+    sa.Column("name", sa.String(), primary_key=True),
+    sa.Column("last_key", sa.BigInteger(), nullable=True),
+    sa.Column("rows_updated", sa.BigInteger(), nullable=False, default=0),
+    sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now()),
+)
+
+# Seconds between progress log lines
+LOG_INTERVAL_SECONDS = 5.0
+
+
+def batched_update(
+    name: str,
+    table: str,
+    set_clause: str,
+    where: Optional[str] = None,
+    *,
+    key: str = "id",
+    batch_size: Optional[int] = None,
+    sleep_seconds: Optional[float] = None,
+    params: Optional[dict] = None,
+) -> int:
+    """Run `UPDATE table SET set_clause WHERE where` in committed key-range batches. Returns rows updated.
+
+    `name` identifies the checkpoint and should be unique per backfill, e.g. "<revision>:<table>".
+    `key` must be an integer primary key. `params` are bound into set_clause and where.
+    """
+    batch_size = batch_size or settings.backfill_batch_size
+    sleep_seconds = settings.backfill_sleep_seconds if sleep_seconds is None else sleep_seconds
+    params = params or {}
+    condition = f" AND ({where})" if where else ""
+
+    context = op.get_context()
+    if context.as_sql:
+        op.execute(f"UPDATE {table} SET {set_clause} WHERE 1 = 1{condition}")
+        return 0
+
+    with context.autocommit_block():
+        conn = op.get_bind()
+        progress.create(conn, checkfirst=True)
+        saved = conn.execute(sa.select(progress).where(progress.c.name == name)).first()
+        if saved is None:
+            last_key, updated = None, 0
+            conn.execute(progress.insert().values(name=name, last_key=None, rows_updated=0))
+        else:
+            last_key, updated = saved.last_key, saved.rows_updated
+            logger.info("%s: resuming after %s=%s (%d rows updated so far)", name, key, last_key, updated)
+
+        max_key = conn.execute(sa.text(f"SELECT max({key}) FROM {table}")).scalar()
+        started = last_logged = time.perf_counter()
+        run_updated = 0
+        while max_key is not None and (last_key is None or last_key < max_key):
+            after = f"{key} > :last_key" if last_key is not None else "1 = 1"
+            upper = conn.execute(sa.text(
+                f"SELECT max({key}) FROM (SELECT {key} FROM {table} WHERE {after} ORDER BY {key} LIMIT :n) AS batch"
+            ), {"last_key": last_key, "n": batch_size}).scalar()
+            if upper is None:
+                break
+            result = conn.execute(sa.text(
+                f"UPDATE {table} SET {set_clause} WHERE {after} AND {key} <= :upper_key{condition}"
+            ), {**params, "last_key": last_key, "upper_key": upper})
+            last_key = upper
+            run_updated += max(result.rowcount, 0)
+            conn.execute(progress.update().where(progress.c.name == name).values(
+                last_key=last_key, rows_updated=updated + run_updated
+            ))
+
+            now = time.perf_counter()
+            if now - last_logged >= LOG_INTERVAL_SECONDS:
+                logger.info("%s: %s=%s of %s, %d rows updated, %.0f rows/s",
+                            name, key, last_key, max_key, updated + run_updated, run_updated / (now - started))
+                last_logged = now
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+        conn.execute(progress.delete().where(progress.c.name == name))
+        elapsed = time.perf_counter() - started
+        logger.info("%s: done, %d rows updated in %.1fs (%.0f rows/s)",
+                    name, updated + run_updated, elapsed, run_updated / elapsed if elapsed else 0)
+    return updated + run_updated
@@ -0,0 +1,161 @@
+"""Operational commands for Fit Tracker API.
+
+Usage:
+  python -m app.cli init-db
+  python -m app.cli calibrate-bcrypt [--target-ms 250]
+  python -m app.cli provision-users users.csv|users.json [--batch-size 500] [--workers N]
+  python -m app.cli rebuild-series [--user-id N]
+  python -m app.cli delete-user USER_ID [--batch-size N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from passlib.hash import bcrypt as bcrypt_handler
+
+BCRYPT_MIN_ROUNDS = 4
+BCRYPT_MAX_ROUNDS = 31
+
+
+def _time_bcrypt(rounds: int, samples: int) -> float:
+    """Median wall time in ms of one bcrypt hash at the given cost."""
+    hasher = bcrypt_handler.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def init_db_cmd(args: argparse.Namespace) -> int:
+    from app.db_init import init_db
+
+    ms = init_db()
+    print(f"Schema checked and global exercises seeded in {ms:.0f} ms")
+    return 0
+
+
+def calibrate_bcrypt(args: argparse.Namespace) -> int:
+    from app.config import settings
+
+    print(f"Benchmarking bcrypt on this host (cpu_count={os.cpu_count()}, target {args.target_ms:.0f} ms/hash)")
+    print(f"{'rounds':>6}  {'median ms':>10}")
+    recommended = None
+    for rounds in range(max(args.min_rounds, BCRYPT_MIN_ROUNDS), min(args.max_rounds, BCRYPT_MAX_ROUNDS) + 1):
+        ms = _time_bcrypt(rounds, args.samples)
+        marker = ""
+        if ms <= args.target_ms:
+            recommended = rounds
+            marker = "  <= target"
+        print(f"{rounds:>6}  {ms:>10.1f}{marker}")
+        # Each extra round doubles the cost; stop once we are well past the budget
+        if ms > args.target_ms * 2:
+            break
+
+    if recommended is None:
+        print("No cost factor meets the target on this host; use the minimum tested value.")
+        return 1
+    print(f"\nCurrent setting: BCRYPT_ROUNDS={settings.bcrypt_rounds}")
+    print(f"Recommended:     BCRYPT_ROUNDS={recommended}")
+    if recommended != settings.bcrypt_rounds:
+        print("Existing hashes are upgraded transparently on each user's next login.")
+    return 0
+
+
+def provision_users_cmd(args: argparse.Namespace) -> int:
+    from app.database import SessionLocal
+    from app.provisioning import parse_csv, provision_users
+
+    with open(args.path, encoding="utf-8-sig") as f:
+        content = f.read()
+    if args.path.endswith(".csv"):
+        rows = parse_csv(content)
+    else:
+        payload = json.loads(content)
+        rows = payload.get("users") if isinstance(payload, dict) else payload
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        report = provision_users(db, rows, batch_size=args.batch_size, hash_workers=args.workers)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+
+    for r in report["results"]:
+        if r["status"] == "error":
+            print(f"row {r['row']} ({r['username']}): {r['error']}")
+    print(f"{report['created']} created, {report['failed']} failed of {report['total']} in {elapsed:.1f}s")
+    return 0 if report["failed"] == 0 else 1
+
+
+def rebuild_series_cmd(args: argparse.Namespace) -> int:
+    from app.database import SessionLocal
+    from app.series_blocks import rebuild_series_blocks
+    from app.sharding import shard_router
+
+    start = time.perf_counter()
+    written = 0
+    # Series data lives on the shards when sharding is on; each one rebuilds its own users
+    for db in shard_router.all_sessions() if shard_router is not None else [SessionLocal()]:
+        try:
+            written += rebuild_series_blocks(db, user_id=args.user_id)
+        finally:
+            db.close()
+    print(f"{written} series blocks written in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def delete_user_cmd(args: argparse.Namespace) -> int:
+    from app.account_deletion import delete_account
+
+    start = time.perf_counter()
+    deleted = delete_account(args.user_id, batch_size=args.batch_size)
+    if not deleted.get("users"):
+        print(f"No user with id {args.user_id}")
+        return 1
+    for table, count in deleted.items():
+        print(f"{table:<24}{count:>10}")
+    print(f"User {args.user_id} deleted in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Fit Tracker API operational commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("init-db", help="Create missing tables and seed global exercises")
+    p.set_defaults(func=init_db_cmd)
+
+    p = sub.add_parser("calibrate-bcrypt", help="Recommend a bcrypt cost that meets a per-hash latency target")
+    p.add_argument("--target-ms", type=float, default=250.0, help="Target time per hash in ms (default: 250)")
+    p.add_argument("--min-rounds", type=int, default=8)
+    p.add_argument("--max-rounds", type=int, default=16)
+    p.add_argument("--samples", type=int, default=3, help="Hashes timed per cost factor (median is used)")
+    p.set_defaults(func=calibrate_bcrypt)
+
+    p = sub.add_parser("provision-users", help="Create users in bulk from a CSV or JSON file")
+    p.add_argument("path", help="CSV with header username,email,password, or a JSON list of objects")
+    p.add_argument("--batch-size", type=int, default=None, help="Rows per insert transaction")
+    p.add_argument("--workers", type=int, default=None, help="Hashing processes (default: one per CPU)")
+    p.set_defaults(func=provision_users_cmd)
+
+    p = sub.add_parser("rebuild-series", help="Rebuild packed weight/muscle_index blocks from metric entries")
+    p.add_argument("--user-id", type=int, default=None, help="Only this user (default: everyone)")
+    p.set_defaults(func=rebuild_series_cmd)
+
+    p = sub.add_parser("delete-user", help="Delete a user and all their data with set-based batched deletes")
+    p.add_argument("user_id", type=int)
+    p.add_argument("--batch-size", type=int, default=None, help="Rows per committed delete (default: 5000)")
+    p.set_defaults(func=delete_user_cmd)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,15 +8,130 @@ class Settings(BaseSettings):
         "DATABASE_URL",
         "sqlite:///./fit_tracker.db"
     )
+    # Run create_all + exercise seeding in the app lifespan. Turn off when the deploy runs
+    # `python -m app.cli init-db` (or Alembic) so workers start without schema round trips.
+    db_init_on_startup: bool = True
+    # Optional read replica for GET handlers and read-only MCP tools (see app/read_routing.py)
+    database_read_url: str = os.getenv("DATABASE_READ_URL", "")
+    # After a user commits a write, their reads stay on the primary for this long
+    read_after_write_pin_seconds: float = 5.0
+    read_pin_max_size: int = 10000
+
+    # Connection pool, applied to the sync and async engines separately (see app/database.py).
+    # Size for your worker count: each process can hold up to pool_size + max_overflow per engine.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 300
+    db_pool_pre_ping: bool = True
+    # LIFO reuse keeps a small hot set of connections and lets the rest go idle (and be closed by Neon)
+    db_pool_use_lifo: bool = False
+    # GET /health/ready returns 503 once checked-out connections reach this fraction of capacity
+    db_ready_max_pool_saturation: float = 1.0
+
+    # Neon cold-start mitigation (see app/db_resilience.py). Connections opened per engine at startup;
+    # the keepalive is off by default because it also stops Neon from scaling the compute to zero.
+    db_pool_warmup_connections: int = 2
+    db_keepalive_interval_seconds: float = 0.0
+    db_keepalive_min_connections: int = 1
+    db_connect_retry_attempts: int = 3
+    db_connect_retry_backoff_seconds: float = 0.25
+    db_read_retry_attempts: int = 2
+    db_read_retry_backoff_seconds: float = 0.1
+
+    # SQLite profile (see app/sqlite_tuning.py), applied to file databases only.
+    # WAL + synchronous=NORMAL is durable across app crashes; a power loss may drop the last commits.
+    sqlite_tuning_enabled: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size_bytes: int = 268435456
+    sqlite_cache_size_kib: int = 65536
+    # PRAGMA optimize + WAL checkpoint interval; 0 disables
+    sqlite_maintenance_interval_seconds: float = 3600.0
+
+    # Per-request SQL counting/timing, reported in a Server-Timing header (see app/sql_instrumentation.py).
+    # A request running one statement shape more than the threshold is logged as a likely N+1
+    # (the `strict_queries` test fixture fails on that warning).
+    sql_instrumentation_enabled: bool = True
+    sql_repeat_warning_threshold: int = 10
+
+    # Optional user sharding (see app/sharding.py). Comma-separated URLs for per-user data; DATABASE_URL
+    # remains the shared database for users, auth and the directory. Strategy: "hash" or "directory".
+    shard_database_urls: str = os.getenv("SHARD_DATABASE_URLS", "")
+    shard_strategy: str = "hash"
+
+    # Packed per-user yearly blocks for weight/muscle_index history reads (see app/series_blocks.py).
+    # After turning this on, run `python -m app.cli rebuild-series` once to build blocks for existing rows.
+    series_blocks_enabled: bool = False
+
+    # Keyset pagination for list routes and MCP list tools (see app/pagination.py). Off by default:
+    # requests without `limit` get every row, as before pagination existed. Turn on to page them too.
+    pagination_enabled: bool = False
+    page_default_limit: int = 100
+    page_max_limit: int = 500
+
+    # Batched data backfills in Alembic migrations (see app/backfill.py). Rows per committed batch,
+    # and a pause between batches so replicas and other writers keep up.
+    backfill_batch_size: int = 5000
+    backfill_sleep_seconds: float = 0.1
 
     # JWT
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 30
+
+    # Verified-JWT cache (see app/auth.py). Entries never outlive the token's exp claim.
+    jwt_cache_max_size: int = 10000
+    jwt_cache_max_ttl_seconds: float = 3600.0
+
+    # Authenticated-principal cache (see app/dependencies.py)
+    user_cache_max_size: int = 4096
+    user_cache_ttl_seconds: float = 60.0
+
+    # bcrypt cost factor (log2 rounds). Calibrate per host with `python -m app.cli calibrate-bcrypt`.
+    bcrypt_rounds: int = 12
+
+    # Throttling for login and forgot-password (see app/rate_limit.py). Values are hits per window.
+    rate_limit_enabled: bool = True
+    login_limit_per_username_per_minute: int = 10
+    login_limit_per_ip_per_minute: int = 30
+    forgot_password_limit_per_email_per_hour: int = 3
+    forgot_password_limit_per_ip_per_hour: int = 10
+
+    # Bulk user provisioning (see app/provisioning.py). 0 hash workers = one per CPU.
+    provision_batch_size: int = 500
+    provision_hash_workers: int = 0
+    provision_max_rows: int = 10000
+
+    # Admin account deletion (see app/account_deletion.py): rows per committed DELETE chunk
+    account_deletion_batch_size: int = 5000
+
+    # Bulk weight import (see app/weight_import.py)
+    weight_import_max_rows: int = 10000
+    # POST /metrics/batch (see app/metric_batch.py)
+    metric_batch_max_items: int = 1000
+
+    # Password hashing pool (see app/hashing.py). Requests beyond workers + queue_limit get a 503.
+    password_hash_workers: int = 2
+    password_hash_queue_limit: int = 16
+    password_hash_retry_after_seconds: int = 1
 
     # Resend email API
     resend_api_key: str = os.getenv("RESEND_API_KEY", "")
     email_from: str = os.getenv("EMAIL_FROM", "noreply@yourdomain.com")
+    # "resend" delivers through Resend; "fake" keeps messages in memory (tests, offline runs)
+    email_transport: str = os.getenv("EMAIL_TRANSPORT", "resend")
+
+    # Email outbox dispatcher (see app/email_outbox.py)
+    email_outbox_batch_size: int = 20
+    email_outbox_concurrency: int = 4
+    email_outbox_poll_seconds: float = 5.0
+    email_outbox_max_attempts: int = 5
+    email_outbox_backoff_seconds: float = 30.0
+    # Sent and failed rows are deleted this long after their last attempt
+    email_outbox_retention_hours: float = 168.0
 
     # Frontend URL (used in password reset links)
     frontend_url: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -1,31 +1,135 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
 
+from app.config import settings
+from app.db_resilience import PoolKeepalive, RetryingSession, install_connect_retry
+from app.pool_monitor import PoolMonitor, instrumented_pool
+from app.sql_instrumentation import instrument_engine
+from app.sqlite_tuning import SQLiteMaintenance, apply_sqlite_pragmas
+
+
+def normalize_url(url: str) -> str:
+    """Neon PostgreSQL URLs use postgresql:// but SQLAlchemy needs the psycopg driver specified.
+    Also handles legacy postgres:// URLs."""
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg://", 1)
+    if url.startswith("postgresql://") and "+" not in url:
+        # If it's postgresql:// without a driver, add psycopg driver
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL to its async driver: psycopg async mode for Postgres, aiosqlite for SQLite."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg:"):
+        return url.replace("postgresql+psycopg:", "postgresql+psycopg_async:", 1)
+    return url
+
+
 # Get database URL from environment variable (set to Neon PostgreSQL URL in production)
 # For SQLite (local dev), use the default
-database_url = os.getenv("DATABASE_URL", "sqlite:///./fit_tracker.db")
-
-# Neon PostgreSQL URLs use postgresql:// but SQLAlchemy needs the psycopg driver specified
-# Also handles legacy postgres:// URLs
-if database_url.startswith("postgres://"):
-    database_url = database_url.replace("postgres://", "postgresql+psycopg://", 1)
-elif database_url.startswith("postgresql://") and "+" not in database_url:
-    # If it's postgresql:// without a driver, add psycopg driver
-    database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
-
-# Configure engine based on database type
-if database_url.startswith("sqlite"):
-    engine = create_engine(
-        database_url, connect_args={"check_same_thread": False}
+database_url = normalize_url(os.getenv("DATABASE_URL", "sqlite:///./fit_tracker.db"))
+async_database_url = to_async_url(database_url)
+
+# Optional read replica for read-only handlers (see app/read_routing.py). Empty = reads use the primary.
+database_read_url = normalize_url(settings.database_read_url)
+
+sync_pool_monitor = PoolMonitor("sync")
+async_pool_monitor = PoolMonitor("async")
+
+
+def _pool_options(pool_class: type, monitor: PoolMonitor) -> dict:
+    """Sizing from Settings plus the instrumented pool class. Shared by the sync and async engines."""
+    return {
+        "poolclass": instrumented_pool(pool_class, monitor),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+    }
+
+
+def create_engines(url: str, sync_monitor: PoolMonitor, async_monitor: PoolMonitor) -> tuple:
+    """Build the (sync, async) engine pair for one database URL with pooling, telemetry and connect retry."""
+    async_url = to_async_url(url)
+    # Configure engine based on database type
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url in ("sqlite://", "sqlite:///"):
+            # In-memory databases rely on SQLAlchemy's single-connection pools; keep the defaults
+            sync_engine = create_engine(url, connect_args={"check_same_thread": False})
+            async_engine = create_async_engine(async_url)
+        else:
+            sync_engine = create_engine(
+                url, connect_args={"check_same_thread": False},
+                **_pool_options(QueuePool, sync_monitor),
+            )
+            async_engine = create_async_engine(async_url, **_pool_options(AsyncAdaptedQueuePool, async_monitor))
+            if settings.sqlite_tuning_enabled:
+                for e in (sync_engine, async_engine.sync_engine):
+                    apply_sqlite_pragmas(e)
+    else:
+        # PostgreSQL (Neon in production, deployed on Render)
+        # pool_pre_ping checks the connection before use — required for Neon which closes idle connections
+        sync_engine = create_engine(
+            url,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            **_pool_options(QueuePool, sync_monitor),
+        )
+        async_engine = create_async_engine(
+            async_url,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            **_pool_options(AsyncAdaptedQueuePool, async_monitor),
+        )
+
+    sync_monitor.attach(sync_engine)
+    async_monitor.attach(async_engine.sync_engine)
+    for e in (sync_engine, async_engine.sync_engine):
+        install_connect_retry(e, settings.db_connect_retry_attempts, settings.db_connect_retry_backoff_seconds)
+        if settings.sql_instrumentation_enabled:
+            instrument_engine(e)
+    return sync_engine, async_engine
+
+
+engine, async_engine = create_engines(database_url, sync_pool_monitor, async_pool_monitor)
+
+pool_keepalive = PoolKeepalive(
+    engine,
+    async_engine,
+    min_connections=settings.db_keepalive_min_connections,
+    interval=settings.db_keepalive_interval_seconds,
+)
+
+sqlite_maintenance = SQLiteMaintenance(engine, interval=settings.sqlite_maintenance_interval_seconds)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RetryingSession)
+
+# Async sessions back the `async def` routers. expire_on_commit=False because lazy attribute
+# reloads are not possible under asyncio; handlers call `await db.refresh(obj)` when they need
+# server-generated values.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False, sync_session_class=RetryingSession
+)
+
+if database_read_url:
+    read_sync_pool_monitor = PoolMonitor("sync_read")
+    read_async_pool_monitor = PoolMonitor("async_read")
+    read_engine, async_read_engine = create_engines(database_read_url, read_sync_pool_monitor, read_async_pool_monitor)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=RetryingSession)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, autoflush=False, expire_on_commit=False, sync_session_class=RetryingSession
     )
 else:
-    # PostgreSQL (Neon in production, deployed on Render)
-    # pool_pre_ping checks the connection before use — required for Neon which closes idle connections
-    engine = create_engine(database_url, pool_pre_ping=True, pool_recycle=300)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    read_sync_pool_monitor = read_async_pool_monitor = None
+    read_engine, async_read_engine = engine, async_engine
+    ReadSessionLocal, AsyncReadSessionLocal = SessionLocal, AsyncSessionLocal
 
 Base = declarative_base()
 
@@ -37,3 +141,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency to get an async database session (for `async def` handlers)"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,30 @@
+"""Schema creation and seed data.
+
+Runs from the FastAPI lifespan when `db_init_on_startup` is set (the default, convenient for local
+SQLite), or once per deploy with `python -m app.cli init-db` so app workers skip it.
+Production Postgres schemas are managed by Alembic; create_all only adds tables that are missing.
+"""
+import time
+
+from app.database import Base, SessionLocal, engine
+from app import models  # noqa: F401  (registers every table on Base.metadata)
+from app.seed_exercises import seed_global_exercises
+from app.sharding import shard_router
+
+
+def init_db() -> float:
+    """Create missing tables and seed global exercises, on every shard too. Returns elapsed milliseconds."""
+    start = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    sessions = [SessionLocal()]
+    if shard_router is not None:
+        # Each shard keeps its own copy of the global catalogue so plans join exercises locally
+        for shard_engine in shard_router.engines:
+            Base.metadata.create_all(bind=shard_engine)
+        sessions += shard_router.all_sessions()
+    for db in sessions:
+        try:
+            seed_global_exercises(db)
+        finally:
+            db.close()
+    return (time.perf_counter() - start) * 1000
@@ -0,0 +1,193 @@
+"""Cold-start mitigation for Neon, which scales to zero and closes idle connections.
+
+- `warm_up_pools` pre-opens pooled connections in the FastAPI lifespan so the first requests after a
+  deploy or restart do not pay connection setup.
+- `PoolKeepalive` (optional) periodically checks out and pings a minimum number of connections.
+- `install_connect_retry` retries failed connection attempts with bounded backoff while the
+  database wakes up.
+- `RetryingSession` re-runs a SELECT that failed on a dropped connection, as long as it is the
+  first work in the session, so a rollback cannot discard or expire anything the caller holds.
+"""
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack, ExitStack
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _backoff_sleep(seconds: float) -> None:
+    """Sleep without blocking the event loop when called from an AsyncSession's greenlet."""
+    if in_greenlet():
+        await_only(asyncio.sleep(seconds))
+    else:
+        time.sleep(seconds)
+
+
+def _warm_count(engine: Engine, connections: int) -> int:
+    # Connections beyond pool_size are overflow and would be closed again on checkin
+    pool = engine.pool
+    return min(connections, pool.size()) if isinstance(pool, QueuePool) else min(connections, 1)
+
+
+# --- Connect and read retries ---
+
+def install_connect_retry(engine: Engine, attempts: int, backoff_seconds: float) -> None:
+    """Retry the DBAPI connect call on OperationalError (e.g. while Neon resumes a suspended compute)."""
+    if attempts <= 0:
+        return
+
+    @event.listens_for(engine, "do_connect")
+    def _connect_with_retry(dialect, conn_rec, cargs, cparams):
+        for attempt in range(attempts + 1):
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except dialect.loaded_dbapi.OperationalError as e:
+                if attempt == attempts:
+                    raise
+                delay = backoff_seconds * (2 ** attempt)
+                logger.warning("Database connect failed (%s), retrying in %.2fs", e, delay)
+                _backoff_sleep(delay)
+
+
+class RetryingSession(Session):
+    """Session that retries idempotent reads once the pool has replaced a dropped connection."""
+
+    def _can_retry(self, statement) -> bool:
+        return (
+            getattr(statement, "is_select", False)
+            and not self.info.get("_wrote")
+            and not self.identity_map
+            and not (self.new or self.dirty or self.deleted)
+        )
+
+    def execute(self, statement, *args, **kwargs):
+        attempts = settings.db_read_retry_attempts
+        for attempt in range(attempts + 1):
+            try:
+                return super().execute(statement, *args, **kwargs)
+            except DBAPIError as e:
+                if attempt == attempts or not e.connection_invalidated or not self._can_retry(statement):
+                    raise
+                delay = settings.db_read_retry_backoff_seconds * (2 ** attempt)
+                logger.warning("Read failed on a dropped connection, retrying in %.2fs", delay)
+                self.rollback()
+                _backoff_sleep(delay)
+
+
+# session.info["_wrote"] marks a transaction that has sent ORM flushes or DML statements. It stops
+# read retries from rolling back writes and lets app/read_routing.py pin the writer to the primary.
+
+@event.listens_for(RetryingSession, "after_flush")
+def _mark_flushed(session, flush_context) -> None:
+    session.info["_wrote"] = True
+
+
+@event.listens_for(RetryingSession, "do_orm_execute")
+def _mark_dml(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["_wrote"] = True
+
+
+@event.listens_for(RetryingSession, "after_transaction_end")
+def _clear_wrote(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop("_wrote", None)
+
+
+# --- Warm-up and keepalive ---
+
+def _ping_sync(engine: Engine, connections: int) -> int:
+    with ExitStack() as stack:
+        conns = [stack.enter_context(engine.connect()) for _ in range(_warm_count(engine, connections))]
+        for conn in conns:
+            conn.execute(text("SELECT 1"))
+        return len(conns)
+
+
+async def _ping_async(engine: AsyncEngine, connections: int) -> int:
+    async with AsyncExitStack() as stack:
+        # Hold every connection at once so the pool opens distinct ones instead of reusing the first
+        conns = [await stack.enter_async_context(engine.connect()) for _ in range(_warm_count(engine.sync_engine, connections))]
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+        return len(conns)
+
+
+async def warm_up_pools(engine: Engine, async_engine: AsyncEngine, connections: int) -> dict:
+    """Open up to `connections` pooled connections on each engine. Failures are logged, not raised."""
+    result = {}
+    if connections <= 0:
+        return result
+    start = time.perf_counter()
+    for name, ping in (
+        ("async", lambda: _ping_async(async_engine, connections)),
+        ("sync", lambda: asyncio.to_thread(_ping_sync, engine, connections)),
+    ):
+        try:
+            result[name] = await ping()
+        except Exception as e:
+            logger.warning("Pool warm-up for %s engine failed: %s", name, e)
+            result[name] = 0
+    logger.info("Warmed %s pooled connections in %.0f ms", result, (time.perf_counter() - start) * 1000)
+    return result
+
+
+class PoolKeepalive:
+    """Background task that keeps `min_connections` per engine open and the database awake."""
+
+    def __init__(self, engine: Engine, async_engine: AsyncEngine, min_connections: int, interval: float):
+        self.engine = engine
+        self.async_engine = async_engine
+        self.min_connections = min_connections
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_ms: Optional[float] = None
+
+    async def run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            start = time.perf_counter()
+            try:
+                await _ping_async(self.async_engine, self.min_connections)
+                await asyncio.to_thread(_ping_sync, self.engine, self.min_connections)
+                self.runs += 1
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Pool keepalive failed: %s", e)
+            self.last_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0 and self.min_connections > 0:
+            self._task = asyncio.create_task(self.run_forever(), name="db-pool-keepalive")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "min_connections": self.min_connections,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_ms": self.last_ms,
+        }
@@ -0,0 +1,170 @@
+"""Shared FastAPI dependencies for authenticated routes.
+
+Routers depend on `get_current_user` / `get_admin_user` instead of decoding the JWT and loading
+the user row themselves. The authenticated principal is a lightweight snapshot of the user, kept in
+a size-bounded TTL cache keyed by user_id so most requests need no extra DB round trip.
+
+Read-only handlers depend on `get_read_db` / `get_async_read_db`, which hand out a replica session
+unless the user recently wrote (see app/read_routing.py). Handlers for per-user data (metrics,
+goals, plans) use the `get_user_*` variants, which go to the user's shard when sharding is on
+(app/sharding.py) and otherwise behave like the plain ones.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user_id
+from app.cache import TTLCache
+from app.config import settings
+from app.database import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+    get_async_db,
+    get_db,
+)
+from app.models import User
+from app.read_routing import request_user_id, use_replica
+from app.sharding import shard_router
+
+security = HTTPBearer()
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Authenticated principal. Load the full `User` row only where profile fields are needed."""
+    id: int
+    username: str
+    email: Optional[str]
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, username=user.username, email=user.email, is_admin=bool(user.is_admin))
+
+
+principal_cache = TTLCache(maxsize=settings.user_cache_max_size, ttl=settings.user_cache_ttl_seconds)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a cached principal so the next request reloads it from the database."""
+    principal_cache.invalidate(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User) -> None:
+    # Covers profile edits, admin flag changes and password resets, whichever code path flushes them
+    invalidate_user(target.id)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    """Get current authenticated user from JWT token"""
+    user_id = get_current_user_id(credentials.credentials)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Lets app/read_routing.py pin this user to the primary after a write, in this session or any other
+    db.info["user_id"] = user_id
+    request_user_id.set(user_id)
+
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    principal = CurrentUser.from_user(user)
+    principal_cache.set(user_id, principal)
+    return principal
+
+
+async def get_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """Get current user and verify they are an admin."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required."
+        )
+    return current_user
+
+
+def get_user_db(current_user: CurrentUser = Depends(get_current_user), shared_db: Session = Depends(get_db)):
+    """Sync session for the user's data: their shard when sharding is on, else the primary."""
+    if shard_router is None:
+        yield shared_db
+        return
+    db = shard_router.session(current_user.id, current_user.username, current_user.is_admin)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_user_db(
+    current_user: CurrentUser = Depends(get_current_user),
+    shared_db: AsyncSession = Depends(get_async_db),
+):
+    """Async session for the user's data: their shard when sharding is on, else the primary."""
+    if shard_router is None:
+        yield shared_db
+        return
+    async with await shard_router.async_session(current_user.id, current_user.username, current_user.is_admin) as db:
+        yield db
+
+
+def get_read_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Sync session for read-only handlers: the replica, or the primary while the user is pinned."""
+    db = (ReadSessionLocal if use_replica(current_user.id) else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Async session for read-only handlers: the replica, or the primary while the user is pinned."""
+    async with (AsyncReadSessionLocal if use_replica(current_user.id) else AsyncSessionLocal)() as db:
+        yield db
+
+
+def get_user_read_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Read-only sync session for the user's data: their shard when sharding is on (replicas are not
+    sharded), else the same replica routing as `get_read_db`."""
+    if shard_router is not None:
+        db = shard_router.session(current_user.id, current_user.username, current_user.is_admin)
+    else:
+        db = (ReadSessionLocal if use_replica(current_user.id) else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_user_read_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Read-only async session for the user's data: their shard when sharding is on (replicas are not
+    sharded), else the same replica routing as `get_async_read_db`."""
+    if shard_router is not None:
+        db = await shard_router.async_session(current_user.id, current_user.username, current_user.is_admin)
+    else:
+        db = (AsyncReadSessionLocal if use_replica(current_user.id) else AsyncSessionLocal)()
+    async with db:
+        yield db
@@ -1,13 +1,19 @@
-import resend
+"""Email messages and delivery transports.
+
+Handlers never send mail inline: they enqueue a message in the outbox (app/email_outbox.py) and the
+background dispatcher delivers it through the configured transport. Set EMAIL_TRANSPORT=fake to keep
+messages in memory instead of calling Resend (tests, benchmarks, offline development).
+"""
+import threading
+from abc import ABC, abstractmethod
+
 from app.config import settings
 
 
-def send_password_reset_email(to_email: str, reset_token: str) -> None:
-    """Send a password reset email via Resend."""
-    resend.api_key = settings.resend_api_key
+def build_password_reset_email(to_email: str, reset_token: str) -> dict:
+    """Build the password reset message (Resend payload shape)."""
     reset_link = f"{settings.frontend_url}/reset-password?token={reset_token}"
-
-    resend.Emails.send({
+    return {
         "from": settings.email_from,
         "to": to_email,
         "subject": "Reset your Fit Tracker password",
@@ -17,4 +23,42 @@ def send_password_reset_email(to_email: str, reset_token: str) -> None:
         <p>If you didn't request this, ignore this email.</p>
         """,
         "text": f"Reset your password (expires in 15 minutes):\n\n{reset_link}\n\nIf you didn't request this, ignore this email.",
-    })
+    }
+
+
+class EmailTransport(ABC):
+    """Delivers one message. Implementations are blocking and are called from a worker thread."""
+
+    @abstractmethod
+    def send(self, message: dict) -> None:
+        """Deliver `message` (Resend payload shape), raising on failure so it is retried."""
+
+
+class ResendTransport(EmailTransport):
+    def send(self, message: dict) -> None:
+        import resend
+
+        resend.api_key = settings.resend_api_key
+        resend.Emails.send(message)
+
+
+class FakeTransport(EmailTransport):
+    """Keeps delivered messages in memory. Set `fail_next` to simulate transient provider errors."""
+
+    def __init__(self):
+        self.sent: list = []
+        self.fail_next = 0
+        self._lock = threading.Lock()
+
+    def send(self, message: dict) -> None:
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                raise RuntimeError("FakeTransport: simulated delivery failure")
+            self.sent.append(message)
+
+
+def get_transport() -> EmailTransport:
+    if settings.email_transport == "fake":
+        return FakeTransport()
+    return ResendTransport()
@@ -0,0 +1,240 @@
+"""Durable email outbox with an asyncio background dispatcher.
+
+`enqueue_email` writes a row in the caller's transaction, so a message is only queued if the request
+commits. `EmailDispatcher` runs in the FastAPI lifespan: it claims due rows in batches, delivers them
+through the configured transport with bounded concurrency, and retries failures with exponential
+backoff until `email_outbox_max_attempts` is reached.
+
+Claiming moves rows to status "sending" with a lease in `next_attempt_at`, so several app instances
+can share one outbox and a crashed instance's claims become due again once the lease expires.
+
+Bodies can carry secrets such as password reset links, so they are cleared as soon as a message is
+sent or given up on, and the remaining metadata rows are deleted after
+`email_outbox_retention_hours` by a sweep the dispatcher runs every `PURGE_INTERVAL_SECONDS`.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.email import EmailTransport, get_transport
+from app.models import EMAIL_OUTBOX_UNDELIVERED, EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+CLAIM_LEASE_SECONDS = 300
+PURGE_INTERVAL_SECONDS = 3600
+
+
+def enqueue_email(db: Session, message: dict) -> EmailOutbox:
+    """Add a message to the outbox. The caller commits, then may call `email_dispatcher.wake()`."""
+    row = EmailOutbox(
+        to_email=message["to"],
+        subject=message["subject"],
+        html=message.get("html"),
+        text=message.get("text"),
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(row)
+    return row
+
+
+def _to_message(row: EmailOutbox) -> dict:
+    message = {"from": settings.email_from, "to": row.to_email, "subject": row.subject}
+    if row.html:
+        message["html"] = row.html
+    if row.text:
+        message["text"] = row.text
+    return message
+
+
+class EmailDispatcher:
+    def __init__(
+        self,
+        transport: EmailTransport,
+        session_factory=SessionLocal,
+        batch_size: int = 20,
+        concurrency: int = 4,
+        poll_interval: float = 5.0,
+        max_attempts: int = 5,
+        backoff_seconds: float = 30.0,
+        retention_hours: float = 168.0,
+    ):
+        self.transport = transport
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.retention_hours = retention_hours
+        self._last_purge: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.purged = 0
+
+    # --- DB steps (blocking, run in a worker thread) ---
+
+    def _claim_batch(self) -> list:
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(EmailOutbox)
+                .filter(text(EMAIL_OUTBOX_UNDELIVERED), EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            claimed = []
+            for row in rows:
+                row.status = "sending"
+                row.attempts += 1
+                row.next_attempt_at = now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+                claimed.append((row.id, row.attempts, _to_message(row)))
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _record_results(self, results: list) -> None:
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            for row_id, attempts, error in results:
+                row = db.get(EmailOutbox, row_id)
+                if row is None:
+                    continue
+                if error is None:
+                    row.status = "sent"
+                    row.sent_at = now
+                    row.last_error = None
+                    row.html = row.text = None
+                elif attempts >= self.max_attempts:
+                    row.status = "failed"
+                    row.last_error = error[:500]
+                    row.html = row.text = None
+                else:
+                    delay = self.backoff_seconds * (2 ** (attempts - 1))
+                    row.status = "pending"
+                    row.last_error = error[:500]
+                    row.next_attempt_at = now + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_finished(self) -> int:
+        """Delete sent and failed rows whose last attempt is older than the retention window."""
+        cutoff = datetime.utcnow() - timedelta(hours=self.retention_hours)
+        db = self.session_factory()
+        try:
+            deleted = db.execute(
+                delete(EmailOutbox).where(
+                    EmailOutbox.status.in_(("sent", "failed")),
+                    func.coalesce(EmailOutbox.sent_at, EmailOutbox.next_attempt_at) < cutoff,
+                ),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    # --- Delivery loop ---
+
+    async def _deliver(self, semaphore: asyncio.Semaphore, row_id: int, attempts: int, message: dict):
+        async with semaphore:
+            try:
+                await asyncio.to_thread(self.transport.send, message)
+                return row_id, attempts, None
+            except Exception as e:  # provider errors are retried, never raised into the loop
+                logger.warning("Email %s delivery attempt %s failed: %s", row_id, attempts, e)
+                return row_id, attempts, str(e) or type(e).__name__
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch of due messages. Returns the number of messages attempted."""
+        claimed = await asyncio.to_thread(self._claim_batch)
+        if not claimed:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._deliver(semaphore, *c) for c in claimed))
+        await asyncio.to_thread(self._record_results, results)
+        for _, attempts, error in results:
+            if error is None:
+                self.sent += 1
+            elif attempts >= self.max_attempts:
+                self.failed += 1
+            else:
+                self.retried += 1
+        return len(claimed)
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                attempted = await self.dispatch_once()
+                if self._last_purge is None or time.monotonic() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                    self._last_purge = time.monotonic()
+                    self.purged += await asyncio.to_thread(self.purge_finished)
+            except Exception:
+                logger.exception("Email dispatcher iteration failed")
+                attempted = 0
+            if attempted >= self.batch_size:
+                continue  # more may be due; keep draining
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever(), name="email-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Ask the dispatcher to look for work now instead of waiting for the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def stats(self) -> dict:
+        return {
+            "transport": type(self.transport).__name__,
+            "running": self._task is not None,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "purged": self.purged,
+        }
+
+
+email_dispatcher = EmailDispatcher(
+    transport=get_transport(),
+    batch_size=settings.email_outbox_batch_size,
+    concurrency=settings.email_outbox_concurrency,
+    poll_interval=settings.email_outbox_poll_seconds,
+    max_attempts=settings.email_outbox_max_attempts,
+    backoff_seconds=settings.email_outbox_backoff_seconds,
+    retention_hours=settings.email_outbox_retention_hours,
+)
@@ -0,0 +1,129 @@
+"""Run bcrypt hashing and verification off the event loop.
+
+Each bcrypt operation takes hundreds of milliseconds of CPU, so async handlers must not call
+`verify_password`/`get_password_hash` directly. `password_hasher` runs them in a dedicated,
+size-bounded thread pool (bcrypt releases the GIL) and refuses work once the queue is full so
+callers can fail fast instead of piling up behind a login burst.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.auth import get_password_hash, verify_password, verify_and_update_password
+from app.config import settings
+
+T = TypeVar("T")
+
+_LATENCY_SAMPLES = 512
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is saturated. `retry_after` is a hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+class PasswordHasher:
+    """Bounded executor for password hashing. At most `max_workers + queue_limit` jobs are admitted."""
+
+    def __init__(self, max_workers: int, queue_limit: int, retry_after: int = 1):
+        self.max_workers = max(1, max_workers)
+        self.queue_limit = max(0, queue_limit)
+        self.retry_after = retry_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._run_ms: deque = deque(maxlen=_LATENCY_SAMPLES)
+        self._wait_ms: deque = deque(maxlen=_LATENCY_SAMPLES)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        with self._lock:
+            if self._pending >= self.max_workers + self.queue_limit:
+                self.rejected += 1
+                raise PasswordHashingBusy(self.retry_after)
+            self._pending += 1
+            executor = self._get_executor()
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait_ms.append((started - submitted) * 1000)
+                    self._run_ms.append((finished - started) * 1000)
+
+        def release(_future) -> None:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+        try:
+            future = executor.submit(job)
+        except BaseException:
+            release(None)
+            raise
+        # Released when the job itself ends, not when the caller stops waiting: a client that
+        # disconnects cancels the await, but bcrypt keeps its worker busy until it finishes
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return await self.run(verify_and_update_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            run_ms = list(self._run_ms)
+            wait_ms = list(self._wait_ms)
+            pending = self._pending
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": min(pending, self.max_workers),
+                "queue_depth": max(0, pending - self.max_workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "hash_ms": {"p50": _percentile(run_ms, 50), "p95": _percentile(run_ms, 95), "max": round(max(run_ms, default=0.0), 2)},
+                "wait_ms": {"p50": _percentile(wait_ms, 50), "p95": _percentile(wait_ms, 95), "max": round(max(wait_ms, default=0.0), 2)},
+            }
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    queue_limit=settings.password_hash_queue_limit,
+    retry_after=settings.password_hash_retry_after_seconds,
+)
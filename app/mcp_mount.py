@@ -0,0 +1,63 @@
+"""Lazily loaded ASGI mount for the MCP server.
+
+Importing the MCP SDK accounts for a large share of app import time. This app is mounted at /mcp
+and loads app.mcp_server on the first request to that path, so the API and workers that never see
+an MCP request do not pay that cost.
+
+FastMCP's session manager runs inside an anyio task group, and a task group must be exited by the
+task that entered it. A dedicated background task therefore owns `session_manager.run()` until
+`aclose()` is called from the lifespan.
+"""
+import asyncio
+from typing import Optional
+
+
+class LazyMCPApp:
+    def __init__(self):
+        self._app = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._app is not None
+
+    async def _run_session_manager(self, mcp, ready: asyncio.Event) -> None:
+        async with mcp.session_manager.run():
+            ready.set()
+            await self._stop.wait()
+
+    async def _load(self) -> None:
+        from app.mcp_server import mcp
+
+        app = mcp.streamable_http_app()  # creates the session manager
+        ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        runner = asyncio.create_task(self._run_session_manager(mcp, ready), name="mcp-session-manager")
+        ready_task = asyncio.create_task(ready.wait())
+        # If the session manager fails to start, the runner ends before `ready` is ever set
+        await asyncio.wait({ready_task, runner}, return_when=asyncio.FIRST_COMPLETED)
+        if not ready.is_set():
+            ready_task.cancel()
+            # `_app` stays None, so the next request tries again
+            runner.result()
+            raise RuntimeError("MCP session manager stopped before it was ready")
+        self._runner = runner
+        self._app = app
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._app is None:
+                    await self._load()
+        await self._app(scope, receive, send)
+
+    async def aclose(self) -> None:
+        if self._runner is not None:
+            self._stop.set()
+            await self._runner
+            self._runner = None
+            self._app = None
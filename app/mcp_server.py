@@ -7,26 +7,46 @@ Required env var:
   MCP_API_KEY — Bearer token agents must send in Authorization header (or X-API-Key header)
 
 Every tool accepts a `username` parameter so the agent can operate on any user's data.
+List tools return a plain list of every row unless paginating: given `limit` or `cursor` (or with
+PAGINATION_ENABLED on) they return {"items": [...], "next_cursor": ...}; pass next_cursor back to
+get the following page (see app/pagination.py). Read-only tools use `_read_db`, which goes to the read replica when one is configured. With
+sharding on (app/sharding.py), both helpers hand out a session on the user's shard instead.
 """
 import json
 from contextlib import contextmanager
 from datetime import date as date_type, datetime
-from typing import Optional
+from typing import Optional, Union
 
 from mcp.server.fastmcp import FastMCP
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
-from app.database import SessionLocal
+from app.config import settings
+from app.database import ReadSessionLocal, SessionLocal
+from app.metric_batch import upsert_metric_batch
 from app.models import (
+    BODY_MEASUREMENT_SITES,
+    BodyMeasurement,
     Exercise,
     Goal,
     MetricEntry,
     User,
-    Weight,
     WorkoutPlan,
     WorkoutPlanDay,
     WorkoutPlanExercise,
 )
+from app.pagination import (
+    EXERCISES_BY_NAME,
+    GOALS_NEWEST_FIRST,
+    METRICS_NEWEST_FIRST,
+    PLANS_NEWEST_FIRST,
+    Keyset,
+    PageRequest,
+)
+from app.read_routing import use_replica
+from app.sharding import shard_router
+from app.weight_import import import_weights as import_weight_rows
 
 mcp = FastMCP(
     "Fit Tracker",
@@ -34,19 +54,67 @@ mcp = FastMCP(
 )
 
 
+def _shard_db(username: str):
+    """Session on the user's shard; the shared database is only used to find the user."""
+    shared = SessionLocal()
+    try:
+        u = shared.query(User.id, User.is_admin).filter(User.username == username).first()
+        if not u:
+            raise RuntimeError(f"User '{username}' not found.")
+        return shard_router.session(u.id, username, bool(u.is_admin))
+    finally:
+        shared.close()
+
+
+@contextmanager
+def _db(username: Optional[str] = None):
+    """Primary session; with a username and sharding on, that user's shard."""
+    db = _shard_db(username) if username and shard_router is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 @contextmanager
-def _db():
-    db = SessionLocal()
+def _read_db(username: str, shared: bool = False):
+    """Replica session for read-only tools, or the primary while this user is pinned after a write.
+
+    With sharding on, the user's shard, unless `shared` asks for shared data such as the profile.
+    """
+    if shard_router is not None and not shared:
+        with _db(username) as db:
+            yield db
+        return
+    db = ReadSessionLocal()
     try:
+        if ReadSessionLocal is not SessionLocal:
+            user_id = db.query(User.id).filter(User.username == username).scalar()
+            # Unknown on the replica may just be replication lag for a new user; ask the primary
+            if user_id is None or not use_replica(user_id):
+                db.close()
+                db = SessionLocal()
         yield db
     finally:
         db.close()
 
 
+def _page(keyset: Keyset, query, limit: Optional[int], cursor: Optional[str], to_dict) -> Union[dict, list]:
+    """One page of an ORM query. With pagination off and no limit, the plain list of every row."""
+    page = PageRequest.of(limit, cursor)
+    rows, next_cursor = keyset.split(keyset.apply(query, page).all(), page)
+    items = [to_dict(row) for row in rows]
+    if page.limit is None:
+        return items
+    return {"items": items, "next_cursor": next_cursor}
+
+
 def _user(db, username: str) -> User:
     u = db.query(User).filter(User.username == username).first()
     if not u:
         raise RuntimeError(f"User '{username}' not found.")
+    # Commits in this session pin the user to the primary for reads (see app/read_routing.py)
+    db.info["user_id"] = u.id
     return u
 
 
@@ -55,7 +123,7 @@ def _user(db, username: str) -> User:
 @mcp.tool()
 def get_profile(username: str) -> dict:
     """Get a user's fitness profile (name, age, height, gender, email)."""
-    with _db() as db:
+    with _read_db(username, shared=True) as db:
         u = _user(db, username)
         return {
             "id": u.id,
@@ -112,108 +180,164 @@ def update_profile(
 
 
 # ─── Weights ──────────────────────────────────────────────────────────────────
+# Compatibility tools over metric_entries rows with metric_type "weight"; a weight id is the entry id.
+
+
+def _weight_dict(e: MetricEntry) -> dict:
+    return {"id": e.id, "weight": e.value["kg"], "date": e.date.isoformat(), "created_at": e.created_at.isoformat()}
+
+
+def _user_weights(db, user_id: int):
+    return (
+        db.query(MetricEntry)
+        .filter(MetricEntry.user_id == user_id, MetricEntry.metric_type == "weight")
+    )
+
 
 @mcp.tool()
-def list_weights(username: str) -> list:
-    """List all weight entries for a user, ordered newest first."""
-    with _db() as db:
+def list_weights(username: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Union[dict, list]:
+    """List weight entries for a user, newest first. With limit or cursor, returns {items, next_cursor}: pass next_cursor back as cursor."""
+    with _read_db(username) as db:
         u = _user(db, username)
-        rows = db.query(Weight).filter(Weight.user_id == u.id).order_by(Weight.date.desc()).all()
-        return [
-            {"id": w.id, "weight": w.weight, "date": w.date.isoformat(), "created_at": w.created_at.isoformat()}
-            for w in rows
-        ]
+        return _page(METRICS_NEWEST_FIRST, _user_weights(db, u.id), limit, cursor, _weight_dict)
 
 
 @mcp.tool()
 def create_weight(username: str, date: str, weight: float) -> dict:
     """Add a weight entry for a user. date: YYYY-MM-DD. weight: kg. One entry per day enforced."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         try:
             d = datetime.strptime(date, "%Y-%m-%d").date()
         except ValueError:
             raise ValueError("Invalid date format. Use YYYY-MM-DD.")
-        existing = db.query(Weight).filter(Weight.user_id == u.id, Weight.date == d).first()
+        existing = _user_weights(db, u.id).filter(MetricEntry.date == d).first()
         if existing:
             raise ValueError(f"Weight entry already exists for {date}. Use update_weight with id={existing.id}.")
-        w = Weight(user_id=u.id, weight=weight, date=d)
-        db.add(w)
+        e = MetricEntry(user_id=u.id, metric_type="weight", date=d, value={"kg": weight})
+        db.add(e)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent write; uq_user_metric_date rejected this one
+            db.rollback()
+            raise ValueError(f"Weight entry already exists for {date}.")
+        db.refresh(e)
+        return _weight_dict(e)
+
+
+@mcp.tool()
+def import_weights(username: str, weights: list) -> dict:
+    """Import many weight entries for a user in one call. weights: list of {"date": "YYYY-MM-DD", "weight": kg}.
+    Days that already have a weight are updated. Returns counts of inserted, updated and rejected rows."""
+    if not all(isinstance(w, dict) for w in weights):
+        raise ValueError("weights must be a list of {date, weight} objects.")
+    if len(weights) > settings.weight_import_max_rows:
+        raise ValueError(f"At most {settings.weight_import_max_rows} weights per call.")
+    with _db(username) as db:
+        u = _user(db, username)
+        report = import_weight_rows(db, u.id, weights)
         db.commit()
-        db.refresh(w)
-        return {"id": w.id, "weight": w.weight, "date": w.date.isoformat(), "created_at": w.created_at.isoformat()}
+        return report
 
 
 @mcp.tool()
 def update_weight(username: str, weight_id: int, date: Optional[str] = None, weight: Optional[float] = None) -> dict:
     """Update a weight entry by id. Provide date (YYYY-MM-DD) and/or weight (kg)."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
-        w = db.query(Weight).filter(Weight.id == weight_id, Weight.user_id == u.id).first()
-        if not w:
+        e = _user_weights(db, u.id).filter(MetricEntry.id == weight_id).first()
+        if not e:
             raise ValueError(f"Weight entry {weight_id} not found.")
         if date is not None:
             try:
                 new_date = datetime.strptime(date, "%Y-%m-%d").date()
             except ValueError:
                 raise ValueError("Invalid date format. Use YYYY-MM-DD.")
-            if new_date != w.date:
-                conflict = db.query(Weight).filter(
-                    Weight.user_id == u.id, Weight.date == new_date, Weight.id != weight_id
+            if new_date != e.date:
+                conflict = _user_weights(db, u.id).filter(
+                    MetricEntry.date == new_date, MetricEntry.id != weight_id
                 ).first()
                 if conflict:
                     raise ValueError(f"Weight entry already exists for {date}.")
-            w.date = new_date
+            e.date = new_date
         if weight is not None:
-            w.weight = weight
+            e.value = {"kg": weight}
         db.commit()
-        db.refresh(w)
-        return {"id": w.id, "weight": w.weight, "date": w.date.isoformat(), "created_at": w.created_at.isoformat()}
+        db.refresh(e)
+        return _weight_dict(e)
 
 
 @mcp.tool()
 def delete_weight(username: str, weight_id: int) -> dict:
     """Delete a weight entry by id."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
-        w = db.query(Weight).filter(Weight.id == weight_id, Weight.user_id == u.id).first()
-        if not w:
+        e = _user_weights(db, u.id).filter(MetricEntry.id == weight_id).first()
+        if not e:
             raise ValueError(f"Weight entry {weight_id} not found.")
-        db.delete(w)
+        db.delete(e)
         db.commit()
         return {"message": f"Weight entry {weight_id} deleted."}
 
 
 # ─── Metrics ──────────────────────────────────────────────────────────────────
 
+def _normalize_source(source: Optional[str]) -> Optional[str]:
+    """Trimmed and lowercased, blank as None: the form migration 018_normalize_source gives old rows."""
+    if source is None:
+        return None
+    return source.strip().lower() or None
+
+
 @mcp.tool()
 def list_metrics(
     username: str,
     metric_type: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-) -> list:
-    """List metric entries for a user. Filter by metric_type ('weight'|'muscle_index'|'body_measurements') and/or date range (YYYY-MM-DD)."""
-    with _db() as db:
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Union[dict, list]:
+    """List metric entries for a user, newest first. Filter by metric_type ('weight'|'muscle_index'|'body_measurements') and/or date range (YYYY-MM-DD).
+    With limit or cursor, returns {items, next_cursor}: pass next_cursor back as cursor."""
+    with _read_db(username) as db:
         u = _user(db, username)
-        q = db.query(MetricEntry).filter(MetricEntry.user_id == u.id)
+        # One query for the sites of every body measurement on the page, instead of one per entry
+        q = db.query(MetricEntry).options(selectinload(MetricEntry.body_measurement)).filter(MetricEntry.user_id == u.id)
         if metric_type:
             q = q.filter(MetricEntry.metric_type == metric_type)
         if date_from:
             q = q.filter(MetricEntry.date >= datetime.strptime(date_from, "%Y-%m-%d").date())
         if date_to:
             q = q.filter(MetricEntry.date <= datetime.strptime(date_to, "%Y-%m-%d").date())
-        return [
-            {
-                "id": e.id,
-                "metric_type": e.metric_type,
-                "date": e.date.isoformat(),
-                "value": e.value,
-                "source": e.source,
-                "created_at": e.created_at.isoformat(),
-            }
-            for e in q.order_by(MetricEntry.date.desc()).all()
-        ]
+        return _page(METRICS_NEWEST_FIRST, q, limit, cursor, lambda e: {
+            "id": e.id,
+            "metric_type": e.metric_type,
+            "date": e.date.isoformat(),
+            "value": e.value,
+            "source": e.source,
+            "created_at": e.created_at.isoformat(),
+        })
+
+
+@mcp.tool()
+def body_measurement_history(username: str, site: str, limit: Optional[int] = None) -> list:
+    """History of one body measurement site for a user, newest first, e.g. site='waist_cm'.
+    Days without that site are skipped. limit=1 returns only the latest value."""
+    if site not in BODY_MEASUREMENT_SITES:
+        raise ValueError(f"Unknown site '{site}'. Allowed: {list(BODY_MEASUREMENT_SITES)}")
+    with _read_db(username) as db:
+        u = _user(db, username)
+        column = getattr(BodyMeasurement, site)
+        q = (
+            db.query(BodyMeasurement.date, column)
+            .filter(BodyMeasurement.user_id == u.id, column.is_not(None))
+            .order_by(BodyMeasurement.date.desc())
+        )
+        if limit is not None:
+            q = q.limit(limit)
+        return [{"date": d.isoformat(), "value_cm": v} for d, v in q.all()]
 
 
 @mcp.tool()
@@ -228,7 +352,7 @@ def create_metric(username: str, metric_type: str, date: str, value: str, source
       body_measurements:  '{"waist_cm": 85, "chest_cm": 100}'
     source: 'device' | 'calculated' (optional)
     """
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         try:
             d = datetime.strptime(date, "%Y-%m-%d").date()
@@ -245,12 +369,12 @@ def create_metric(username: str, metric_type: str, date: str, value: str, source
         ).first()
         if existing:
             existing.value = value_dict
-            existing.source = source
+            existing.source = _normalize_source(source)
             db.commit()
             db.refresh(existing)
             e = existing
         else:
-            e = MetricEntry(user_id=u.id, metric_type=metric_type, date=d, value=value_dict, source=source)
+            e = MetricEntry(user_id=u.id, metric_type=metric_type, date=d, value=value_dict, source=_normalize_source(source))
             db.add(e)
             db.commit()
             db.refresh(e)
@@ -264,6 +388,25 @@ def create_metric(username: str, metric_type: str, date: str, value: str, source
         }
 
 
+@mcp.tool()
+def create_metrics(username: str, entries: list) -> dict:
+    """Create or upsert many metric entries for a user in one call; metric types may be mixed.
+
+    entries: list of {"metric_type", "date": "YYYY-MM-DD", "value": {...}, "source"?}, with value as
+    an object shaped as for create_metric, e.g. {"metric_type": "weight", "date": "2025-01-01", "value": {"kg": 75.5}}.
+    Returns counts and a status per entry (inserted, updated or rejected, with the reason).
+    """
+    if not all(isinstance(e, dict) for e in entries):
+        raise ValueError("entries must be a list of {metric_type, date, value} objects.")
+    if len(entries) > settings.metric_batch_max_items:
+        raise ValueError(f"At most {settings.metric_batch_max_items} entries per call.")
+    with _db(username) as db:
+        u = _user(db, username)
+        report = upsert_metric_batch(db, u.id, entries)
+        db.commit()
+        return report
+
+
 @mcp.tool()
 def update_metric(
     username: str,
@@ -273,7 +416,7 @@ def update_metric(
     source: Optional[str] = None,
 ) -> dict:
     """Update a metric entry. value is a JSON string. For body_measurements, value is merged (partial update)."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         e = db.query(MetricEntry).filter(MetricEntry.id == metric_id, MetricEntry.user_id == u.id).first()
         if not e:
@@ -288,7 +431,7 @@ def update_metric(
             else:
                 e.value = value_dict
         if source is not None:
-            e.source = source
+            e.source = _normalize_source(source)
         if date is not None:
             try:
                 new_date = datetime.strptime(date, "%Y-%m-%d").date()
@@ -319,7 +462,7 @@ def update_metric(
 @mcp.tool()
 def delete_metric(username: str, metric_id: int) -> dict:
     """Delete a metric entry by id."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         e = db.query(MetricEntry).filter(MetricEntry.id == metric_id, MetricEntry.user_id == u.id).first()
         if not e:
@@ -332,25 +475,28 @@ def delete_metric(username: str, metric_id: int) -> dict:
 # ─── Goals ────────────────────────────────────────────────────────────────────
 
 @mcp.tool()
-def list_goals(username: str, is_achieved: Optional[bool] = None) -> list:
-    """List fitness goals for a user. Optionally filter by is_achieved (true/false)."""
-    with _db() as db:
+def list_goals(
+    username: str,
+    is_achieved: Optional[bool] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Union[dict, list]:
+    """List fitness goals for a user, newest first. Optionally filter by is_achieved (true/false).
+    With limit or cursor, returns {items, next_cursor}: pass next_cursor back as cursor."""
+    with _read_db(username) as db:
         u = _user(db, username)
         q = db.query(Goal).filter(Goal.user_id == u.id)
         if is_achieved is not None:
             q = q.filter(Goal.is_achieved == is_achieved)
-        return [
-            {
-                "id": g.id,
-                "title": g.title,
-                "description": g.description,
-                "target_date": g.target_date.isoformat() if g.target_date else None,
-                "is_achieved": g.is_achieved,
-                "created_at": g.created_at.isoformat(),
-                "updated_at": g.updated_at.isoformat() if g.updated_at else None,
-            }
-            for g in q.order_by(Goal.created_at.desc()).all()
-        ]
+        return _page(GOALS_NEWEST_FIRST, q, limit, cursor, lambda g: {
+            "id": g.id,
+            "title": g.title,
+            "description": g.description,
+            "target_date": g.target_date.isoformat() if g.target_date else None,
+            "is_achieved": g.is_achieved,
+            "created_at": g.created_at.isoformat(),
+            "updated_at": g.updated_at.isoformat() if g.updated_at else None,
+        })
 
 
 @mcp.tool()
@@ -361,7 +507,7 @@ def create_goal(
     target_date: Optional[str] = None,
 ) -> dict:
     """Create a fitness goal for a user. target_date: YYYY-MM-DD (optional)."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         td = date_type.fromisoformat(target_date) if target_date else None
         g = Goal(user_id=u.id, title=title, description=description, target_date=td)
@@ -388,7 +534,7 @@ def update_goal(
     is_achieved: Optional[bool] = None,
 ) -> dict:
     """Update a goal by id. Only provided fields are changed."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         g = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == u.id).first()
         if not g:
@@ -417,7 +563,7 @@ def update_goal(
 @mcp.tool()
 def delete_goal(username: str, goal_id: int) -> dict:
     """Delete a goal by id."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         g = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == u.id).first()
         if not g:
@@ -430,9 +576,16 @@ def delete_goal(username: str, goal_id: int) -> dict:
 # ─── Exercises ────────────────────────────────────────────────────────────────
 
 @mcp.tool()
-def list_exercises(username: str, muscle_group: Optional[str] = None, equipment: Optional[str] = None) -> list:
-    """List all available exercises (global library + user's custom). Filter by muscle_group or equipment."""
-    with _db() as db:
+def list_exercises(
+    username: str,
+    muscle_group: Optional[str] = None,
+    equipment: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Union[dict, list]:
+    """List available exercises by name (global library + user's custom). Filter by muscle_group or equipment.
+    With limit or cursor, returns {items, next_cursor}: pass next_cursor back as cursor."""
+    with _read_db(username) as db:
         u = _user(db, username)
         q = db.query(Exercise).filter(
             (Exercise.owner_id.is_(None)) | (Exercise.owner_id == u.id)
@@ -441,17 +594,14 @@ def list_exercises(username: str, muscle_group: Optional[str] = None, equipment:
             q = q.filter(Exercise.muscle_group == muscle_group)
         if equipment:
             q = q.filter(Exercise.equipment == equipment)
-        return [
-            {
-                "id": ex.id,
-                "name": ex.name,
-                "description": ex.description,
-                "muscle_group": ex.muscle_group,
-                "equipment": ex.equipment,
-                "is_global": ex.owner_id is None,
-            }
-            for ex in q.order_by(Exercise.name).all()
-        ]
+        return _page(EXERCISES_BY_NAME, q, limit, cursor, lambda ex: {
+            "id": ex.id,
+            "name": ex.name,
+            "description": ex.description,
+            "muscle_group": ex.muscle_group,
+            "equipment": ex.equipment,
+            "is_global": ex.owner_id is None,
+        })
 
 
 @mcp.tool()
@@ -463,7 +613,7 @@ def create_exercise(
     equipment: Optional[str] = None,
 ) -> dict:
     """Create a custom exercise owned by the user."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         ex = Exercise(name=name, description=description, muscle_group=muscle_group, equipment=equipment, owner_id=u.id)
         db.add(ex)
@@ -481,6 +631,11 @@ def create_exercise(
 
 # ─── Workout Plans ────────────────────────────────────────────────────────────
 
+def _plan_tree():
+    """Eager-load days -> exercises -> exercise so `_plan_to_dict` never lazy-loads per row."""
+    return selectinload(WorkoutPlan.days).selectinload(WorkoutPlanDay.exercises).selectinload(WorkoutPlanExercise.exercise)
+
+
 def _plan_to_dict(plan: WorkoutPlan) -> dict:
     days = []
     for d in plan.days:
@@ -520,14 +675,22 @@ def _plan_to_dict(plan: WorkoutPlan) -> dict:
 
 
 @mcp.tool()
-def list_plans(username: str) -> list:
-    """List all workout plans for a user (summary with day count)."""
-    with _db() as db:
+def list_plans(username: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> Union[dict, list]:
+    """List workout plans for a user, newest first (summary with day count). With limit or cursor, returns {items, next_cursor}: pass next_cursor back as cursor."""
+    with _read_db(username) as db:
         u = _user(db, username)
-        plans = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == u.id).order_by(WorkoutPlan.created_at.desc()).all()
+        page = PageRequest.of(limit, cursor)
+        q = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == u.id)
+        plans, next_cursor = PLANS_NEWEST_FIRST.split(PLANS_NEWEST_FIRST.apply(q, page).all(), page)
+        day_counts = dict(
+            db.query(WorkoutPlanDay.plan_id, func.count(WorkoutPlanDay.id))
+            .filter(WorkoutPlanDay.plan_id.in_([p.id for p in plans]))
+            .group_by(WorkoutPlanDay.plan_id)
+            .all()
+        ) if plans else {}
         result = []
         for p in plans:
-            day_count = db.query(func.count(WorkoutPlanDay.id)).filter(WorkoutPlanDay.plan_id == p.id).scalar() or 0
+            day_count = day_counts.get(p.id, 0)
             result.append({
                 "id": p.id,
                 "name": p.name,
@@ -539,15 +702,20 @@ def list_plans(username: str) -> list:
                 "day_count": day_count,
                 "created_at": p.created_at.isoformat(),
             })
-        return result
+        return result if page.limit is None else {"items": result, "next_cursor": next_cursor}
 
 
 @mcp.tool()
 def get_plan(username: str, plan_id: int) -> dict:
     """Get a workout plan with all its days and exercises."""
-    with _db() as db:
+    with _read_db(username) as db:
         u = _user(db, username)
-        plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
+        plan = (
+            db.query(WorkoutPlan)
+            .options(_plan_tree())
+            .filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id)
+            .first()
+        )
         if not plan:
             raise ValueError(f"Plan {plan_id} not found.")
         return _plan_to_dict(plan)
@@ -562,7 +730,7 @@ def create_plan(
     description: Optional[str] = None,
 ) -> dict:
     """Create a workout plan for a user. duration_unit: 'weeks' | 'days' | 'months'."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = WorkoutPlan(
             user_id=u.id,
@@ -587,7 +755,7 @@ def update_plan(
     description: Optional[str] = None,
 ) -> dict:
     """Update a workout plan's metadata (name, description, duration)."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -597,14 +765,14 @@ def update_plan(
         plan.duration_value = duration_value
         plan.duration_unit = duration_unit
         db.commit()
-        db.refresh(plan)
+        plan = db.query(WorkoutPlan).options(_plan_tree()).filter(WorkoutPlan.id == plan_id).one()
         return _plan_to_dict(plan)
 
 
 @mcp.tool()
 def delete_plan(username: str, plan_id: int) -> dict:
     """Delete a workout plan and all its days and exercises."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -617,7 +785,7 @@ def delete_plan(username: str, plan_id: int) -> dict:
 @mcp.tool()
 def activate_plan(username: str, plan_id: int) -> dict:
     """Set a plan as active for a user (deactivates all others). Sets start_date to today."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -626,7 +794,7 @@ def activate_plan(username: str, plan_id: int) -> dict:
         plan.is_active = True
         plan.start_date = date_type.today()
         db.commit()
-        db.refresh(plan)
+        plan = db.query(WorkoutPlan).options(_plan_tree()).filter(WorkoutPlan.id == plan_id).one()
         return _plan_to_dict(plan)
 
 
@@ -642,7 +810,7 @@ def create_plan_day(
     notes: Optional[str] = None,
 ) -> dict:
     """Add a day to a workout plan. day_number must be unique within the plan."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -667,7 +835,7 @@ def update_plan_day(
     notes: Optional[str] = None,
 ) -> dict:
     """Update a day in a workout plan."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -704,7 +872,7 @@ def update_plan_day(
 @mcp.tool()
 def delete_plan_day(username: str, plan_id: int, day_id: int) -> dict:
     """Delete a day (and all its exercises) from a workout plan."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -733,7 +901,7 @@ def add_exercise_to_day(
     notes: Optional[str] = None,
 ) -> dict:
     """Add an exercise to a plan day. Use list_exercises to find exercise_id."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -789,7 +957,7 @@ def update_day_exercise(
     notes: Optional[str] = None,
 ) -> dict:
     """Update an exercise entry in a plan day."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -841,7 +1009,7 @@ def update_day_exercise(
 @mcp.tool()
 def remove_exercise_from_day(username: str, plan_id: int, day_id: int, entry_id: int) -> dict:
     """Remove an exercise from a plan day."""
-    with _db() as db:
+    with _db(username) as db:
         u = _user(db, username)
         plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == u.id).first()
         if not plan:
@@ -0,0 +1,71 @@
+"""Batch metric writes (POST /metrics/batch and the MCP `create_metrics` tool).
+
+A device sync sends many entries of mixed metric types at once. Each item is validated once, with
+`validate_metric_value`, and the valid items are written together through `upsert_metric_entries`:
+one `INSERT ... ON CONFLICT` on uq_user_metric_date per chunk instead of the lookup, insert or
+update, commit and refresh that POST /metrics costs per entry. Every item gets a status.
+"""
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+
+from app.metric_upsert import upsert_metric_entries
+from app.schemas import validate_metric_value
+
+
+class _BatchItem(BaseModel):
+    # MetricCreate without its value validator: the value is validated (and normalized) once below
+    metric_type: Literal["weight", "muscle_index", "body_measurements"]
+    date: str
+    value: dict
+    source: Optional[Literal["device", "calculated"]] = "calculated"
+
+
+def _error_message(exc: ValidationError, prefix: tuple = ()) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in prefix + e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def upsert_metric_batch(db: Session, user_id: int, items: list) -> dict:
+    """Validate items of {metric_type, date, value, source?} and upsert the valid ones.
+
+    Returns counts and one result per item, in input order; the caller commits.
+    """
+    results, valid, positions, seen = [], [], [], set()
+    for i, raw in enumerate(items):
+        # Echo the item's key back as sent, if it is text at all
+        result = {"index": i, **{k: raw[k] for k in ("metric_type", "date") if isinstance(raw.get(k), str)}}
+        results.append(result)
+        try:
+            item = _BatchItem.model_validate(raw)
+            day = datetime.strptime(item.date, "%Y-%m-%d").date()
+        except ValidationError as e:
+            result.update(status="rejected", error=_error_message(e))
+            continue
+        except ValueError:
+            result.update(status="rejected", error="Invalid date format. Use YYYY-MM-DD.")
+            continue
+        try:
+            value = validate_metric_value(item.metric_type, item.value)
+        except ValidationError as e:
+            result.update(status="rejected", error=_error_message(e, ("value",)))
+            continue
+        if (item.metric_type, day) in seen:
+            result.update(status="rejected", error=f"Duplicate {item.metric_type} entry for {item.date} in batch")
+            continue
+        seen.add((item.metric_type, day))
+        valid.append({"metric_type": item.metric_type, "date": day, "value": value, "source": item.source})
+        positions.append(i)
+
+    for i, (entry_id, created) in zip(positions, upsert_metric_entries(db, user_id, valid)):
+        results[i].update(status="inserted" if created else "updated", id=entry_id)
+
+    statuses = [r["status"] for r in results]
+    return {
+        "total": len(items),
+        "inserted": statuses.count("inserted"),
+        "updated": statuses.count("updated"),
+        "rejected": statuses.count("rejected"),
+        "items": results,
+    }
@@ -0,0 +1,104 @@
+"""Set-based upsert of metric entries on uq_user_metric_date.
+
+Writes many (metric_type, date) entries for one user as `INSERT ... ON CONFLICT (user_id,
+metric_type, date) DO UPDATE`, built with the dialect's own insert construct (PostgreSQL or SQLite),
+a chunk of rows per statement. Concurrent writers of the same day cannot race each other into a
+duplicate or an IntegrityError: the database decides insert versus update per row. Which one it
+chose is reported per row and cannot go stale: PostgreSQL returns it from the upsert itself
+(`RETURNING xmax = 0`), and on SQLite the existing rows are read only once this transaction holds
+the database write lock.
+
+Body measurements keep {} in the JSON column, like the ORM `value` setter does, and their sites go
+to body_measurements in a second upsert keyed by metric_entry_id; every site is written, so an
+update replaces the whole measurement set. These are Core statements, so the ORM `after_flush` hook
+that maintains series blocks does not see them; `upsert_metric_entries` patches the blocks itself
+when they are enabled. The caller commits.
+"""
+from sqlalchemy import false, literal, literal_column, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import BODY_MEASUREMENT_SITES, BodyMeasurement, MetricEntry
+from app.series_blocks import SERIES_METRICS, apply_changes
+
+# Rows per statement; keeps bind parameters well under SQLite's limit
+UPSERT_CHUNK = 500
+BODY_MEASUREMENTS = "body_measurements"
+
+entries = MetricEntry.__table__
+measurements = BodyMeasurement.__table__
+
+
+def _insert(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def upsert_metric_entries(db: Session, user_id: int, rows: list, update_source: bool = True) -> list:
+    """Insert or update entries for one user. Returns (id, created) per row, in input order.
+
+    rows: dicts with metric_type, date (a date), value (a validated dict) and optionally source, with
+    no two rows for the same (metric_type, date). On conflict the stored value is replaced, and the
+    source too unless `update_source` is false.
+    """
+    if not rows:
+        return []
+    conn = db.connection()
+    insert = _insert(conn.dialect.name)
+    # Statements on the connection skip the session's DML hooks; mark the write for read retries
+    # and replica pinning (app/db_resilience.py, app/read_routing.py) as they would
+    db.info["_wrote"] = True
+    keys = [(r["metric_type"], r["date"]) for r in rows]
+    postgres = conn.dialect.name == "postgresql"
+
+    existing = set()
+    if not postgres:
+        # SQLite cannot tell inserts from updates in RETURNING. Take the database write lock first (a
+        # no-op UPDATE), so no other writer can commit between reading what exists and upserting
+        conn.execute(update(entries).where(false()).values(id=entries.c.id))
+        for start in range(0, len(keys), UPSERT_CHUNK):
+            existing.update(conn.execute(
+                select(entries.c.metric_type, entries.c.date).where(
+                    entries.c.user_id == user_id,
+                    tuple_(entries.c.metric_type, entries.c.date).in_(keys[start:start + UPSERT_CHUNK]),
+                )
+            ).all())
+
+    results = {}
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        stmt = insert(entries).values([
+            {"user_id": user_id, "metric_type": r["metric_type"], "date": r["date"],
+             "value": {} if r["metric_type"] == BODY_MEASUREMENTS else r["value"], "source": r.get("source")}
+            for r in rows[start:start + UPSERT_CHUNK]
+        ])
+        updates = {"value": stmt.excluded.value}
+        if update_source:
+            updates["source"] = stmt.excluded.source
+        # PostgreSQL says per row which it did: xmax is 0 only on a freshly inserted row version
+        created = literal_column("(xmax = 0)") if postgres else literal(None)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "metric_type", "date"], set_=updates
+        ).returning(entries.c.id, entries.c.metric_type, entries.c.date, created)
+        for entry_id, metric_type, day, inserted in conn.execute(stmt):
+            key = (metric_type, day)
+            results[key] = (entry_id, inserted if postgres else key not in existing)
+    ids = {key: entry_id for key, (entry_id, _) in results.items()}
+
+    sites = [
+        {"metric_entry_id": ids[(r["metric_type"], r["date"])], "user_id": user_id, "date": r["date"],
+         **{site: r["value"].get(site) for site in BODY_MEASUREMENT_SITES}}
+        for r in rows if r["metric_type"] == BODY_MEASUREMENTS
+    ]
+    for start in range(0, len(sites), UPSERT_CHUNK):
+        stmt = insert(measurements).values(sites[start:start + UPSERT_CHUNK])
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=["metric_entry_id"],
+            set_={site: stmt.excluded[site] for site in BODY_MEASUREMENT_SITES},
+        ))
+
+    if settings.series_blocks_enabled:
+        apply_changes(conn, {
+            (user_id, r["metric_type"], r["date"]): float(r["value"][SERIES_METRICS[r["metric_type"]]])
+            for r in rows if r["metric_type"] in SERIES_METRICS
+        }, set())
+    return [results[key] for key in keys]
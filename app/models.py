@@ -1,8 +1,27 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Date, JSON, UniqueConstraint, Boolean
-from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Date, JSON, UniqueConstraint, Boolean, Index, Text, LargeBinary
+from sqlalchemy.sql import func, text
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
 
+# Standard body circumference sites (fitness/ACE-style). All values in cm.
+# Bilateral parts have _left_cm and _right_cm.
+BODY_MEASUREMENT_SITES = (
+    "neck_cm",
+    "shoulder_cm",
+    "chest_cm",
+    "arm_left_cm",
+    "arm_right_cm",
+    "forearm_left_cm",
+    "forearm_right_cm",
+    "waist_cm",
+    "abdomen_cm",
+    "hips_cm",
+    "thigh_left_cm",
+    "thigh_right_cm",
+    "calf_left_cm",
+    "calf_right_cm",
+)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -23,50 +42,134 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Relationship to weights
-    weights = relationship("Weight", back_populates="user", cascade="all, delete-orphan")
     # Workout plans
     workout_plans = relationship("WorkoutPlan", back_populates="user", cascade="all, delete-orphan")
 
 
-class Weight(Base):
-    __tablename__ = "weights"
-
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    weight = Column(Float, nullable=False)
-    date = Column(Date, nullable=False, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    
-    # Relationship to user
-    user = relationship("User", back_populates="weights")
-
-
 class MetricEntry(Base):
     __tablename__ = "metric_entries"
-    __table_args__ = (UniqueConstraint("user_id", "metric_type", "date", name="uq_user_metric_date"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "metric_type", "date", name="uq_user_metric_date"),
+        # Unfiltered history: "WHERE user_id = ? ORDER BY date DESC"
+        Index("ix_metric_entries_user_date", "user_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     metric_type = Column(String, nullable=False, index=True)  # "weight", "muscle_index", etc.
     date = Column(Date, nullable=False, index=True)
-    value = Column(JSON, nullable=False)  # Flexible payload per metric type
+    # Flexible payload per metric type; weight {"kg"} also backs /weights.
+    # body_measurements keep {} here and their values in BodyMeasurement; use `value` for both.
+    _value = Column("value", JSON, nullable=False)
     source = Column(String, nullable=True)  # "device" | "calculated"
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship to user
     user = relationship("User", backref="metric_entries")
+    # Loaded on access. Queries that read body measurements in an async session selectinload it,
+    # since async sessions cannot lazy load.
+    body_measurement = relationship(
+        "BodyMeasurement", back_populates="entry", uselist=False, cascade="all, delete-orphan"
+    )
+
+    def __init__(self, value: dict = None, **kwargs):
+        # `value` lands in a different place per metric_type, so set it after every other column
+        super().__init__(**kwargs)
+        if value is not None:
+            self.value = value
+
+    @property
+    def value(self) -> dict:
+        if self.metric_type == "body_measurements":
+            return self.body_measurement.to_value() if self.body_measurement is not None else {}
+        return self._value
+
+    @value.setter
+    def value(self, value: dict) -> None:
+        if self.metric_type is None:
+            raise ValueError("Set metric_type before value")
+        if self.metric_type != "body_measurements":
+            self._value = value
+            return
+        unknown = set(value) - set(BODY_MEASUREMENT_SITES)
+        if unknown:
+            raise ValueError(f"Unknown body measurement sites: {sorted(unknown)}")
+        if self.body_measurement is None:
+            self.body_measurement = BodyMeasurement(user_id=self.user_id, date=self.date)
+        for site in BODY_MEASUREMENT_SITES:
+            setattr(self.body_measurement, site, value.get(site))
+        self._value = {}
+
+    @validates("user_id", "date")
+    def _sync_body_measurement_key(self, key, value):
+        # Checked in this order so weight/muscle_index rows never touch (or lazy-load) the relationship
+        if self.metric_type == "body_measurements" and self.body_measurement is not None:
+            setattr(self.body_measurement, key, value)
+        return value
+
+
+class BodyMeasurement(Base):
+    """Typed storage for body_measurements metric entries: one nullable column per site, in cm.
+
+    Each row belongs to a MetricEntry (which keeps the id, source and created_at that /metrics
+    exposes), and repeats user_id and date so per-site history is a single indexed query.
+    """
+    __tablename__ = "body_measurements"
+    __table_args__ = (UniqueConstraint("user_id", "date", name="uq_body_measurements_user_date"),)
+
+    metric_entry_id = Column(Integer, ForeignKey("metric_entries.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    neck_cm = Column(Float, nullable=True)
+    shoulder_cm = Column(Float, nullable=True)
+    chest_cm = Column(Float, nullable=True)
+    arm_left_cm = Column(Float, nullable=True)
+    arm_right_cm = Column(Float, nullable=True)
+    forearm_left_cm = Column(Float, nullable=True)
+    forearm_right_cm = Column(Float, nullable=True)
+    waist_cm = Column(Float, nullable=True)
+    abdomen_cm = Column(Float, nullable=True)
+    hips_cm = Column(Float, nullable=True)
+    thigh_left_cm = Column(Float, nullable=True)
+    thigh_right_cm = Column(Float, nullable=True)
+    calf_left_cm = Column(Float, nullable=True)
+    calf_right_cm = Column(Float, nullable=True)
+
+    entry = relationship("MetricEntry", back_populates="body_measurement")
+
+    def to_value(self) -> dict:
+        """The JSON shape /metrics has always returned: only the sites that were measured."""
+        return {site: getattr(self, site) for site in BODY_MEASUREMENT_SITES if getattr(self, site) is not None}
+
+
+class MetricSeriesBlock(Base):
+    """One user's numeric series for one metric and calendar year, packed (see app/series_blocks.py).
+
+    `days` holds little-endian uint16 day-of-year offsets in ascending order and `values` the
+    matching float32 values. Optional: maintained only when `series_blocks_enabled` is set.
+    """
+    __tablename__ = "metric_series_blocks"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    metric_type = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    days = Column(LargeBinary, nullable=False)
+    values = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Exercise(Base):
     __tablename__ = "exercises"
+    # Catalogue listing: global exercises (owner_id IS NULL) plus the user's own, ordered by name.
+    # IS NULL is an equality probe on the leading column, so one index serves both halves.
+    __table_args__ = (Index("ix_exercises_owner_name", "owner_id", "name"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     muscle_group = Column(String, nullable=True)
     equipment = Column(String, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     owner = relationship("User", backref="custom_exercises")
@@ -74,9 +177,11 @@ class Exercise(Base):
 
 class WorkoutPlan(Base):
     __tablename__ = "workout_plans"
+    # Lists go newest first by id (keyset pagination, see app/pagination.py)
+    __table_args__ = (Index("ix_workout_plans_user_by_id", "user_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     duration_value = Column(Integer, nullable=False)
@@ -117,12 +222,17 @@ class WorkoutPlanDay(Base):
 
 class WorkoutPlanExercise(Base):
     __tablename__ = "workout_plan_exercises"
+    __table_args__ = (
+        # Day loads are ordered by "order"
+        Index("ix_workout_plan_exercises_day_order", "plan_day_id", "order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     plan_day_id = Column(
-        Integer, ForeignKey("workout_plan_days.id", ondelete="CASCADE"), nullable=False, index=True
+        Integer, ForeignKey("workout_plan_days.id", ondelete="CASCADE"), nullable=False
     )
-    exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=False)
+    # Indexed for the "is this exercise used in a plan" check before deleting an exercise
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=False, index=True)
     order = Column(Integer, nullable=False, server_default="1")
     sets = Column(Integer, nullable=True)
     reps = Column(Integer, nullable=True)
@@ -141,9 +251,11 @@ class WorkoutPlanExercise(Base):
 
 class Goal(Base):
     __tablename__ = "goals"
+    # Lists go newest first by id (keyset pagination, see app/pagination.py)
+    __table_args__ = (Index("ix_goals_user_by_id", "user_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     target_date = Column(Date, nullable=True)
@@ -151,4 +263,56 @@ class Goal(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    user = relationship("User", backref="goals")
\ No newline at end of file
+    user = relationship("User", backref="goals")
+
+
+class RefreshToken(Base):
+    """Long-lived refresh token. Only a SHA-256 hash of the token is stored; times are naive UTC."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String, nullable=False, unique=True, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserShard(Base):
+    """Shard directory for `shard_strategy="directory"` (see app/sharding.py). Lives in the shared database."""
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Shared by the partial index and the claim query in app/email_outbox.py: the planner only uses a
+# partial index when the query repeats its predicate with literals, not bound parameters.
+EMAIL_OUTBOX_UNDELIVERED = "status IN ('pending', 'sending')"
+
+
+class EmailOutbox(Base):
+    """Outbound email queued for background delivery (see app/email_outbox.py). Times are naive UTC."""
+    __tablename__ = "email_outbox"
+    # Partial index: only undelivered rows, so it stays small as sent mail accumulates
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_due",
+            "next_attempt_at",
+            sqlite_where=text(EMAIL_OUTBOX_UNDELIVERED),
+            postgresql_where=text(EMAIL_OUTBOX_UNDELIVERED),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html = Column(Text, nullable=True)
+    text = Column(Text, nullable=True)
+    status = Column(String, nullable=False, default="pending", server_default="pending")  # pending | sending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(String, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
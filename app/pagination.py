@@ -0,0 +1,136 @@
+"""Keyset pagination for list endpoints and MCP list tools.
+
+A `Keyset` is a list ordering whose last column is unique, e.g. (date desc, id desc). A page is the
+first `limit` rows after the cursor in that order, found with a range condition on the ordering
+columns, so page 50 costs the same index probe as page 1 and rows inserted or deleted between
+requests never shift later pages. The cursor is the last row's key values as base64url JSON;
+clients pass it back unchanged.
+
+REST list routes return the page as the usual JSON array and put the next cursor in the
+`X-Next-Cursor` header (absent on the last page). MCP list tools return
+{"items": [...], "next_cursor": ...} when paginating. A request without `limit` or `cursor` gets
+every row (and MCP tools a plain list), as before pagination existed, unless
+`PAGINATION_ENABLED=true`, which pages it with `PAGE_DEFAULT_LIMIT` rows.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import and_, or_
+
+from app.config import settings
+from app.models import Exercise, Goal, MetricEntry, User, WorkoutPlan
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Keyset:
+    """Ordering for keyset pagination: (column, "asc" | "desc") pairs, the last one unique."""
+
+    def __init__(self, *keys: tuple):
+        self.keys = keys
+
+    def _decode(self, cursor: str) -> list:
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode() + b"=" * (-len(cursor) % 4)))
+            if not isinstance(raw, list) or len(raw) != len(self.keys):
+                raise ValueError
+            values = []
+            for (column, _), value in zip(self.keys, raw):
+                python_type = column.type.python_type
+                if python_type is datetime:
+                    values.append(datetime.fromisoformat(value))
+                elif python_type is date:
+                    values.append(date.fromisoformat(value))
+                else:
+                    values.append(python_type(value))
+            return values
+        except (ValueError, TypeError, json.JSONDecodeError) as e:
+            raise InvalidCursor("Invalid cursor") from e
+
+    def encode(self, row) -> str:
+        values = [getattr(row, column.key) for column, _ in self.keys]
+        raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def _after(self, values: list):
+        # (a, b) after (x, y)  ==  a beyond x  OR  (a = x AND b beyond y)
+        clauses = []
+        for i, ((column, direction), value) in enumerate(zip(self.keys, values)):
+            beyond = column < value if direction == "desc" else column > value
+            clauses.append(and_(*[c == v for (c, _), v in zip(self.keys[:i], values[:i])], beyond))
+        if len(clauses) == 1:
+            return clauses[0]
+        # Redundant bound on the leading column, so planners seek into the index instead of filtering
+        (first, direction), value = self.keys[0], values[0]
+        return and_(first <= value if direction == "desc" else first >= value, or_(*clauses))
+
+    def apply(self, query, page: "PageRequest"):
+        """Order a Select or ORM Query by the keyset, start after the cursor and fetch limit + 1 rows."""
+        query = query.order_by(*[c.desc() if d == "desc" else c.asc() for c, d in self.keys])
+        if page.cursor:
+            query = query.where(self._after(self._decode(page.cursor)))
+        if page.limit is not None:
+            query = query.limit(page.limit + 1)
+        return query
+
+    def split(self, rows: list, page: "PageRequest") -> tuple:
+        """(rows of this page, next cursor or None) from rows fetched with `apply`."""
+        if page.limit is None or len(rows) <= page.limit:
+            return rows, None
+        rows = rows[:page.limit]
+        return rows, self.encode(rows[-1])
+
+
+# Orderings shared by the list routes and MCP list tools. Goals and plans go newest first by id, which
+# follows created_at but compares exactly (SQLite keeps created_at as text without microseconds).
+METRICS_NEWEST_FIRST = Keyset((MetricEntry.date, "desc"), (MetricEntry.id, "desc"))
+GOALS_NEWEST_FIRST = Keyset((Goal.id, "desc"))
+PLANS_NEWEST_FIRST = Keyset((WorkoutPlan.id, "desc"))
+EXERCISES_BY_NAME = Keyset((Exercise.name, "asc"), (Exercise.id, "asc"))
+USERS_BY_ID = Keyset((User.id, "asc"))
+
+
+@dataclass(frozen=True)
+class PageRequest:
+    limit: Optional[int]  # None: every row (compatibility mode)
+    cursor: Optional[str] = None
+
+    @classmethod
+    def of(cls, limit: Optional[int] = None, cursor: Optional[str] = None) -> "PageRequest":
+        """Apply the default limit and bounds, for callers outside FastAPI (MCP tools)."""
+        if limit is None and (cursor or settings.pagination_enabled):
+            limit = settings.page_default_limit
+        if limit is not None:
+            limit = max(1, min(limit, settings.page_max_limit))
+        return cls(limit, cursor)
+
+
+def page_request(
+    limit: Optional[int] = Query(
+        None, ge=1, le=settings.page_max_limit, description="Page size (default: PAGE_DEFAULT_LIMIT)"
+    ),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+) -> PageRequest:
+    """Query parameters shared by list routes."""
+    return PageRequest.of(limit, cursor)
+
+
+def paginate(keyset: Keyset, query, page: PageRequest):
+    """`keyset.apply`, with a bad cursor reported as 400."""
+    try:
+        return keyset.apply(query, page)
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
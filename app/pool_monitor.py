@@ -0,0 +1,128 @@
+"""Connection pool telemetry for the sync and async engines.
+
+`PoolMonitor.attach(engine)` hooks SQLAlchemy pool and engine events to count connects, checkouts,
+invalidations and pre-ping failures. Checkout wait time is measured by `instrumented_pool`, a
+QueuePool subclass that times `_do_get` (the call that blocks when the pool is exhausted).
+Snapshots are exposed through `/health/ready` and `GET /admin/stats`.
+"""
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets; anything slower lands in "inf"
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+_WAIT_SAMPLES = 1024
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+class PoolMonitor:
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._wait_ms = deque(maxlen=_WAIT_SAMPLES)
+        self._histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.connects = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.pre_ping_failures = 0
+
+    def attach(self, engine: Engine) -> None:
+        """Listen on a sync Engine (for an AsyncEngine pass `async_engine.sync_engine`)."""
+        self.engine = engine
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "handle_error", self._on_error)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_error(self, context) -> None:
+        if getattr(context, "is_pre_ping", False):
+            with self._lock:
+                self.pre_ping_failures += 1
+
+    def record_wait(self, ms: float, timed_out: bool = False) -> None:
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self._wait_ms.append(ms)
+            self._histogram[bucket] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def saturation(self) -> float:
+        """Checked-out connections as a fraction of pool_size + max_overflow (0.0 for unbounded pools)."""
+        pool = self.engine.pool if self.engine is not None else None
+        if not isinstance(pool, QueuePool):
+            return 0.0
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        return round(pool.checkedout() / capacity, 3) if capacity else 0.0
+
+    def stats(self) -> dict:
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            wait_ms = list(self._wait_ms)
+            histogram = {str(bound): n for bound, n in zip(WAIT_BUCKETS_MS, self._histogram)}
+            histogram["inf"] = self._histogram[-1]
+            result = {
+                "pool": type(pool).__name__ if pool is not None else None,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "pre_ping_failures": self.pre_ping_failures,
+                "wait_ms": {"p50": _percentile(wait_ms, 50), "p95": _percentile(wait_ms, 95), "max": round(max(wait_ms, default=0.0), 2)},
+                "wait_ms_histogram": histogram,
+            }
+        if isinstance(pool, QueuePool):
+            result.update({
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow_in_use": max(pool.overflow(), 0),
+                "saturation": self.saturation(),
+            })
+        return result
+
+
+def instrumented_pool(pool_class: type, monitor: PoolMonitor) -> type:
+    """Subclass `pool_class` so every checkout reports its wait time to `monitor`.
+
+    The monitor lives on the class rather than the instance because `Pool.recreate()` (called by
+    `engine.dispose()`) rebuilds the pool from `self.__class__` without extra constructor arguments.
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = pool_class._do_get(self)
+        except PoolTimeoutError:
+            monitor.record_wait((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        monitor.record_wait((time.perf_counter() - start) * 1000)
+        return record
+
+    return type(f"Instrumented{pool_class.__name__}", (pool_class,), {"_do_get": _do_get})
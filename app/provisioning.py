@@ -0,0 +1,133 @@
+"""Bulk user provisioning (admin endpoint and `python -m app.cli provision-users`).
+
+Rows are validated up front, checked for username/email collisions with one set-based query,
+hashed in parallel across a process pool and inserted in batched transactions. Every input row
+gets its own result entry so callers can fix and resubmit only the failures.
+"""
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.auth import get_password_hash
+from app.config import settings
+from app.models import User
+from app.schemas import UserCreate
+
+# Keeps each IN (...) list well under SQLite/Postgres bind-parameter limits
+_LOOKUP_CHUNK = 5000
+
+
+def parse_csv(text: str) -> list:
+    """Parse CSV with a header row containing username, email, password."""
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def _error_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def _existing_identities(db: Session, usernames: list, emails: list) -> tuple:
+    taken_usernames, taken_emails = set(), set()
+    for start in range(0, max(len(usernames), len(emails)), _LOOKUP_CHUNK):
+        names = usernames[start:start + _LOOKUP_CHUNK]
+        mails = emails[start:start + _LOOKUP_CHUNK]
+        rows = db.execute(
+            select(User.username, User.email).where(or_(User.username.in_(names), User.email.in_(mails)))
+        ).all()
+        for username, email in rows:
+            taken_usernames.add(username)
+            if email:
+                taken_emails.add(email.lower())
+    return taken_usernames, taken_emails
+
+
+def _hash_all(passwords: list, workers: Optional[int]) -> list:
+    if len(passwords) < 2 or workers == 1:
+        return [get_password_hash(p) for p in passwords]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(get_password_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def _insert_batch(db: Session, batch: list, results: list) -> None:
+    """Insert one batch in a single transaction; on conflict fall back to row-by-row to isolate failures."""
+    values = [{"username": r["username"], "email": r["email"], "hashed_password": r["hashed_password"]} for r in batch]
+    try:
+        ids = db.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), values).all()
+        db.commit()
+        for r, user_id in zip(batch, ids):
+            results[r["row"]] = {"row": r["row"], "username": r["username"], "status": "created", "id": user_id}
+        return
+    except IntegrityError:
+        db.rollback()
+
+    # Someone registered a colliding user concurrently: retry individually
+    for r, v in zip(batch, values):
+        try:
+            user_id = db.scalar(insert(User).returning(User.id), v)
+            db.commit()
+            results[r["row"]] = {"row": r["row"], "username": r["username"], "status": "created", "id": user_id}
+        except IntegrityError:
+            db.rollback()
+            results[r["row"]] = {"row": r["row"], "username": r["username"], "status": "error", "error": "Username or email already registered"}
+
+
+def provision_users(
+    db: Session,
+    rows: Iterable[dict],
+    batch_size: Optional[int] = None,
+    hash_workers: Optional[int] = None,
+) -> dict:
+    """Create users from dicts with username, email and password. Returns a per-row report."""
+    rows = list(rows)
+    batch_size = batch_size or settings.provision_batch_size
+    if hash_workers is None:
+        hash_workers = settings.provision_hash_workers or None
+    results: list = [None] * len(rows)
+
+    # 1. Validate every row and reject duplicates within the payload itself
+    valid = []
+    seen_usernames, seen_emails = set(), set()
+    for i, raw in enumerate(rows):
+        try:
+            data = UserCreate.model_validate({k: raw.get(k) for k in ("username", "email", "password")})
+        except ValidationError as e:
+            results[i] = {"row": i, "username": raw.get("username"), "status": "error", "error": _error_message(e)}
+            continue
+        email = data.email.lower()
+        if data.username in seen_usernames or email in seen_emails:
+            results[i] = {"row": i, "username": data.username, "status": "error", "error": "Duplicate username or email in upload"}
+            continue
+        seen_usernames.add(data.username)
+        seen_emails.add(email)
+        valid.append({"row": i, "username": data.username, "email": data.email, "password": data.password})
+
+    # 2. One set-based collision check against existing users
+    taken_usernames, taken_emails = _existing_identities(
+        db, [r["username"] for r in valid], [r["email"] for r in valid]
+    )
+    pending = []
+    for r in valid:
+        if r["username"] in taken_usernames:
+            results[r["row"]] = {"row": r["row"], "username": r["username"], "status": "error", "error": "Username already registered"}
+        elif r["email"].lower() in taken_emails:
+            results[r["row"]] = {"row": r["row"], "username": r["username"], "status": "error", "error": "Email already registered"}
+        else:
+            pending.append(r)
+
+    # 3. Hash in parallel, 4. insert in batched transactions
+    hashes = _hash_all([r.pop("password") for r in pending], hash_workers)
+    for r, hashed in zip(pending, hashes):
+        r["hashed_password"] = hashed
+    for start in range(0, len(pending), batch_size):
+        _insert_batch(db, pending[start:start + batch_size], results)
+
+    created = sum(1 for r in results if r["status"] == "created")
+    return {"total": len(rows), "created": created, "failed": len(rows) - created, "results": results}
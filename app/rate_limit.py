@@ -0,0 +1,103 @@
+"""Token-bucket throttling for expensive unauthenticated endpoints (login, forgot-password).
+
+`RateLimiter` talks to a `RateLimitBackend`. The default backend keeps buckets in process memory,
+which is fine for a single instance; a shared store (e.g. Redis) can be plugged in by implementing
+`RateLimitBackend.consume` and calling `rate_limiter.set_backend(...)` at startup.
+
+A hit takes a token from every bucket it matches, or from none: a request rejected by one rule
+(say, per IP) must not drain another (the victim's per-username bucket).
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence, Tuple
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Allow `capacity` hits per `period_seconds`, refilled continuously."""
+    capacity: int
+    period_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def consume(self, rules: Sequence[Tuple[str, RateLimit]]) -> float:
+        """Take one token from the bucket of every (key, limit) rule if all of them have one, else none.
+
+        Returns 0 if the hit is allowed, otherwise the number of seconds until every bucket has a token.
+        """
+
+
+class InMemoryTokenBucketBackend(RateLimitBackend):
+    """Process-local buckets. Idle buckets are pruned in batches once more than `max_keys` are tracked."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (tokens, last update, period of the bucket's limit)
+        self._buckets: dict = {}
+        self._prune_at = max_keys
+        self._lock = threading.Lock()
+
+    def consume(self, rules: Sequence[Tuple[str, RateLimit]]) -> float:
+        now = time.monotonic()
+        with self._lock:
+            refilled, wait = [], 0.0
+            for key, limit in rules:
+                tokens, updated, _ = self._buckets.get(key, (float(limit.capacity), now, limit.period_seconds))
+                tokens = min(float(limit.capacity), tokens + (now - updated) * limit.refill_per_second)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / limit.refill_per_second)
+                refilled.append((key, limit, tokens))
+            for key, limit, tokens in refilled:
+                self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now, limit.period_seconds)
+            if len(self._buckets) > self._prune_at:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle for a full period of their own limit have refilled completely and carry no
+        # state worth keeping
+        stale = [k for k, (_, updated, period) in self._buckets.items() if now - updated >= period]
+        for k in stale:
+            del self._buckets[k]
+        # Scan again only after the live set has doubled, so the scan costs O(1) per hit amortised
+        self._prune_at = max(self.max_keys, 2 * len(self._buckets))
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.allowed = 0
+        self.rejected = 0
+
+    def set_backend(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+
+    def check(self, rules: Iterable[Tuple[str, RateLimit]]) -> Optional[int]:
+        """Consume one hit from every (key, limit) rule, or from none if any bucket is empty.
+
+        Returns None if allowed, otherwise a Retry-After value in whole seconds.
+        """
+        if not self.enabled:
+            return None
+        wait = self.backend.consume(list(rules))
+        if wait > 0:
+            self.rejected += 1
+            return max(1, int(wait + 0.999))
+        self.allowed += 1
+        return None
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "backend": type(self.backend).__name__, "allowed": self.allowed, "rejected": self.rejected}
+
+
+rate_limiter = RateLimiter(InMemoryTokenBucketBackend(), enabled=settings.rate_limit_enabled)
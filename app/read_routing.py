@@ -0,0 +1,60 @@
+"""Read-replica routing with read-your-writes pinning.
+
+Read-only handlers take their session from `get_read_db` / `get_async_read_db` (app/dependencies.py)
+and read-only MCP tools from `_read_db`. These sessions use the replica configured by
+`DATABASE_READ_URL`. The exception is a user who committed a write in the last
+`read_after_write_pin_seconds`: their reads go to the primary, so replication lag never hides
+their own changes.
+
+A write is detected when a session commits a transaction that flushed ORM changes or ran DML. The
+writer is identified from `session.info["user_id"]` (set by MCP tools), or else from the
+`request_user_id` context variable that `get_current_user` sets for every API request. Pins are
+per-process, so with several instances a user may still read from the replica on another
+instance inside the window.
+"""
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.cache import TTLCache
+from app.config import settings
+from app.database import database_read_url
+from app.db_resilience import RetryingSession
+
+request_user_id: ContextVar[Optional[int]] = ContextVar("request_user_id", default=None)
+
+write_pins = TTLCache(maxsize=settings.read_pin_max_size, ttl=settings.read_after_write_pin_seconds)
+
+_lock = threading.Lock()
+_routed = {"replica": 0, "primary_pinned": 0}
+
+
+def pin_to_primary(user_id: int) -> None:
+    write_pins.set(user_id, True)
+
+
+def use_replica(user_id: Optional[int]) -> bool:
+    """Decide where this user's reads go right now. Always False when no replica is configured."""
+    if not database_read_url:
+        return False
+    pinned = user_id is not None and write_pins.get(user_id) is not None
+    with _lock:
+        _routed["primary_pinned" if pinned else "replica"] += 1
+    return not pinned
+
+
+@event.listens_for(RetryingSession, "after_commit")
+def _pin_writer(session) -> None:
+    if not session.info.get("_wrote"):
+        return
+    user_id = session.info.get("user_id") or request_user_id.get()
+    if user_id is not None:
+        pin_to_primary(user_id)
+
+
+def stats() -> dict:
+    with _lock:
+        routed = dict(_routed)
+    return {"replica_configured": bool(database_read_url), "routed": routed, "pins": write_pins.stats()}
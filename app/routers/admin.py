@@ -1,65 +1,136 @@
+import json
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import async_pool_monitor, get_async_db, get_db, pool_keepalive, sqlite_maintenance, sync_pool_monitor
 from app.models import User
-from app.schemas import AdminUserResponse
-from app.auth import get_current_user_id
+from app.schemas import AccountDeletionStatus, AdminUserResponse, BulkProvisionResponse
+from app.config import settings
+from app.provisioning import parse_csv, provision_users
+from app.account_deletion import account_deletions
+from app.pagination import USERS_BY_ID, PageRequest, page_request, paginate, set_next_cursor
+from app.auth import jwt_cache
+from app.dependencies import CurrentUser, get_admin_user, get_async_read_db, principal_cache
+from app.email_outbox import email_dispatcher
+from app.hashing import password_hasher
+from app.rate_limit import rate_limiter
+from app import read_routing
+from app.sharding import shard_router
 
 router = APIRouter()
-security = HTTPBearer()
 
 
-def get_admin_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current user and verify they are an admin."""
-    token = credentials.credentials
-    user_id = get_current_user_id(token)
+@router.get("/admin/users", response_model=List[AdminUserResponse])
+async def list_users(
+    response: Response,
+    admin: CurrentUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    page: PageRequest = Depends(page_request),
+):
+    """List users with their profile data, by id. Admin only. Paginated via `limit` and `cursor`."""
+    rows = (await db.execute(paginate(USERS_BY_ID, select(User), page))).scalars().all()
+    users, next_cursor = USERS_BY_ID.split(rows, page)
+    set_next_cursor(response, next_cursor)
+    return users
 
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+@router.post("/admin/users/bulk", response_model=BulkProvisionResponse)
+async def bulk_create_users(
+    request: Request,
+    admin: CurrentUser = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Provision many users at once. Admin only.
+    Body is either JSON (a list of {username, email, password}, or {"users": [...]})
+    or CSV with Content-Type text/csv and a header row: username,email,password.
+    Each row is reported as created or error; valid rows are created even if others fail.
+    """
+    body = (await request.body()).decode("utf-8-sig")
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        rows = parse_csv(body)
+    else:
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be JSON or text/csv.")
+        rows = payload.get("users") if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a list of user objects.")
 
-    if not user.is_admin:
+    if len(rows) > settings.provision_max_rows:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required."
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.provision_max_rows} users per request."
         )
-
-    return user
-
-
-@router.get("/admin/users", response_model=List[AdminUserResponse])
-async def list_users(
-    admin: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
-):
-    """List all users with their profile data. Admin only."""
-    return db.query(User).order_by(User.id).all()
+    return await run_in_threadpool(provision_users, db, rows)
 
 
 @router.get("/admin/users/{user_id}", response_model=AdminUserResponse)
 async def get_user(
     user_id: int,
-    admin: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    admin: CurrentUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific user's profile by ID. Admin only."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
     return user
+
+
+@router.delete("/admin/users/{user_id}", response_model=AccountDeletionStatus, status_code=status.HTTP_202_ACCEPTED)
+async def delete_user(
+    user_id: int,
+    background_tasks: BackgroundTasks,
+    admin: CurrentUser = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Delete a user and all their data in the background. Admin only.
+    Returns a job; poll GET /admin/deletions/{job_id} for per-table progress.
+    """
+    if user_id == admin.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Admins cannot delete their own account.")
+    if (await db.execute(select(User.id).where(User.id == user_id))).scalar() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+    job, created = account_deletions.submit(user_id)
+    if created:
+        background_tasks.add_task(account_deletions.run, job)
+    return job.to_dict()
+
+
+@router.get("/admin/deletions/{job_id}", response_model=AccountDeletionStatus)
+async def get_deletion(
+    job_id: str,
+    admin: CurrentUser = Depends(get_admin_user)
+):
+    """Status of an account deletion job started by this process. Admin only."""
+    job = account_deletions.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deletion job not found.")
+    return job.to_dict()
+
+
+@router.get("/admin/stats")
+async def get_stats(
+    admin: CurrentUser = Depends(get_admin_user)
+):
+    """Runtime cache and performance counters for this process. Admin only."""
+    return {
+        "user_cache": principal_cache.stats(),
+        "jwt_cache": jwt_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "email_outbox": email_dispatcher.stats(),
+        "db_pool": {"async": async_pool_monitor.stats(), "sync": sync_pool_monitor.stats()},
+        "db_keepalive": pool_keepalive.stats(),
+        "read_routing": read_routing.stats(),
+        "sqlite_maintenance": sqlite_maintenance.stats(),
+        "account_deletions": account_deletions.stats(),
+        "sharding": shard_router.stats() if shard_router is not None else None,
+    }
@@ -1,34 +1,107 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User
-from app.schemas import Token, UserLogin, UserCreate, UserResponse, ForgotPasswordRequest, ResetPasswordRequest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import User, RefreshToken
+from app.schemas import (
+    Token,
+    UserLogin,
+    UserCreate,
+    UserResponse,
+    ForgotPasswordRequest,
+    ResetPasswordRequest,
+    RefreshRequest,
+)
 from app.auth import (
-    verify_password,
-    get_password_hash,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS,
     create_password_reset_token,
     verify_password_reset_token,
+    generate_refresh_token,
+    hash_refresh_token,
 )
-from app.email import send_password_reset_email
+from app.email import build_password_reset_email
+from app.email_outbox import email_dispatcher, enqueue_email
 from app.config import settings
+from app.hashing import password_hasher, PasswordHashingBusy
+from app.rate_limit import RateLimit, rate_limiter
 
 router = APIRouter()
 
+LOGIN_LIMIT_PER_USERNAME = RateLimit(settings.login_limit_per_username_per_minute, 60)
+LOGIN_LIMIT_PER_IP = RateLimit(settings.login_limit_per_ip_per_minute, 60)
+FORGOT_PASSWORD_LIMIT_PER_EMAIL = RateLimit(settings.forgot_password_limit_per_email_per_hour, 3600)
+FORGOT_PASSWORD_LIMIT_PER_IP = RateLimit(settings.forgot_password_limit_per_ip_per_hour, 3600)
+
+
+def _client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client address
+    return request.client.host if request.client else "unknown"
+
+
+def _throttle(rules) -> None:
+    """Reject with 429 if any bucket is empty. Must run before any password hashing or email send."""
+    retry_after = rate_limiter.check(rules)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts. Please try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def _hashing_busy(exc: PasswordHashingBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy. Please try again shortly.",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def _issue_tokens(user: User, db: AsyncSession) -> dict:
+    """Create a short-lived access token and a new long-lived refresh token for the user."""
+    access_token = create_access_token(
+        data={"sub": user.username, "user_id": user.id},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = generate_refresh_token()
+    db.add(RefreshToken(
+        user_id=user.id,
+        token_hash=hash_refresh_token(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    await db.commit()
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+async def _revoke_refresh_tokens(user_id: int, db: AsyncSession) -> None:
+    """Revoke every active refresh token for a user (caller commits)."""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
 
 @router.post("/login", response_model=Token)
 async def login(
     user_credentials: UserLogin,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Authenticate user and return JWT token
     """
+    _throttle([
+        (f"login:user:{user_credentials.username.lower()}", LOGIN_LIMIT_PER_USERNAME),
+        (f"login:ip:{_client_ip(http_request)}", LOGIN_LIMIT_PER_IP),
+    ])
+
     # Find user by username
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    user = (await db.execute(select(User).where(User.username == user_credentials.username))).scalars().first()
     
     if not user:
         raise HTTPException(
@@ -37,28 +110,95 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verify password
-    if not verify_password(user_credentials.password, user.hashed_password):
+    # Verify password (off the event loop)
+    try:
+        password_ok, new_hash = await password_hasher.verify_and_update(
+            user_credentials.password, user.hashed_password
+        )
+    except PasswordHashingBusy as e:
+        raise _hashing_busy(e)
+
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username, "user_id": user.id},
-        expires_delta=access_token_expires
+
+    # Transparently upgrade hashes created with a different bcrypt cost (committed with the tokens)
+    if new_hash is not None:
+        user.hashed_password = new_hash
+
+    return await _issue_tokens(user, db)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    request: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Exchange a refresh token for a new access token. The refresh token is rotated: the one sent
+    is revoked and a new one is returned. Reusing a revoked token revokes all of the user's sessions.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    stored = (await db.execute(select(RefreshToken).where(
+        RefreshToken.token_hash == hash_refresh_token(request.refresh_token)
+    ))).scalars().first()
+    if stored is None:
+        raise invalid
+
+    now = datetime.utcnow()
+    if stored.revoked_at is None and stored.expires_at <= now:
+        raise invalid
+
+    user = (await db.execute(select(User).where(User.id == stored.user_id))).scalars().first()
+    if user is None:
+        raise invalid
+
+    # Revoke only if still active, so of two concurrent refreshes with one token exactly one wins
+    rotated = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == stored.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if rotated.rowcount == 0:
+        # A rotated token came back: assume it was stolen and end every session for this user
+        await _revoke_refresh_tokens(stored.user_id, db)
+        await db.commit()
+        raise invalid
+    return await _issue_tokens(user, db)
+
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(
+    request: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Revoke a refresh token. Access tokens already issued stay valid until they expire.
+    """
+    await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(request.refresh_token),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=datetime.utcnow())
+    )
+    await db.commit()
+    return {"message": "Logged out."}
 
 
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user (useful for development)
@@ -73,7 +213,7 @@ async def register(
                 )
 
         # Check if username already exists
-        existing_user = db.query(User).filter(User.username == user_data.username).first()
+        existing_user = (await db.execute(select(User).where(User.username == user_data.username))).scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -81,7 +221,7 @@ async def register(
             )
 
         # Check if email already exists
-        existing_email = db.query(User).filter(User.email == user_data.email).first()
+        existing_email = (await db.execute(select(User).where(User.email == user_data.email))).scalars().first()
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -97,7 +237,10 @@ async def register(
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        try:
+            hashed_password = await password_hasher.hash(user_data.password)
+        except PasswordHashingBusy as e:
+            raise _hashing_busy(e)
         new_user = User(
             username=user_data.username,
             hashed_password=hashed_password,
@@ -105,14 +248,14 @@ async def register(
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         return new_user
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating user: {str(e)}"
@@ -122,22 +265,30 @@ async def register(
 @router.post("/forgot-password", status_code=status.HTTP_200_OK)
 async def forgot_password(
     request: ForgotPasswordRequest,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send a password reset email. Always returns 200 to avoid leaking whether an email is registered.
     """
-    user = db.query(User).filter(User.email == request.email).first()
+    _throttle([
+        (f"forgot:email:{request.email.lower()}", FORGOT_PASSWORD_LIMIT_PER_EMAIL),
+        (f"forgot:ip:{_client_ip(http_request)}", FORGOT_PASSWORD_LIMIT_PER_IP),
+    ])
+
+    user = (await db.execute(select(User).where(User.email == request.email))).scalars().first()
     if user:
         reset_token = create_password_reset_token(user.id)
-        send_password_reset_email(to_email=user.email, reset_token=reset_token)
+        enqueue_email(db, build_password_reset_email(to_email=user.email, reset_token=reset_token))
+        await db.commit()
+        email_dispatcher.wake()
     return {"message": "If that email is registered, a reset link has been sent."}
 
 
 @router.post("/reset-password", status_code=status.HTTP_200_OK)
 async def reset_password(
     request: ResetPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Reset password using a valid reset token.
@@ -149,13 +300,17 @@ async def reset_password(
             detail="Invalid or expired reset token."
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User not found."
         )
 
-    user.hashed_password = get_password_hash(request.new_password)
-    db.commit()
+    try:
+        user.hashed_password = await password_hasher.hash(request.new_password)
+    except PasswordHashingBusy as e:
+        raise _hashing_busy(e)
+    await _revoke_refresh_tokens(user.id, db)
+    await db.commit()
     return {"message": "Password reset successfully."}
@@ -1,39 +1,15 @@
 """Goals API. All routes require JWT."""
 from datetime import date
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import User, Goal
+from app.models import Goal
 from app.schemas import GoalCreate, GoalUpdate, GoalResponse
-from app.auth import get_current_user_id
+from app.dependencies import CurrentUser, get_current_user, get_user_db, get_user_read_db
+from app.pagination import GOALS_NEWEST_FIRST, PageRequest, page_request, paginate, set_next_cursor
 
 router = APIRouter()
-security = HTTPBearer()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    token = credentials.credentials
-    user_id = get_current_user_id(token)
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return user
 
 
 def _to_response(goal: Goal) -> GoalResponse:
@@ -51,21 +27,25 @@ def _to_response(goal: Goal) -> GoalResponse:
 
 @router.get("/goals", response_model=List[GoalResponse])
 def list_goals(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
     is_achieved: bool | None = Query(None, description="Filter by achieved status"),
+    page: PageRequest = Depends(page_request),
 ):
     q = db.query(Goal).filter(Goal.user_id == current_user.id)
     if is_achieved is not None:
         q = q.filter(Goal.is_achieved == is_achieved)
-    return [_to_response(g) for g in q.order_by(Goal.created_at.desc()).all()]
+    goals, next_cursor = GOALS_NEWEST_FIRST.split(paginate(GOALS_NEWEST_FIRST, q, page).all(), page)
+    set_next_cursor(response, next_cursor)
+    return [_to_response(g) for g in goals]
 
 
 @router.post("/goals", response_model=GoalResponse, status_code=status.HTTP_201_CREATED)
 def create_goal(
     data: GoalCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     target_date = date.fromisoformat(data.target_date) if data.target_date else None
     goal = Goal(
@@ -83,8 +63,8 @@ def create_goal(
 @router.get("/goals/{goal_id}", response_model=GoalResponse)
 def get_goal(
     goal_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
 ):
     goal = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == current_user.id).first()
     if not goal:
@@ -96,8 +76,8 @@ def get_goal(
 def update_goal(
     goal_id: int,
     data: GoalUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     goal = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == current_user.id).first()
     if not goal:
@@ -118,8 +98,8 @@ def update_goal(
 @router.delete("/goals/{goal_id}", status_code=status.HTTP_200_OK)
 def delete_goal(
     goal_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     goal = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == current_user.id).first()
     if not goal:
@@ -1,46 +1,36 @@
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import MetricEntry, User
-from app.schemas import MetricCreate, MetricUpdate, MetricResponse, validate_metric_value
-from app.auth import get_current_user_id
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.config import settings
+from app.metric_batch import upsert_metric_batch
+from app.models import BODY_MEASUREMENT_SITES, BodyMeasurement, MetricEntry
+from app.schemas import (
+    BodyMeasurementPoint,
+    MetricBatchResponse,
+    MetricCreate,
+    MetricResponse,
+    MetricSeriesResponse,
+    MetricUpdate,
+    validate_metric_value,
+)
+from app.series_blocks import SERIES_METRICS, Series, block_query
+from app.dependencies import CurrentUser, get_async_user_db, get_async_user_read_db, get_current_user
+from app.pagination import METRICS_NEWEST_FIRST, PageRequest, page_request, paginate, set_next_cursor
 
 router = APIRouter()
-security = HTTPBearer()
 
+# Entries read here may be body measurements, whose values live on the related row
+WITH_BODY_MEASUREMENT = selectinload(MetricEntry.body_measurement)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
-    token = credentials.credentials
-    user_id = get_current_user_id(token)
 
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    return user
-
-
-def _verify_metric_ownership(metric_id: int, current_user: User, db: Session) -> MetricEntry:
+async def _verify_metric_ownership(metric_id: int, current_user: CurrentUser, db: AsyncSession) -> MetricEntry:
     """Verify that the metric entry exists and belongs to the current user."""
-    entry = db.query(MetricEntry).filter(MetricEntry.id == metric_id).first()
+    entry = (await db.execute(
+        select(MetricEntry).options(WITH_BODY_MEASUREMENT).where(MetricEntry.id == metric_id)
+    )).scalars().first()
 
     if not entry:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metric entry not found")
@@ -54,6 +44,22 @@ def _verify_metric_ownership(metric_id: int, current_user: User, db: Session) ->
     return entry
 
 
+async def _refresh(db: AsyncSession, entry: MetricEntry) -> None:
+    """Reload an entry after commit, with the body measurement an async session cannot lazy load."""
+    await db.refresh(entry)
+    if entry.metric_type == "body_measurements":
+        await db.refresh(entry, ["body_measurement"])
+
+
+def _parse_query_date(value: Optional[str], name: str):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} format. Use YYYY-MM-DD.")
+
+
 def _metric_to_response(entry: MetricEntry) -> MetricResponse:
     return MetricResponse(
         id=entry.id,
@@ -69,8 +75,8 @@ def _metric_to_response(entry: MetricEntry) -> MetricResponse:
 @router.post("/metrics", response_model=MetricResponse, status_code=status.HTTP_201_CREATED)
 async def create_metric(
     data: MetricCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db),
 ):
     """
     Create or update a metric entry. One entry per (user, metric_type, date).
@@ -88,20 +94,20 @@ async def create_metric(
         )
 
     existing = (
-        db.query(MetricEntry)
-        .filter(
-            MetricEntry.user_id == current_user.id,
-            MetricEntry.metric_type == data.metric_type,
-            MetricEntry.date == metric_date,
+        await db.execute(
+            select(MetricEntry).options(WITH_BODY_MEASUREMENT).where(
+                MetricEntry.user_id == current_user.id,
+                MetricEntry.metric_type == data.metric_type,
+                MetricEntry.date == metric_date,
+            )
         )
-        .first()
-    )
+    ).scalars().first()
 
     if existing:
         existing.value = data.value
         existing.source = data.source
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
+        await _refresh(db, existing)
         return _metric_to_response(existing)
 
     entry = MetricEntry(
@@ -112,53 +118,164 @@ async def create_metric(
         source=data.source,
     )
     db.add(entry)
-    db.commit()
-    db.refresh(entry)
+    await db.commit()
+    await _refresh(db, entry)
     return _metric_to_response(entry)
 
 
+@router.post("/metrics/batch", response_model=MetricBatchResponse, response_model_exclude_none=True)
+async def create_metrics_batch(
+    items: List[dict] = Body(..., description="Entries of {metric_type, date, value, source?}, types may be mixed"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db),
+):
+    """
+    Create or update many metric entries at once, e.g. a device sync. Each item is shaped like the
+    body of POST /metrics and is upserted on (metric_type, date) the same way. Invalid items are
+    rejected with a reason; all valid items are written in one transaction. Returns a status per
+    item (inserted, updated or rejected), in request order, with the entry id when written.
+    """
+    if len(items) > settings.metric_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.metric_batch_max_items} entries per request.",
+        )
+    report = await db.run_sync(upsert_metric_batch, current_user.id, items)
+    await db.commit()
+    return report
+
+
 @router.get("/metrics", response_model=List[MetricResponse])
 async def list_metrics(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_read_db),
     metric_type: Optional[str] = Query(None, description="Filter by metric_type (weight, muscle_index, body_measurements)"),
     date_from: Optional[str] = Query(None, description="Filter from date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Filter to date (YYYY-MM-DD)"),
+    page: PageRequest = Depends(page_request),
 ):
     """
-    List metric entries for the authenticated user. Optionally filter by metric_type and date range.
+    List metric entries for the authenticated user, newest first. Optionally filter by metric_type and date range.
+    Paginated: pass the X-Next-Cursor response header back as `cursor` for the next page.
     """
-    query = db.query(MetricEntry).filter(MetricEntry.user_id == current_user.id)
+    query = select(MetricEntry).options(WITH_BODY_MEASUREMENT).where(MetricEntry.user_id == current_user.id)
 
     if metric_type:
-        query = query.filter(MetricEntry.metric_type == metric_type)
+        query = query.where(MetricEntry.metric_type == metric_type)
 
     if date_from:
         try:
             from_date = datetime.strptime(date_from, "%Y-%m-%d").date()
-            query = query.filter(MetricEntry.date >= from_date)
+            query = query.where(MetricEntry.date >= from_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date_from format. Use YYYY-MM-DD.")
 
     if date_to:
         try:
             to_date = datetime.strptime(date_to, "%Y-%m-%d").date()
-            query = query.filter(MetricEntry.date <= to_date)
+            query = query.where(MetricEntry.date <= to_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date_to format. Use YYYY-MM-DD.")
 
-    entries = query.order_by(MetricEntry.date.desc()).all()
+    rows = (await db.execute(paginate(METRICS_NEWEST_FIRST, query, page))).scalars().all()
+    entries, next_cursor = METRICS_NEWEST_FIRST.split(rows, page)
+    set_next_cursor(response, next_cursor)
     return [_metric_to_response(e) for e in entries]
 
 
+@router.get("/metrics/body-measurements/{site}", response_model=List[BodyMeasurementPoint])
+async def body_measurement_history(
+    site: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_read_db),
+    date_from: Optional[str] = Query(None, description="Filter from date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Filter to date (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, description="Return at most this many points (limit=1 gives the latest)"),
+):
+    """
+    History of one body measurement site (e.g. waist_cm), newest first. Days where the site was not
+    measured are skipped. Answered from the typed body_measurements table, without reading JSON.
+    """
+    if site not in BODY_MEASUREMENT_SITES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown site '{site}'. Allowed: {list(BODY_MEASUREMENT_SITES)}",
+        )
+    from_date = _parse_query_date(date_from, "date_from")
+    to_date = _parse_query_date(date_to, "date_to")
+    column = getattr(BodyMeasurement, site)
+    query = select(BodyMeasurement.date, column).where(
+        BodyMeasurement.user_id == current_user.id,
+        column.is_not(None),
+    )
+    if from_date:
+        query = query.where(BodyMeasurement.date >= from_date)
+    if to_date:
+        query = query.where(BodyMeasurement.date <= to_date)
+
+    query = query.order_by(BodyMeasurement.date.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    rows = (await db.execute(query)).all()
+    return [BodyMeasurementPoint(date=d.isoformat(), value_cm=v) for d, v in rows]
+
+
+@router.get("/metrics/series/{metric_type}", response_model=MetricSeriesResponse)
+async def metric_series(
+    metric_type: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_read_db),
+    date_from: Optional[str] = Query(None, description="From date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="To date (YYYY-MM-DD)"),
+):
+    """
+    Full history of a numeric metric (weight in kg, muscle_index) as parallel date/value arrays,
+    oldest first. Meant for charts. With series blocks enabled, this reads one packed row per year
+    (values are stored as float32) instead of one row per day.
+    """
+    if metric_type not in SERIES_METRICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No series for '{metric_type}'. Allowed: {list(SERIES_METRICS)}",
+        )
+    from_date = _parse_query_date(date_from, "date_from")
+    to_date = _parse_query_date(date_to, "date_to")
+
+    if settings.series_blocks_enabled:
+        rows = (await db.execute(block_query(current_user.id, metric_type, from_date, to_date))).scalars().all()
+        points = Series.from_rows(rows).slice(from_date, to_date).points()
+        dates, values = [], []
+        for d, v in points:
+            dates.append(d.isoformat())
+            values.append(round(v, 3))
+        return MetricSeriesResponse(metric_type=metric_type, dates=dates, values=values)
+
+    query = select(MetricEntry.date, MetricEntry._value).where(
+        MetricEntry.user_id == current_user.id,
+        MetricEntry.metric_type == metric_type,
+    )
+    if from_date:
+        query = query.where(MetricEntry.date >= from_date)
+    if to_date:
+        query = query.where(MetricEntry.date <= to_date)
+    rows = (await db.execute(query.order_by(MetricEntry.date))).all()
+    key = SERIES_METRICS[metric_type]
+    return MetricSeriesResponse(
+        metric_type=metric_type,
+        dates=[d.isoformat() for d, _ in rows],
+        values=[v[key] for _, v in rows],
+    )
+
+
 @router.get("/metrics/{metric_id}", response_model=MetricResponse)
 async def get_metric(
     metric_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_read_db),
 ):
     """Get a single metric entry by ID."""
-    entry = _verify_metric_ownership(metric_id, current_user, db)
+    entry = await _verify_metric_ownership(metric_id, current_user, db)
     return _metric_to_response(entry)
 
 
@@ -166,14 +283,14 @@ async def get_metric(
 async def update_metric(
     metric_id: int,
     data: MetricUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db),
 ):
     """
     Update a metric entry. If changing date, the new date must not have an existing entry
     for the same metric_type. For body_measurements, value is merged with existing (partial update).
     """
-    entry = _verify_metric_ownership(metric_id, current_user, db)
+    entry = await _verify_metric_ownership(metric_id, current_user, db)
 
     if data.value is not None:
         if entry.metric_type == "body_measurements" and isinstance(entry.value, dict):
@@ -193,15 +310,15 @@ async def update_metric(
 
         if new_date != entry.date:
             existing = (
-                db.query(MetricEntry)
-                .filter(
-                    MetricEntry.user_id == current_user.id,
-                    MetricEntry.metric_type == entry.metric_type,
-                    MetricEntry.date == new_date,
-                    MetricEntry.id != metric_id,
+                await db.execute(
+                    select(MetricEntry).where(
+                        MetricEntry.user_id == current_user.id,
+                        MetricEntry.metric_type == entry.metric_type,
+                        MetricEntry.date == new_date,
+                        MetricEntry.id != metric_id,
+                    )
                 )
-                .first()
-            )
+            ).scalars().first()
             if existing:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -209,19 +326,19 @@ async def update_metric(
                 )
             entry.date = new_date
 
-    db.commit()
-    db.refresh(entry)
+    await db.commit()
+    await _refresh(db, entry)
     return _metric_to_response(entry)
 
 
 @router.delete("/metrics/{metric_id}", status_code=status.HTTP_200_OK)
 async def delete_metric(
     metric_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db),
 ):
     """Delete a metric entry."""
-    entry = _verify_metric_ownership(metric_id, current_user, db)
-    db.delete(entry)
-    db.commit()
+    entry = await _verify_metric_ownership(metric_id, current_user, db)
+    await db.delete(entry)
+    await db.commit()
     return {"message": f"Metric entry with id {metric_id} has been successfully deleted"}
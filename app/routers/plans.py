@@ -1,14 +1,11 @@
 """Workout plans and exercises API. All routes require JWT."""
 from datetime import date, datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
 
-from app.database import get_db
 from app.models import (
-    User,
     Exercise,
     WorkoutPlan,
     WorkoutPlanDay,
@@ -28,39 +25,24 @@ from app.schemas import (
     WorkoutPlanExerciseUpdate,
     WorkoutPlanExerciseResponse,
 )
-from app.auth import get_current_user_id
+from app.dependencies import CurrentUser, get_current_user, get_user_db, get_user_read_db
+from app.pagination import (
+    EXERCISES_BY_NAME,
+    PLANS_NEWEST_FIRST,
+    PageRequest,
+    page_request,
+    paginate,
+    set_next_cursor,
+)
 
 router = APIRouter()
-security = HTTPBearer()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    token = credentials.credentials
-    user_id = get_current_user_id(token)
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return user
 
 
-def _exercise_visible_to_user(exercise: Exercise, user: User) -> bool:
+def _exercise_visible_to_user(exercise: Exercise, user: CurrentUser) -> bool:
     return exercise.owner_id is None or exercise.owner_id == user.id
 
 
-def _exercise_editable_by_user(exercise: Exercise, user: User) -> bool:
+def _exercise_editable_by_user(exercise: Exercise, user: CurrentUser) -> bool:
     return exercise.owner_id is not None and exercise.owner_id == user.id
 
 
@@ -93,6 +75,28 @@ def _to_plan_summary(plan: WorkoutPlan, day_count: int) -> WorkoutPlanSummary:
     )
 
 
+def _plan_tree():
+    """Eager-load days -> exercises -> exercise in three queries so `_to_plan_response` never lazy-loads per row."""
+    return selectinload(WorkoutPlan.days).selectinload(WorkoutPlanDay.exercises).selectinload(WorkoutPlanExercise.exercise)
+
+
+def _load_plan_tree(db: Session, plan_id: int) -> WorkoutPlan:
+    return db.query(WorkoutPlan).options(_plan_tree()).filter(WorkoutPlan.id == plan_id).one()
+
+
+def _day_counts(db: Session, plan_ids: list) -> dict:
+    """Day count per plan id in one grouped query."""
+    if not plan_ids:
+        return {}
+    rows = (
+        db.query(WorkoutPlanDay.plan_id, func.count(WorkoutPlanDay.id))
+        .filter(WorkoutPlanDay.plan_id.in_(plan_ids))
+        .group_by(WorkoutPlanDay.plan_id)
+        .all()
+    )
+    return dict(rows)
+
+
 def _to_plan_response(plan: WorkoutPlan) -> WorkoutPlanResponse:
     days_data = []
     for d in plan.days:
@@ -170,10 +174,12 @@ def _to_day_response(day: WorkoutPlanDay) -> WorkoutPlanDayResponse:
 
 @router.get("/exercises", response_model=List[ExerciseResponse])
 def list_exercises(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
     muscle_group: Optional[str] = Query(None),
     equipment: Optional[str] = Query(None),
+    page: PageRequest = Depends(page_request),
 ):
     """Returns global exercises + current user's custom exercises. Optional filters."""
     q = db.query(Exercise).filter(
@@ -183,15 +189,16 @@ def list_exercises(
         q = q.filter(Exercise.muscle_group == muscle_group)
     if equipment is not None:
         q = q.filter(Exercise.equipment == equipment)
-    exercises = q.order_by(Exercise.name).all()
+    exercises, next_cursor = EXERCISES_BY_NAME.split(paginate(EXERCISES_BY_NAME, q, page).all(), page)
+    set_next_cursor(response, next_cursor)
     return [_to_exercise_response(ex) for ex in exercises]
 
 
 @router.post("/exercises", response_model=ExerciseResponse, status_code=status.HTTP_201_CREATED)
 def create_exercise(
     data: ExerciseCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     """Create a custom exercise owned by the current user."""
     ex = Exercise(
@@ -210,8 +217,8 @@ def create_exercise(
 @router.get("/exercises/{exercise_id}", response_model=ExerciseResponse)
 def get_exercise(
     exercise_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
 ):
     ex = db.query(Exercise).filter(Exercise.id == exercise_id).first()
     if not ex or not _exercise_visible_to_user(ex, current_user):
@@ -223,8 +230,8 @@ def get_exercise(
 def update_exercise(
     exercise_id: int,
     data: ExerciseUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     ex = db.query(Exercise).filter(Exercise.id == exercise_id).first()
     if not ex or not _exercise_visible_to_user(ex, current_user):
@@ -247,8 +254,8 @@ def update_exercise(
 @router.delete("/exercises/{exercise_id}", status_code=status.HTTP_200_OK)
 def delete_exercise(
     exercise_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     ex = db.query(Exercise).filter(Exercise.id == exercise_id).first()
     if not ex or not _exercise_visible_to_user(ex, current_user):
@@ -270,22 +277,23 @@ def delete_exercise(
 
 @router.get("/plans", response_model=List[WorkoutPlanSummary])
 def list_plans(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
+    page: PageRequest = Depends(page_request),
 ):
-    plans = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == current_user.id).order_by(WorkoutPlan.created_at.desc()).all()
-    result = []
-    for p in plans:
-        day_count = db.query(func.count(WorkoutPlanDay.id)).filter(WorkoutPlanDay.plan_id == p.id).scalar() or 0
-        result.append(_to_plan_summary(p, day_count))
-    return result
+    q = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == current_user.id)
+    plans, next_cursor = PLANS_NEWEST_FIRST.split(paginate(PLANS_NEWEST_FIRST, q, page).all(), page)
+    set_next_cursor(response, next_cursor)
+    day_counts = _day_counts(db, [p.id for p in plans])
+    return [_to_plan_summary(p, day_counts.get(p.id, 0)) for p in plans]
 
 
 @router.post("/plans", response_model=WorkoutPlanResponse, status_code=status.HTTP_201_CREATED)
 def create_plan(
     data: WorkoutPlanCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan = WorkoutPlan(
         user_id=current_user.id,
@@ -303,10 +311,10 @@ def create_plan(
 @router.get("/plans/{plan_id}", response_model=WorkoutPlanResponse)
 def get_plan(
     plan_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
 ):
-    plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id).first()
+    plan = db.query(WorkoutPlan).options(_plan_tree()).filter(WorkoutPlan.id == plan_id).first()
     if not plan or plan.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan not found")
     return _to_plan_response(plan)
@@ -316,8 +324,8 @@ def get_plan(
 def update_plan(
     plan_id: int,
     data: WorkoutPlanCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id).first()
     if not plan or plan.user_id != current_user.id:
@@ -327,15 +335,14 @@ def update_plan(
     plan.duration_value = data.duration_value
     plan.duration_unit = data.duration_unit
     db.commit()
-    db.refresh(plan)
-    return _to_plan_response(plan)
+    return _to_plan_response(_load_plan_tree(db, plan_id))
 
 
 @router.delete("/plans/{plan_id}", status_code=status.HTTP_200_OK)
 def delete_plan(
     plan_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id).first()
     if not plan or plan.user_id != current_user.id:
@@ -348,8 +355,8 @@ def delete_plan(
 @router.post("/plans/{plan_id}/activate", response_model=WorkoutPlanResponse)
 def activate_plan(
     plan_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id).first()
     if not plan or plan.user_id != current_user.id:
@@ -358,8 +365,7 @@ def activate_plan(
     plan.is_active = True
     plan.start_date = date.today()
     db.commit()
-    db.refresh(plan)
-    return _to_plan_response(plan)
+    return _to_plan_response(_load_plan_tree(db, plan_id))
 
 
 # ---- Plan Days ----
@@ -376,8 +382,8 @@ def _get_plan_and_day(plan_id: int, day_id: int, user_id: int, db: Session):
 def create_plan_day(
     plan_id: int,
     data: WorkoutPlanDayCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == current_user.id).first()
     if not plan:
@@ -403,8 +409,8 @@ def update_plan_day(
     plan_id: int,
     day_id: int,
     data: WorkoutPlanDayUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan, day = _get_plan_and_day(plan_id, day_id, current_user.id, db)
     if not plan or not day:
@@ -429,8 +435,8 @@ def update_plan_day(
 def delete_plan_day(
     plan_id: int,
     day_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan, day = _get_plan_and_day(plan_id, day_id, current_user.id, db)
     if not plan or not day:
@@ -458,8 +464,8 @@ def add_plan_day_exercise(
     plan_id: int,
     day_id: int,
     data: WorkoutPlanExerciseCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan, day = _get_plan_and_day(plan_id, day_id, current_user.id, db)
     if not plan or not day:
@@ -502,8 +508,8 @@ def update_plan_day_exercise(
     day_id: int,
     entry_id: int,
     data: WorkoutPlanExerciseUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan, day, entry = _get_plan_day_and_entry(plan_id, day_id, entry_id, current_user.id, db)
     if not plan or not day or not entry:
@@ -549,8 +555,8 @@ def delete_plan_day_exercise(
     plan_id: int,
     day_id: int,
     entry_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db),
 ):
     plan, day, entry = _get_plan_day_and_entry(plan_id, day_id, entry_id, current_user.id, db)
     if not plan or not day or not entry:
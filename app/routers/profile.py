@@ -1,48 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models import User
 from app.schemas import ProfileResponse, ProfileUpdate
-from app.auth import get_current_user_id
+from app.dependencies import CurrentUser, get_async_read_db, get_current_user
 
 router = APIRouter()
-security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
-    token = credentials.credentials
-    user_id = get_current_user_id(token)
-    
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = db.query(User).filter(User.id == user_id).first()
+async def _load_user(current_user: CurrentUser, db: AsyncSession) -> User:
+    """Load the full user row for the authenticated principal."""
+    user = (await db.execute(select(User).where(User.id == current_user.id))).scalars().first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
     return user
 
 
 @router.get("/profile", response_model=ProfileResponse)
 async def get_profile(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get the profile of the authenticated user
     """
+    current_user = await _load_user(current_user, db)
     return ProfileResponse(
         id=current_user.id,
         username=current_user.username,
@@ -58,12 +45,14 @@ async def get_profile(
 @router.put("/profile", response_model=ProfileResponse)
 async def update_profile(
     profile_data: ProfileUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update the profile of the authenticated user
     """
+    current_user = await _load_user(current_user, db)
+
     # Update fields if provided
     if profile_data.first_name is not None:
         current_user.first_name = profile_data.first_name
@@ -81,13 +70,13 @@ async def update_profile(
         current_user.gender = profile_data.gender
 
     if profile_data.email is not None:
-        existing = db.query(User).filter(User.email == profile_data.email, User.id != current_user.id).first()
+        existing = (await db.execute(select(User).where(User.email == profile_data.email, User.id != current_user.id))).scalars().first()
         if existing:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already in use.")
         current_user.email = profile_data.email
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return ProfileResponse(
         id=current_user.id,
@@ -1,46 +1,39 @@
 from datetime import date, datetime
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Weight, User
-from app.schemas import WeightCreate, WeightUpdate, WeightResponse
-from app.auth import get_current_user_id
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import MetricEntry
+from app.schemas import WeightCreate, WeightImportResponse, WeightUpdate, WeightResponse
+from app.dependencies import CurrentUser, get_async_user_db, get_async_user_read_db, get_current_user
+from app.pagination import METRICS_NEWEST_FIRST, PageRequest, page_request, paginate, set_next_cursor
+from app.weight_import import import_weights, parse_upload
 
 router = APIRouter()
-security = HTTPBearer()
 
+# Weight is stored once, as metric_entries rows with metric_type "weight" and value {"kg": ...}.
+# These endpoints are a compatibility view over those rows; a weight id is the metric entry id.
+WEIGHT = "weight"
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
-    token = credentials.credentials
-    user_id = get_current_user_id(token)
-    
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    return user
+
+def _to_response(entry: MetricEntry) -> WeightResponse:
+    return WeightResponse(
+        id=entry.id,
+        user_id=entry.user_id,
+        weight=entry.value["kg"],
+        date=entry.date.isoformat(),
+        created_at=entry.created_at.isoformat()
+    )
 
 
-def verify_weight_ownership(weight_id: int, current_user: User, db: Session) -> Weight:
+async def verify_weight_ownership(weight_id: int, current_user: CurrentUser, db: AsyncSession) -> MetricEntry:
     """Verify that the weight entry exists and belongs to the current user"""
-    weight = db.query(Weight).filter(Weight.id == weight_id).first()
+    weight = (await db.execute(select(MetricEntry).where(
+        MetricEntry.id == weight_id,
+        MetricEntry.metric_type == WEIGHT
+    ))).scalars().first()
     
     if not weight:
         raise HTTPException(
@@ -60,8 +53,8 @@ def verify_weight_ownership(weight_id: int, current_user: User, db: Session) ->
 @router.post("/weights", response_model=WeightResponse, status_code=status.HTTP_201_CREATED)
 async def create_weight(
     weight_data: WeightCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db)
 ):
     """
     Add a historical weight entry for the authenticated user
@@ -76,92 +69,116 @@ async def create_weight(
         )
     
     # Check if weight entry already exists for this date
-    existing_weight = db.query(Weight).filter(
-        Weight.user_id == current_user.id,
-        Weight.date == weight_date
-    ).first()
+    existing_weight = (await db.execute(select(MetricEntry.id).where(
+        MetricEntry.user_id == current_user.id,
+        MetricEntry.metric_type == WEIGHT,
+        MetricEntry.date == weight_date
+    ))).scalars().first()
     
     if existing_weight:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Weight entry already exists for date {weight_data.date}. Use PUT /weights/{existing_weight.id} to update it."
+            detail=f"Weight entry already exists for date {weight_data.date}. Use PUT /weights/{existing_weight} to update it."
         )
     
     # Create new weight entry
-    new_weight = Weight(
+    new_weight = MetricEntry(
         user_id=current_user.id,
-        weight=weight_data.weight,
-        date=weight_date
+        metric_type=WEIGHT,
+        date=weight_date,
+        value={"kg": weight_data.weight}
     )
     
     db.add(new_weight)
-    db.commit()
-    db.refresh(new_weight)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request won the race; uq_user_metric_date rejected this one
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Weight entry already exists for date {weight_data.date}."
+        )
+    await db.refresh(new_weight)
     
-    return WeightResponse(
-        id=new_weight.id,
-        user_id=new_weight.user_id,
-        weight=new_weight.weight,
-        date=new_weight.date.isoformat(),
-        created_at=new_weight.created_at.isoformat()
-    )
+    return _to_response(new_weight)
+
+
+@router.post("/weights/bulk", response_model=WeightImportResponse)
+async def bulk_import_weights(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db)
+):
+    """
+    Import many weight entries at once, e.g. a scale's history.
+    Body is either JSON (a list of {date, weight}, or {"weights": [...]})
+    or CSV with Content-Type text/csv and a header row: date,weight.
+    Days that already have a weight are updated. Invalid rows are reported and skipped;
+    all valid rows are written in one transaction.
+    """
+    body = (await request.body()).decode("utf-8-sig")
+    try:
+        rows = parse_upload(body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(rows) > settings.weight_import_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.weight_import_max_rows} weights per request."
+        )
+
+    report = await db.run_sync(import_weights, current_user.id, rows)
+    await db.commit()
+    return report
 
 
 @router.get("/weights", response_model=List[WeightResponse])
 async def get_weights(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_read_db),
+    page: PageRequest = Depends(page_request),
 ):
     """
-    Get all weight entries for the authenticated user, ordered by date (newest first)
+    Get weight entries for the authenticated user, ordered by date (newest first).
+    Paginated: pass the X-Next-Cursor response header back as `cursor` for the next page.
     """
-    weights = db.query(Weight).filter(
-        Weight.user_id == current_user.id
-    ).order_by(Weight.date.desc()).all()
-    
-    return [
-        WeightResponse(
-            id=w.id,
-            user_id=w.user_id,
-            weight=w.weight,
-            date=w.date.isoformat(),
-            created_at=w.created_at.isoformat()
-        )
-        for w in weights
-    ]
+    query = select(MetricEntry).where(
+        MetricEntry.user_id == current_user.id,
+        MetricEntry.metric_type == WEIGHT
+    )
+    rows = (await db.execute(paginate(METRICS_NEWEST_FIRST, query, page))).scalars().all()
+    weights, next_cursor = METRICS_NEWEST_FIRST.split(rows, page)
+    set_next_cursor(response, next_cursor)
+    return [_to_response(w) for w in weights]
 
 
 @router.get("/weights/{weight_id}", response_model=WeightResponse)
 async def get_weight(
     weight_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_read_db)
 ):
     """
     Get a specific weight entry by ID for the authenticated user
     """
-    weight = verify_weight_ownership(weight_id, current_user, db)
+    weight = await verify_weight_ownership(weight_id, current_user, db)
     
-    return WeightResponse(
-        id=weight.id,
-        user_id=weight.user_id,
-        weight=weight.weight,
-        date=weight.date.isoformat(),
-        created_at=weight.created_at.isoformat()
-    )
+    return _to_response(weight)
 
 
 @router.put("/weights/{weight_id}", response_model=WeightResponse)
 async def update_weight(
     weight_id: int,
     weight_data: WeightUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db)
 ):
     """
     Update a weight entry by ID. Cannot create duplicate entry for the same date.
     """
-    weight = verify_weight_ownership(weight_id, current_user, db)
+    weight = await verify_weight_ownership(weight_id, current_user, db)
     
     # Track if date is being changed
     new_date = None
@@ -176,11 +193,12 @@ async def update_weight(
         
         # If date is being changed, check if another entry already exists for that date
         if new_date != weight.date:
-            existing_weight = db.query(Weight).filter(
-                Weight.user_id == current_user.id,
-                Weight.date == new_date,
-                Weight.id != weight_id  # Exclude current entry
-            ).first()
+            existing_weight = (await db.execute(select(MetricEntry.id).where(
+                MetricEntry.user_id == current_user.id,
+                MetricEntry.metric_type == WEIGHT,
+                MetricEntry.date == new_date,
+                MetricEntry.id != weight_id  # Exclude current entry
+            ))).scalars().first()
             
             if existing_weight:
                 raise HTTPException(
@@ -190,36 +208,37 @@ async def update_weight(
     
     # Update weight value if provided
     if weight_data.weight is not None:
-        weight.weight = weight_data.weight
+        weight.value = {"kg": weight_data.weight}
     
     # Update date if provided
     if new_date is not None:
         weight.date = new_date
     
-    db.commit()
-    db.refresh(weight)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Weight entry already exists for date {weight_data.date}. Cannot update to a date that already has an entry."
+        )
+    await db.refresh(weight)
     
-    return WeightResponse(
-        id=weight.id,
-        user_id=weight.user_id,
-        weight=weight.weight,
-        date=weight.date.isoformat(),
-        created_at=weight.created_at.isoformat()
-    )
+    return _to_response(weight)
 
 
 @router.delete("/weights/{weight_id}", status_code=status.HTTP_200_OK)
 async def delete_weight(
     weight_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_user_db)
 ):
     """
     Delete a weight entry by ID for the authenticated user
     """
-    weight = verify_weight_ownership(weight_id, current_user, db)
+    weight = await verify_weight_ownership(weight_id, current_user, db)
     
-    db.delete(weight)
-    db.commit()
+    await db.delete(weight)
+    await db.commit()
     
     return {"message": f"Weight entry with id {weight_id} has been successfully deleted"}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, model_validator, EmailStr
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 
 class UserLogin(BaseModel):
@@ -10,6 +10,11 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class UserCreate(BaseModel):
@@ -74,6 +79,31 @@ class AdminUserResponse(BaseModel):
         from_attributes = True
 
 
+class BulkProvisionRowResult(BaseModel):
+    row: int
+    username: Optional[str] = None
+    status: Literal["created", "error"]
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkProvisionResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: list[BulkProvisionRowResult]
+
+
+class AccountDeletionStatus(BaseModel):
+    id: str
+    user_id: int
+    status: Literal["pending", "running", "done", "failed"]
+    deleted: dict[str, int] = Field(default_factory=dict, description="Rows deleted so far, per table")
+    error: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
 class ForgotPasswordRequest(BaseModel):
     email: EmailStr
 
@@ -100,6 +130,20 @@ class WeightUpdate(BaseModel):
     date: Optional[str] = Field(None, description="Date in YYYY-MM-DD format")
 
 
+class WeightImportError(BaseModel):
+    row: int
+    date: Optional[str] = None
+    error: str
+
+
+class WeightImportResponse(BaseModel):
+    total: int
+    inserted: int
+    updated: int
+    rejected: int
+    errors: list[WeightImportError]
+
+
 class WeightResponse(BaseModel):
     id: int
     user_id: int
@@ -115,25 +159,6 @@ class WeightResponse(BaseModel):
 
 METRIC_TYPES = ("weight", "muscle_index", "body_measurements")
 
-# Standard body circumference sites (fitness/ACE-style). All values in cm.
-# Bilateral parts have _left_cm and _right_cm.
-BODY_MEASUREMENT_SITES = (
-    "neck_cm",
-    "shoulder_cm",
-    "chest_cm",
-    "arm_left_cm",
-    "arm_right_cm",
-    "forearm_left_cm",
-    "forearm_right_cm",
-    "waist_cm",
-    "abdomen_cm",
-    "hips_cm",
-    "thigh_left_cm",
-    "thigh_right_cm",
-    "calf_left_cm",
-    "calf_right_cm",
-)
-
 # Value schemas per metric type (for validation)
 class WeightValue(BaseModel):
     kg: float = Field(..., gt=0, description="Weight in kg")
@@ -224,6 +249,35 @@ class MetricResponse(BaseModel):
         from_attributes = True
 
 
+class MetricBatchItemResult(BaseModel):
+    index: int
+    metric_type: Optional[str] = None
+    date: Optional[str] = None
+    status: Literal["inserted", "updated", "rejected"]
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class MetricBatchResponse(BaseModel):
+    total: int
+    inserted: int
+    updated: int
+    rejected: int
+    items: List[MetricBatchItemResult]
+
+
+class BodyMeasurementPoint(BaseModel):
+    date: str
+    value_cm: float
+
+
+class MetricSeriesResponse(BaseModel):
+    """Columnar history of one numeric metric, oldest first: dates[i] goes with values[i]."""
+    metric_type: str
+    dates: List[str]
+    values: List[float]
+
+
 # --- Workout Plans & Exercises ---
 
 MUSCLE_GROUPS = (
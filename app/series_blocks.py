@@ -0,0 +1,239 @@
+"""Packed per-user time series for full-history reads (optional storage tier).
+
+Row-per-day storage makes a chart of several years of weigh-ins materialise thousands of ORM
+objects. With `series_blocks_enabled`, each user's numeric series (weight kg, muscle index) is also
+kept as one `metric_series_blocks` row per calendar year: a uint16 array of day-of-year offsets and
+a float32 array of values, both little-endian and sorted by day. A full history is a handful of row
+fetches, and `Series.slice` narrows it to a date range with memoryviews over the fetched bytes,
+without copying.
+
+metric_entries stays the source of truth. `install_series_block_sync` hooks `after_flush` so every
+ORM insert, update or delete of a series entry patches the affected blocks in the same transaction.
+Writes that bypass the ORM call `apply_changes` themselves. `rebuild_series_blocks` (CLI:
+`python -m app.cli rebuild-series`) builds the blocks from the rows, e.g. after turning the tier on.
+"""
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import and_, delete, event, inspect, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import MetricEntry, MetricSeriesBlock
+
+# Metrics kept in blocks, and the key their number is stored under in MetricEntry.value
+SERIES_METRICS = {"weight": "kg", "muscle_index": "index"}
+
+# Blocks are stored little-endian; only big-endian hosts need to copy and swap
+_NATIVE_LE = sys.byteorder == "little"
+
+blocks = MetricSeriesBlock.__table__
+
+
+def _day_offset(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def _view(buf: bytes, typecode: str):
+    if _NATIVE_LE:
+        return memoryview(buf).cast(typecode)
+    arr = array(typecode, buf)
+    arr.byteswap()
+    return arr
+
+
+def _pack(arr: array) -> bytes:
+    if _NATIVE_LE:
+        return arr.tobytes()
+    swapped = array(arr.typecode, arr)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+class Series:
+    """Read-only view of one series: per-year (year, days, values) segments in date order."""
+
+    __slots__ = ("segments",)
+
+    def __init__(self, segments: list):
+        self.segments = segments
+
+    @classmethod
+    def from_rows(cls, rows) -> "Series":
+        """Wrap fetched MetricSeriesBlock rows (any order) without copying their bytes."""
+        return cls([
+            (row.year, _view(row.days, "H"), _view(row.values, "f"))
+            for row in sorted(rows, key=lambda r: r.year)
+        ])
+
+    def __len__(self) -> int:
+        return sum(len(days) for _, days, _ in self.segments)
+
+    def slice(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> "Series":
+        """Entries with date_from <= date <= date_to. Segments are memoryview slices, not copies."""
+        out = []
+        for year, days, values in self.segments:
+            if (date_from and year < date_from.year) or (date_to and year > date_to.year):
+                continue
+            lo = bisect_left(days, _day_offset(date_from)) if date_from and date_from.year == year else 0
+            hi = bisect_right(days, _day_offset(date_to)) if date_to and date_to.year == year else len(days)
+            if lo < hi:
+                out.append((year, days[lo:hi], values[lo:hi]))
+        return Series(out)
+
+    def points(self) -> Iterator[tuple]:
+        """(date, value) pairs, oldest first."""
+        for year, days, values in self.segments:
+            jan1 = date(year, 1, 1)
+            for offset, value in zip(days, values):
+                yield jan1 + timedelta(days=offset), value
+
+
+def block_query(user_id: int, metric_type: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """SELECT for the blocks covering a date range (whole history when unbounded)."""
+    q = select(MetricSeriesBlock).where(
+        MetricSeriesBlock.user_id == user_id, MetricSeriesBlock.metric_type == metric_type
+    )
+    if date_from:
+        q = q.where(MetricSeriesBlock.year >= date_from.year)
+    if date_to:
+        q = q.where(MetricSeriesBlock.year <= date_to.year)
+    return q
+
+
+# --- Writes ---
+
+def apply_changes(conn: Connection, puts: dict, removals: set) -> None:
+    """Patch blocks in place. puts: {(user_id, metric_type, date): value}; removals: {(user_id, metric_type, date)}.
+
+    Removals are applied before puts, so moving an entry to another day is a removal plus a put.
+    Only the touched (user, metric, year) blocks are read and rewritten.
+    """
+    touched = defaultdict(lambda: ([], []))
+    for user_id, metric_type, day in removals:
+        touched[(user_id, metric_type, day.year)][0].append(day)
+    for (user_id, metric_type, day), value in puts.items():
+        touched[(user_id, metric_type, day.year)][1].append((day, value))
+    if not touched:
+        return
+
+    # Create missing blocks empty first, so every block being written has a row to lock: a concurrent
+    # first write to the same block then waits for this one instead of failing on the primary key
+    created = [
+        {"user_id": user_id, "metric_type": metric_type, "year": year, "days": b"", "values": b""}
+        for (user_id, metric_type, year), (_, put_days) in touched.items() if put_days
+    ]
+    if created:
+        insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+        conn.execute(insert(blocks).values(created).on_conflict_do_nothing())
+
+    keys = list(touched)
+    stmt = select(blocks).where(tuple_(blocks.c.user_id, blocks.c.metric_type, blocks.c.year).in_(keys))
+    if conn.dialect.name == "postgresql":
+        stmt = stmt.with_for_update()
+    existing = {(r.user_id, r.metric_type, r.year): r for r in conn.execute(stmt)}
+
+    for key, (removed_days, put_days) in touched.items():
+        row = existing.get(key)
+        days, values = array("H"), array("f")
+        if row is not None:
+            days.extend(_view(row.days, "H"))
+            values.extend(_view(row.values, "f"))
+        for day in removed_days:
+            i = bisect_left(days, _day_offset(day))
+            if i < len(days) and days[i] == _day_offset(day):
+                del days[i]
+                del values[i]
+        for day, value in put_days:
+            offset = _day_offset(day)
+            i = bisect_left(days, offset)
+            if i < len(days) and days[i] == offset:
+                values[i] = value
+            else:
+                days.insert(i, offset)
+                values.insert(i, value)
+
+        user_id, metric_type, year = key
+        where = and_(blocks.c.user_id == user_id, blocks.c.metric_type == metric_type, blocks.c.year == year)
+        if row is None:
+            continue  # only removals, from a block that does not exist
+        if not days:
+            conn.execute(delete(blocks).where(where))
+        else:
+            conn.execute(blocks.update().where(where).values(days=_pack(days), values=_pack(values)))
+
+
+def _series_number(entry: MetricEntry) -> Optional[float]:
+    number = (entry._value or {}).get(SERIES_METRICS[entry.metric_type])
+    return float(number) if number is not None else None
+
+
+def _collect(session: Session) -> tuple:
+    puts, removals = {}, set()
+    for entry in session.deleted:
+        if isinstance(entry, MetricEntry) and entry.metric_type in SERIES_METRICS:
+            state = inspect(entry)
+            # Delete the row as it was stored, not as it may have been edited before deletion
+            user_id = state.attrs.user_id.history.deleted or [entry.user_id]
+            day = state.attrs.date.history.deleted or [entry.date]
+            removals.add((user_id[0], entry.metric_type, day[0]))
+    for entry in session.dirty:
+        if not isinstance(entry, MetricEntry) or entry.metric_type not in SERIES_METRICS:
+            continue
+        state = inspect(entry)
+        old_user = state.attrs.user_id.history.deleted
+        old_day = state.attrs.date.history.deleted
+        if old_user or old_day:
+            removals.add(((old_user or [entry.user_id])[0], entry.metric_type, (old_day or [entry.date])[0]))
+        if old_user or old_day or state.attrs._value.history.has_changes():
+            puts[(entry.user_id, entry.metric_type, entry.date)] = _series_number(entry)
+    for entry in session.new:
+        if isinstance(entry, MetricEntry) and entry.metric_type in SERIES_METRICS:
+            puts[(entry.user_id, entry.metric_type, entry.date)] = _series_number(entry)
+    return {k: v for k, v in puts.items() if v is not None}, removals
+
+
+def _sync_after_flush(session: Session, flush_context) -> None:
+    puts, removals = _collect(session)
+    if puts or removals:
+        apply_changes(session.connection(), puts, removals)
+
+
+def install_series_block_sync(session_class=Session) -> None:
+    """Keep blocks in step with ORM writes on every session of `session_class` (idempotent)."""
+    if not event.contains(session_class, "after_flush", _sync_after_flush):
+        event.listen(session_class, "after_flush", _sync_after_flush)
+
+
+def rebuild_series_blocks(db: Session, user_id: Optional[int] = None) -> int:
+    """Rebuild blocks from metric_entries for one user or everyone. Returns the number of blocks written."""
+    conn = db.connection()
+    q = select(MetricEntry.user_id, MetricEntry.metric_type, MetricEntry.date, MetricEntry._value).where(
+        MetricEntry.metric_type.in_(list(SERIES_METRICS))
+    )
+    clear = delete(blocks)
+    if user_id is not None:
+        q = q.where(MetricEntry.user_id == user_id)
+        clear = clear.where(blocks.c.user_id == user_id)
+    conn.execute(clear)
+
+    built = defaultdict(lambda: (array("H"), array("f")))
+    for uid, metric_type, day, value in conn.execute(q.order_by(MetricEntry.user_id, MetricEntry.date)):
+        number = (value or {}).get(SERIES_METRICS[metric_type])
+        if number is None:
+            continue
+        days, values = built[(uid, metric_type, day.year)]
+        days.append(_day_offset(day))
+        values.append(float(number))
+    if built:
+        conn.execute(blocks.insert(), [
+            {"user_id": uid, "metric_type": t, "year": year, "days": _pack(days), "values": _pack(values)}
+            for (uid, t, year), (days, values) in built.items()
+        ])
+    db.commit()
+    return len(built)
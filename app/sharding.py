@@ -0,0 +1,175 @@
+"""Optional user sharding: per-user data spread over several databases.
+
+With `SHARD_DATABASE_URLS` set (comma-separated), each user's metrics, goals, workout plans and
+custom exercises live on one of those databases. `DATABASE_URL` stays the shared database: users,
+refresh tokens, the email outbox and the shard directory live there, so login, registration and
+admin user listing work as before. Shard choice is either
+
+  hash      - crc32(user_id) modulo the shard count; no lookups, but adding a shard moves users
+  directory - a `user_shards` row in the shared database, assigned by hash on first use and
+              editable afterwards, so users can be moved or new shards filled deliberately
+
+Every shard has the full schema (`python -m app.cli init-db` or `alembic upgrade head` per URL) and
+its own copy of the global exercise catalogue, so plans join their exercises locally. A user's
+shard also gets a stub `users` row (id and username, no password) so foreign keys hold there.
+
+Handlers get shard sessions from `get_user_db` / `get_async_user_db` and the read dependencies in
+app/dependencies.py, and MCP tools through `_db(username)`. With sharding off, all of these return
+the usual `DATABASE_URL` sessions.
+"""
+import threading
+import zlib
+from typing import Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.cache import TTLCache
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal, create_engines, normalize_url
+from app.db_resilience import RetryingSession
+from app.models import UserShard
+from app.pool_monitor import PoolMonitor
+
+STRATEGIES = ("hash", "directory")
+
+_STUB_USER = text(
+    "INSERT INTO users (id, username, hashed_password, is_admin) "
+    "SELECT :id, :username, '!', :is_admin WHERE NOT EXISTS (SELECT 1 FROM users WHERE id = :id)"
+)
+
+
+def hash_shard(user_id: int, shard_count: int) -> int:
+    """Stable across processes and restarts (unlike hash())."""
+    return zlib.crc32(str(user_id).encode()) % shard_count
+
+
+class ShardRouter:
+    def __init__(self, urls: list, strategy: str = "hash"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown shard strategy '{strategy}'. Allowed: {list(STRATEGIES)}")
+        if not urls:
+            raise ValueError("ShardRouter needs at least one database URL")
+        self.strategy = strategy
+        self.urls = [normalize_url(u) for u in urls]
+        self.engines, self.async_engines, self.monitors = [], [], []
+        self._sessions, self._async_sessions = [], []
+        for i, url in enumerate(self.urls):
+            sync_monitor, async_monitor = PoolMonitor(f"shard{i}"), PoolMonitor(f"shard{i}_async")
+            sync_engine, async_engine = create_engines(url, sync_monitor, async_monitor)
+            self.engines.append(sync_engine)
+            self.async_engines.append(async_engine)
+            self.monitors.extend((sync_monitor, async_monitor))
+            self._sessions.append(sessionmaker(autocommit=False, autoflush=False, bind=sync_engine, class_=RetryingSession))
+            self._async_sessions.append(async_sessionmaker(
+                async_engine, autoflush=False, expire_on_commit=False, sync_session_class=RetryingSession
+            ))
+        self._directory = TTLCache(maxsize=settings.user_cache_max_size, ttl=settings.user_cache_ttl_seconds)
+        # (shard, user_id) pairs known to have a users stub; per process, so at most one INSERT each
+        self._stubbed = set()
+        self._lock = threading.Lock()
+        self._routed = [0] * len(self.urls)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    # --- Shard lookup ---
+
+    def _directory_entry(self, db: Session, user_id: int) -> int:
+        """The user's directory row, created by hash on first use. Concurrent first requests may race
+        to create it; the loser's insert fails on the primary key and it reads the winner's row."""
+        index = db.execute(select(UserShard.shard).where(UserShard.user_id == user_id)).scalar()
+        if index is not None:
+            return index
+        db.add(UserShard(user_id=user_id, shard=hash_shard(user_id, len(self))))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        return db.execute(select(UserShard.shard).where(UserShard.user_id == user_id)).scalar_one()
+
+    def shard_for(self, user_id: int) -> int:
+        """Shard index for a user. The directory strategy reads (or creates) the entry on a cache miss,
+        in a short-lived shared-database session of its own, never the caller's."""
+        if self.strategy == "hash":
+            return hash_shard(user_id, len(self))
+        index = self._directory.get(user_id)
+        if index is None:
+            with SessionLocal() as db:
+                index = self._directory_entry(db, user_id)
+            self._directory.set(user_id, index)
+        return index
+
+    async def ashard_for(self, user_id: int) -> int:
+        if self.strategy == "hash":
+            return hash_shard(user_id, len(self))
+        index = self._directory.get(user_id)
+        if index is None:
+            async with AsyncSessionLocal() as db:
+                index = await db.run_sync(self._directory_entry, user_id)
+            self._directory.set(user_id, index)
+        return index
+
+    def forget(self, user_id: int) -> None:
+        """Drop a cached directory entry, e.g. after moving a user to another shard."""
+        self._directory.invalidate(user_id)
+
+    # --- Sessions ---
+
+    def _count(self, index: int) -> None:
+        with self._lock:
+            self._routed[index] += 1
+
+    def session(self, user_id: int, username: str, is_admin: bool = False) -> Session:
+        """Sync session on the user's shard, with the user's stub row in place."""
+        index = self.shard_for(user_id)
+        self._count(index)
+        db = self._sessions[index]()
+        if (index, user_id) not in self._stubbed:
+            db.execute(_STUB_USER, {"id": user_id, "username": username, "is_admin": is_admin})
+            db.commit()
+            self._stubbed.add((index, user_id))
+        return db
+
+    async def async_session(self, user_id: int, username: str, is_admin: bool = False) -> AsyncSession:
+        """Async session on the user's shard, with the user's stub row in place."""
+        index = await self.ashard_for(user_id)
+        self._count(index)
+        db = self._async_sessions[index]()
+        if (index, user_id) not in self._stubbed:
+            await db.execute(_STUB_USER, {"id": user_id, "username": username, "is_admin": is_admin})
+            await db.commit()
+            self._stubbed.add((index, user_id))
+        return db
+
+    def all_sessions(self) -> list:
+        """One new sync session per shard, for fan-out jobs (init, rebuilds, account deletion)."""
+        return [factory() for factory in self._sessions]
+
+    def stats(self) -> dict:
+        with self._lock:
+            routed = list(self._routed)
+        return {
+            "strategy": self.strategy,
+            "shards": len(self),
+            "routed": routed,
+            "directory_cache": self._directory.stats() if self.strategy == "directory" else None,
+            "pools": [m.stats() for m in self.monitors],
+        }
+
+    async def dispose(self) -> None:
+        for e in self.async_engines:
+            await e.dispose()
+        for e in self.engines:
+            e.dispose()
+
+
+def _from_settings() -> Optional[ShardRouter]:
+    urls = [u.strip() for u in settings.shard_database_urls.split(",") if u.strip()]
+    return ShardRouter(urls, settings.shard_strategy) if urls else None
+
+
+# None unless SHARD_DATABASE_URLS is set
+shard_router: Optional[ShardRouter] = _from_settings()
@@ -0,0 +1,97 @@
+"""Per-request SQL statement counting, timing and repeated-query (N+1) detection.
+
+`instrument_engine` hooks cursor execution on an engine. While a `track_queries()` block is active
+(the HTTP middleware in main.py opens one per request), each statement's count and duration are
+recorded against its "shape": the SQL text with whitespace and expanded IN lists collapsed.
+
+The middleware exposes the totals in a `Server-Timing` header. It logs a warning when a request runs
+one shape more than `sql_repeat_warning_threshold` times, which is usually a lazy load in a loop.
+It never fails the request; tests that use the `strict_queries` fixture (tests/conftest.py) fail on
+that warning instead.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# "IN (?, ?, ?)" / "IN (%(p_1)s, %(p_2)s)" -> "IN (...)" so batch sizes do not split one shape into many
+_IN_LIST = re.compile(r"\bIN \((?:[^()]*?,\s*)+[^()]*?\)", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, ms: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.total_ms += ms
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """(shape, count) pairs that ran more than `threshold` times, most frequent first."""
+        with self._lock:
+            return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+@contextmanager
+def track_queries():
+    """Collect statements executed in this context (and threads/greenlets spawned from it)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Listen on a sync Engine (for an AsyncEngine pass `async_engine.sync_engine`)."""
+
+    # The start time lives on the statement's execution context, which is discarded with it, so a
+    # statement that fails (no after_cursor_execute) leaves nothing behind on the pooled connection
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None and context is not None:
+            context._sql_instrumentation_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        start = getattr(context, "_sql_instrumentation_start", None)
+        if stats is not None and start is not None:
+            stats.record(statement, (time.perf_counter() - start) * 1000)
+
+
+def server_timing(stats: QueryStats, total_ms: float) -> str:
+    return f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+
+
+def check_repeats(stats: QueryStats, threshold: int, where: str) -> None:
+    """Log a warning when a statement shape ran more than `threshold` times."""
+    repeated = stats.repeated(threshold)
+    if not repeated:
+        return
+    shape, n = repeated[0]
+    logger.warning("%s: statement repeated %d times (threshold %d), likely N+1: %s", where, n, threshold, shape[:300])
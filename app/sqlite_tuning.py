@@ -0,0 +1,101 @@
+"""Production profile for SQLite installs.
+
+`apply_sqlite_pragmas` sets journaling, sync, lock-wait and memory pragmas on every new connection.
+WAL lets readers proceed during a write, and busy_timeout makes a writer wait for the lock instead
+of failing with "database is locked". `SQLiteMaintenance` runs `PRAGMA optimize` and a WAL
+checkpoint on an interval from the FastAPI lifespan, so query planner stats stay fresh and the
+-wal file does not grow without bound.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_pragmas() -> list:
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_bytes)}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size={-int(settings.sqlite_cache_size_kib)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def apply_sqlite_pragmas(engine: Engine) -> None:
+    """Run the tuned pragmas on each new DBAPI connection (sqlite3 or aiosqlite)."""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class SQLiteMaintenance:
+    """Background task running `PRAGMA optimize` and a WAL checkpoint every `interval` seconds."""
+
+    def __init__(self, engine: Engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_checkpoint: Optional[dict] = None
+        self.last_ms: Optional[float] = None
+
+    def run_once(self) -> dict:
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+            busy, wal_pages, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+            conn.commit()
+        self.runs += 1
+        self.last_checkpoint = {"busy": bool(busy), "wal_pages": wal_pages, "checkpointed_pages": checkpointed}
+        self.last_ms = round((time.perf_counter() - start) * 1000, 2)
+        return self.last_checkpoint
+
+    async def run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("SQLite maintenance failed: %s", e)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0 and self.engine.dialect.name == "sqlite":
+            self._task = asyncio.create_task(self.run_forever(), name="sqlite-maintenance")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_checkpoint": self.last_checkpoint,
+            "last_ms": self.last_ms,
+        }
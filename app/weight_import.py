@@ -0,0 +1,68 @@
+"""Bulk weight import (POST /weights/bulk and the MCP `import_weights` tool).
+
+Every row is validated before anything is written. The valid rows then go to the database as a few
+set-based upserts in one transaction (app/metric_upsert.py), instead of the existence query, insert,
+commit and refresh that POST /weights costs per row. Days that already have a weight are updated.
+The report counts inserted, updated and rejected rows, with the reason for each rejection.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.metric_upsert import upsert_metric_entries
+from app.schemas import WeightCreate
+
+WEIGHT = "weight"
+
+
+def parse_upload(body: str, content_type: str) -> list:
+    """Rows from CSV (header `date,weight`) or JSON (a list of {date, weight}, or {"weights": [...]})."""
+    if "csv" in content_type:
+        return [dict(row) for row in csv.DictReader(io.StringIO(body))]
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError:
+        raise ValueError("Body must be JSON or text/csv.")
+    rows = payload.get("weights") if isinstance(payload, dict) else payload
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError("Expected a list of {date, weight} objects.")
+    return rows
+
+
+def _error_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def import_weights(db: Session, user_id: int, rows: list) -> dict:
+    """Validate rows of {date, weight} and upsert the valid ones. Returns a report; the caller commits."""
+    valid, errors, seen = [], [], set()
+    for i, raw in enumerate(rows):
+        try:
+            data = WeightCreate.model_validate({"date": raw.get("date"), "weight": raw.get("weight")})
+            day = datetime.strptime(data.date, "%Y-%m-%d").date()
+        except ValidationError as e:
+            errors.append({"row": i, "date": raw.get("date"), "error": _error_message(e)})
+            continue
+        except ValueError:
+            errors.append({"row": i, "date": raw.get("date"), "error": "Invalid date format. Use YYYY-MM-DD."})
+            continue
+        if day in seen:
+            errors.append({"row": i, "date": data.date, "error": "Duplicate date in upload"})
+            continue
+        seen.add(day)
+        valid.append({"metric_type": WEIGHT, "date": day, "value": {"kg": data.weight}})
+
+    # Weights have no source of their own; keep whatever an existing entry has
+    results = upsert_metric_entries(db, user_id, valid, update_source=False)
+    inserted = sum(1 for _, created in results if created)
+    return {
+        "total": len(rows),
+        "inserted": inserted,
+        "updated": len(results) - inserted,
+        "rejected": len(errors),
+        "errors": errors,
+    }
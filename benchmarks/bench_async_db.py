@@ -0,0 +1,138 @@
+"""Concurrency benchmark: blocking sync sessions inside `async def` handlers vs the async session path.
+
+Fires N concurrent `GET /api/v1/weights` requests through the ASGI app and, in parallel, probes
+`/health` to show how long the event loop is stalled. The "sync" variant is the pre-async handler
+shape (an `async def` route querying through `SessionLocal`), mounted on a benchmark-only path.
+
+Usage:
+  python benchmarks/bench_async_db.py [--requests 400] [--concurrency 50] [--rows 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="fit-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import httpx  # noqa: E402
+from fastapi import Depends  # noqa: E402
+
+import main as app_main  # noqa: E402
+from app.auth import create_access_token, get_password_hash  # noqa: E402
+from app.database import SessionLocal, async_engine  # noqa: E402
+from app.dependencies import CurrentUser, get_current_user  # noqa: E402
+from app.models import MetricEntry, User  # noqa: E402
+from app.schemas import WeightResponse  # noqa: E402
+
+app = app_main.app
+
+
+@app.get("/bench/sync-weights", response_model=list[WeightResponse], include_in_schema=False)
+async def sync_weights(current_user: CurrentUser = Depends(get_current_user)):
+    db = SessionLocal()
+    try:
+        weights = (
+            db.query(MetricEntry)
+            .filter(MetricEntry.user_id == current_user.id, MetricEntry.metric_type == "weight")
+            .order_by(MetricEntry.date.desc())
+            .all()
+        )
+        return [
+            WeightResponse(id=w.id, user_id=w.user_id, weight=w.value["kg"], date=w.date.isoformat(), created_at=w.created_at.isoformat())
+            for w in weights
+        ]
+    finally:
+        db.close()
+
+
+def _seed(rows: int) -> str:
+    from datetime import date, timedelta
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "bench").first()
+        if user is None:
+            user = User(username="bench", email="bench@example.com", hashed_password=get_password_hash("bench-pw"))
+            db.add(user)
+            db.commit()
+            start = date(2020, 1, 1)
+            db.add_all(
+                MetricEntry(user_id=user.id, metric_type="weight", date=start + timedelta(days=i), value={"kg": 70 + i % 10})
+                for i in range(rows)
+            )
+            db.commit()
+        return create_access_token({"sub": user.username, "user_id": user.id})
+    finally:
+        db.close()
+
+
+async def _run(client: httpx.AsyncClient, path: str, token: str, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies, probes = [], []
+    done = asyncio.Event()
+
+    async def one():
+        async with semaphore:
+            t0 = time.perf_counter()
+            r = await client.get(path, headers=headers)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    async def probe():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await client.get("/health")
+            probes.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "health_max": max(probes) if probes else 0.0,
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    token = _seed(args.rows)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm both paths (connections, principal cache, statement caches)
+        for path in ("/bench/sync-weights", "/api/v1/weights"):
+            await _run(client, path, token, args.concurrency, args.concurrency)
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {args.rows} rows per response")
+        print(f"{'path':<26}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'/health max ms':>16}")
+        for label, path in (("sync session in async def", "/bench/sync-weights"), ("async session", "/api/v1/weights")):
+            r = await _run(client, path, token, args.requests, args.concurrency)
+            print(f"{label:<26}{r['rps']:>9.0f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['health_max']:>16.1f}")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Micro-benchmark: per-request JWT verification cost with and without the claims cache.
+
+Usage:
+  python benchmarks/bench_jwt_cache.py [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth import _decode_token, create_access_token, get_current_user_id, jwt_cache  # noqa: E402
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "bench", "user_id": 1})
+
+    def uncached():
+        jwt_cache.clear()
+        get_current_user_id(token)
+
+    jwt_cache.clear()
+    get_current_user_id(token)
+
+    def cached():
+        get_current_user_id(token)
+
+    decode_us = _per_call_us(lambda: _decode_token(token), args.iterations)
+    uncached_us = _per_call_us(uncached, args.iterations)
+    cached_us = _per_call_us(cached, args.iterations)
+
+    print(f"{'path':<28}{'us/request':>12}")
+    print(f"{'jwt.decode only':<28}{decode_us:>12.2f}")
+    print(f"{'auth, cache miss':<28}{uncached_us:>12.2f}")
+    print(f"{'auth, cache hit':<28}{cached_us:>12.2f}")
+    print(f"\nspeedup on hit: {uncached_us / cached_us:.1f}x")
+    print(f"cache stats: {jwt_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
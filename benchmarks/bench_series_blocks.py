@@ -0,0 +1,107 @@
+"""Read benchmark: full weight history from row-per-day metric entries vs packed yearly series blocks.
+
+Seeds one user with a daily weight for N years, builds the blocks with `rebuild_series_blocks`, then
+times the ways of reading the whole history (and a 90-day window) back into Python:
+
+  orm rows     - MetricEntry objects, as GET /weights does
+  column rows  - (date, value) tuples, the GET /metrics/series fallback
+  blocks       - one packed row per year, decoded with app.series_blocks.Series
+
+Usage:
+  python benchmarks/bench_series_blocks.py [--years 5] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="fit-series-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ["SQL_INSTRUMENTATION_ENABLED"] = "false"
+
+from sqlalchemy import select  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import MetricEntry, User  # noqa: E402
+from app.series_blocks import Series, block_query, rebuild_series_blocks  # noqa: E402
+
+
+def _seed(years: int) -> tuple:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(username="bench", hashed_password="x")
+        db.add(user)
+        db.commit()
+        start = date.today() - timedelta(days=365 * years)
+        db.execute(MetricEntry.__table__.insert(), [
+            {"user_id": user.id, "metric_type": "weight", "date": start + timedelta(days=i),
+             "value": {"kg": 70 + (i % 100) / 10}}
+            for i in range(365 * years)
+        ])
+        db.commit()
+        blocks = rebuild_series_blocks(db, user.id)
+        return user.id, blocks
+    finally:
+        db.close()
+
+
+def _time(fn, repeat: int) -> tuple:
+    samples, n = [], 0
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            n = fn(db)
+            samples.append((time.perf_counter() - t0) * 1000)
+        finally:
+            db.close()
+    return statistics.median(samples), n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    user_id, block_count = _seed(args.years)
+    window_from = date.today() - timedelta(days=90)
+
+    def orm_rows(db, date_from=None):
+        q = (
+            db.query(MetricEntry)
+            .filter(MetricEntry.user_id == user_id, MetricEntry.metric_type == "weight")
+        )
+        if date_from:
+            q = q.filter(MetricEntry.date >= date_from)
+        return len([(e.date.isoformat(), e.value["kg"]) for e in q.order_by(MetricEntry.date).all()])
+
+    def column_rows(db, date_from=None):
+        q = select(MetricEntry.date, MetricEntry._value).where(
+            MetricEntry.user_id == user_id, MetricEntry.metric_type == "weight"
+        )
+        if date_from:
+            q = q.where(MetricEntry.date >= date_from)
+        return len([(d.isoformat(), v["kg"]) for d, v in db.execute(q.order_by(MetricEntry.date))])
+
+    def blocks(db, date_from=None):
+        rows = db.execute(block_query(user_id, "weight", date_from)).scalars().all()
+        return len([(d.isoformat(), v) for d, v in Series.from_rows(rows).slice(date_from).points()])
+
+    print(f"{args.years} years of daily weights ({args.years * 365} rows, {block_count} blocks), "
+          f"median of {args.repeat} runs")
+    print(f"{'path':<14}{'full ms':>10}{'points':>8}{'90d ms':>10}{'points':>8}")
+    for label, fn in (("orm rows", orm_rows), ("column rows", column_rows), ("blocks", blocks)):
+        full_ms, full_n = _time(fn, args.repeat)
+        window_ms, window_n = _time(lambda db: fn(db, window_from), args.repeat)
+        print(f"{label:<14}{full_ms:>10.2f}{full_n:>8}{window_ms:>10.2f}{window_n:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Startup benchmark: import time and time-to-first-request for `main:app`.
+
+Each sample runs in a fresh interpreter, the way a uvicorn worker boots. The child imports main,
+runs the lifespan startup and serves GET /health. The benchmark compares startup with schema
+init/seeding in the lifespan (DB_INIT_ON_STARTUP=true) against a deploy that ran
+`python -m app.cli init-db` beforehand.
+
+Usage:
+  python benchmarks/bench_startup.py [--samples 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t_ready = time.perf_counter()
+    client.get("/health").raise_for_status()
+    t_first = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t_import - t0) * 1000,
+    "startup_ms": (t_ready - t_import) * 1000,
+    "first_request_ms": (t_first - t0) * 1000,
+    "mcp_imported": "app.mcp_server" in sys.modules,
+}}))
+"""
+
+
+def _sample(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(root=ROOT)],
+        env=env, capture_output=True, text=True, check=True, cwd=tempfile.gettempdir(),
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="fit-startup-bench-"), "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", EMAIL_TRANSPORT="fake")
+    subprocess.run([sys.executable, "-m", "app.cli", "init-db"], env=env, cwd=ROOT, check=True, capture_output=True)
+
+    print(f"median of {args.samples} fresh interpreters")
+    print(f"{'mode':<22}{'import ms':>11}{'lifespan ms':>13}{'first req ms':>14}{'MCP loaded':>12}")
+    for label, init in (("init in lifespan", "true"), ("init-db at deploy", "false")):
+        samples = [_sample(dict(env, DB_INIT_ON_STARTUP=init)) for _ in range(args.samples)]
+        med = {k: statistics.median(s[k] for s in samples) for k in ("import_ms", "startup_ms", "first_request_ms")}
+        print(f"{label:<22}{med['import_ms']:>11.0f}{med['startup_ms']:>13.0f}{med['first_request_ms']:>14.0f}"
+              f"{str(samples[0]['mcp_imported']):>12}")
+
+
+if __name__ == "__main__":
+    main()
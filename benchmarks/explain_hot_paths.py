@@ -0,0 +1,221 @@
+"""Index check: EXPLAIN QUERY PLAN for each per-user hot query against the current models.
+
+Builds a fresh SQLite schema from app.models (the same indexes migration 013 creates), loads a
+few rows per user per table and runs ANALYZE, then asserts that every hot query is answered through
+the expected index rather than a table scan or a temporary sort. Exits non-zero on any mismatch,
+so it can run in CI after schema changes.
+
+Usage:
+  python benchmarks/explain_hot_paths.py [--users 20] [--rows 50] [--verbose]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, select, text  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import (  # noqa: E402
+    EMAIL_OUTBOX_UNDELIVERED, BodyMeasurement, EmailOutbox, Exercise, Goal, MetricEntry, User, WorkoutPlan, WorkoutPlanDay,
+    WorkoutPlanExercise,
+)
+from app.pagination import (  # noqa: E402
+    EXERCISES_BY_NAME, GOALS_NEWEST_FIRST, METRICS_NEWEST_FIRST, PLANS_NEWEST_FIRST, USERS_BY_ID, PageRequest,
+)
+
+USER_ID = 1
+DAY = date(2026, 1, 1)
+
+
+def _second_page(keyset, **last_row) -> PageRequest:
+    """The page after a row with these key values, as a list route would request it."""
+    return PageRequest(100, keyset.encode(SimpleNamespace(**last_row)))
+
+
+# SQLite names a UniqueConstraint's index itself; Postgres uses the constraint name.
+UQ_USER_METRIC_DATE = ("uq_user_metric_date", "sqlite_autoindex_metric_entries_1")
+UQ_BODY_MEASUREMENTS_USER_DATE = ("uq_body_measurements_user_date", "sqlite_autoindex_body_measurements_1")
+
+# (label, statement, index names the plan may use, whether a temporary sort is acceptable).
+# The statements mirror the router/MCP queries.
+HOT_QUERIES = [
+    (
+        "GET /metrics",
+        METRICS_NEWEST_FIRST.apply(
+            select(MetricEntry).where(MetricEntry.user_id == USER_ID),
+            _second_page(METRICS_NEWEST_FIRST, date=DAY, id=10),
+        ),
+        ("ix_metric_entries_user_date",), False,
+    ),
+    (
+        "GET /weights, GET /metrics?metric_type=",
+        METRICS_NEWEST_FIRST.apply(
+            select(MetricEntry).where(MetricEntry.user_id == USER_ID, MetricEntry.metric_type == "weight"),
+            _second_page(METRICS_NEWEST_FIRST, date=DAY, id=10),
+        ),
+        UQ_USER_METRIC_DATE, False,
+    ),
+    (
+        "POST /weights, POST /metrics lookup",
+        select(MetricEntry).where(
+            MetricEntry.user_id == USER_ID, MetricEntry.metric_type == "weight", MetricEntry.date == DAY
+        ),
+        UQ_USER_METRIC_DATE, False,
+    ),
+    (
+        "GET /metrics/body-measurements/{site}",
+        select(BodyMeasurement.date, BodyMeasurement.waist_cm)
+        .where(BodyMeasurement.user_id == USER_ID, BodyMeasurement.waist_cm.is_not(None))
+        .order_by(BodyMeasurement.date.desc()),
+        UQ_BODY_MEASUREMENTS_USER_DATE, False,
+    ),
+    (
+        "GET /goals",
+        GOALS_NEWEST_FIRST.apply(select(Goal).where(Goal.user_id == USER_ID), _second_page(GOALS_NEWEST_FIRST, id=500)),
+        ("ix_goals_user_by_id",), False,
+    ),
+    (
+        "GET /plans",
+        PLANS_NEWEST_FIRST.apply(
+            select(WorkoutPlan).where(WorkoutPlan.user_id == USER_ID), _second_page(PLANS_NEWEST_FIRST, id=500)
+        ),
+        ("ix_workout_plans_user_by_id",), False,
+    ),
+    (
+        "GET /exercises (global)",
+        select(Exercise).where(Exercise.owner_id.is_(None)).order_by(Exercise.name),
+        ("ix_exercises_owner_name",), False,
+    ),
+    (
+        "GET /exercises (own)",
+        select(Exercise).where(Exercise.owner_id == USER_ID).order_by(Exercise.name),
+        ("ix_exercises_owner_name",), False,
+    ),
+    (
+        # Two index probes merged by name; the sort only covers one user's catalogue
+        "GET /exercises",
+        EXERCISES_BY_NAME.apply(
+            select(Exercise).where((Exercise.owner_id.is_(None)) | (Exercise.owner_id == USER_ID)),
+            _second_page(EXERCISES_BY_NAME, name="Global 010", id=11),
+        ),
+        ("ix_exercises_owner_name",), True,
+    ),
+    (
+        "GET /admin/users",
+        USERS_BY_ID.apply(select(User), _second_page(USERS_BY_ID, id=5)),
+        ("PRIMARY KEY", "INTEGER PRIMARY KEY"), False,
+    ),
+    (
+        "DELETE /exercises in-use check",
+        select(func.count()).select_from(WorkoutPlanExercise).where(WorkoutPlanExercise.exercise_id == 1),
+        ("ix_workout_plan_exercises_exercise_id",), False,
+    ),
+    (
+        "plan day exercises",
+        select(WorkoutPlanExercise)
+        .where(WorkoutPlanExercise.plan_day_id == 1)
+        .order_by(WorkoutPlanExercise.order),
+        ("ix_workout_plan_exercises_day_order",), False,
+    ),
+    (
+        "email outbox claim",
+        select(EmailOutbox)
+        .where(text(EMAIL_OUTBOX_UNDELIVERED), EmailOutbox.next_attempt_at <= datetime(2026, 1, 1))
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id),
+        ("ix_email_outbox_due",), False,
+    ),
+]
+
+
+def _load(engine, users: int, rows: int) -> None:
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": u, "username": f"u{u}", "hashed_password": "x", "is_admin": False} for u in range(1, users + 1)
+        ])
+        conn.execute(Exercise.__table__.insert(), [
+            {"name": f"Global {i:03d}", "owner_id": None} for i in range(rows)
+        ] + [
+            {"name": f"Custom {i:03d}", "owner_id": u} for u in range(1, users + 1) for i in range(rows // 10 or 1)
+        ])
+        for u in range(1, users + 1):
+            conn.execute(MetricEntry.__table__.insert(), [
+                {"user_id": u, "metric_type": t, "date": DAY - timedelta(days=i), "value": {"value": 1.0}}
+                for t in ("weight", "muscle_index") for i in range(rows)
+            ])
+            first_id = conn.execute(select(func.coalesce(func.max(MetricEntry.id), 0))).scalar() + 1
+            conn.execute(MetricEntry.__table__.insert(), [
+                {"user_id": u, "metric_type": "body_measurements", "date": DAY - timedelta(days=i), "value": {}}
+                for i in range(rows)
+            ])
+            conn.execute(BodyMeasurement.__table__.insert(), [
+                {"metric_entry_id": first_id + i, "user_id": u, "date": DAY - timedelta(days=i),
+                 "waist_cm": 80.0 if i % 2 else None} for i in range(rows)
+            ])
+            conn.execute(Goal.__table__.insert(), [
+                {"user_id": u, "title": f"goal {i}", "created_at": now - timedelta(days=i)} for i in range(rows // 5 or 1)
+            ])
+            conn.execute(WorkoutPlan.__table__.insert(), [
+                {"user_id": u, "name": f"plan {i}", "duration_value": 4, "duration_unit": "weeks",
+                 "created_at": now - timedelta(days=i)} for i in range(rows // 10 or 1)
+            ])
+        conn.execute(WorkoutPlanDay.__table__.insert(), [{"plan_id": p, "day_number": 1} for p in range(1, 11)])
+        conn.execute(WorkoutPlanExercise.__table__.insert(), [
+            {"plan_day_id": d, "exercise_id": (d * 7 + i) % rows + 1, "order": i + 1}
+            for d in range(1, 11) for i in range(5)
+        ])
+        conn.execute(EmailOutbox.__table__.insert(), [
+            {"to_email": "a@example.com", "subject": "s", "html": "h",
+             "status": "sent" if i % 10 else "pending", "next_attempt_at": now - timedelta(minutes=i)}
+            for i in range(rows * 10)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _plan(conn, stmt) -> list:
+    compiled = stmt.compile(conn, compile_kwargs={"render_postcompile": True})
+    params = tuple(
+        v.isoformat(sep=" ") if isinstance(v, datetime) else v.isoformat() if isinstance(v, date) else v
+        for v in (compiled.params[k] for k in compiled.positiontup)
+    )
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [r[-1] for r in rows]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=50, help="Rows per user per table")
+    parser.add_argument("--verbose", action="store_true", help="Print the full plan for every query")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fit-explain-"), "explain.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    _load(engine, args.users, args.rows)
+
+    failures = 0
+    with engine.connect() as conn:
+        for label, stmt, expected, sort_ok in HOT_QUERIES:
+            plan = _plan(conn, stmt)
+            uses_index = any(name in step for step in plan for name in expected)
+            temp_sort = any("USE TEMP B-TREE" in step for step in plan)
+            ok = uses_index and (sort_ok or not temp_sort)
+            failures += not ok
+            print(f"{'ok' if ok else 'FAIL':<5}{label:<42}{expected[0]}")
+            if args.verbose or not ok:
+                for step in plan:
+                    print(f"       {step}")
+    engine.dispose()
+
+    print(f"\n{len(HOT_QUERIES) - failures}/{len(HOT_QUERIES)} hot queries use their index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
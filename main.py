@@ -1,29 +1,48 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_redoc_html
 from fastapi.responses import HTMLResponse, JSONResponse
-from app.database import engine, Base, SessionLocal
-from app.models import User, Weight, MetricEntry  # Import models so tables are created
+from sqlalchemy import text
+from app.database import engine, async_engine, async_pool_monitor, sync_pool_monitor, pool_keepalive, sqlite_maintenance
+from app.db_init import init_db
+from app.db_resilience import RetryingSession, warm_up_pools
+from app.sql_instrumentation import check_repeats, server_timing, track_queries
 from app.routers import auth, weights, profile, metrics, admin, plans, goals
-from app.seed_exercises import seed_global_exercises
 from app.config import settings
-from app.mcp_server import mcp
+from app.mcp_mount import LazyMCPApp
+from app.hashing import password_hasher
+from app.email_outbox import email_dispatcher
+from app.series_blocks import install_series_block_sync
+from app.sharding import shard_router
+from app.pagination import NEXT_CURSOR_HEADER
 
-# Create database tables (must import models first)
-Base.metadata.create_all(bind=engine)
-# Seed global exercises if table is empty
-db = SessionLocal()
-try:
-    seed_global_exercises(db)
-finally:
-    db.close()
+mcp_app = LazyMCPApp()
+
+if settings.series_blocks_enabled:
+    install_series_block_sync(RetryingSession)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with mcp.session_manager.run():
-        yield
+    # Create missing tables and seed global exercises; disable when deploys run `python -m app.cli init-db`
+    if settings.db_init_on_startup:
+        await asyncio.to_thread(init_db)
+    await warm_up_pools(engine, async_engine, settings.db_pool_warmup_connections)
+    pool_keepalive.start()
+    sqlite_maintenance.start()
+    email_dispatcher.start()
+    yield
+    await mcp_app.aclose()
+    await email_dispatcher.stop()
+    await pool_keepalive.stop()
+    await sqlite_maintenance.stop()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    if shard_router is not None:
+        await shard_router.dispose()
 
 
 app = FastAPI(
@@ -47,6 +66,19 @@ async def mcp_auth_middleware(request: Request, call_next):
             return JSONResponse({"error": "Unauthorized"}, status_code=401)
     return await call_next(request)
 
+
+# SQL statement count/time per request -> Server-Timing header; warns on N+1 patterns (tests assert on the warning)
+@app.middleware("http")
+async def sql_instrumentation_middleware(request: Request, call_next):
+    if not settings.sql_instrumentation_enabled:
+        return await call_next(request)
+    start = time.perf_counter()
+    with track_queries() as stats:
+        response = await call_next(request)
+    response.headers["Server-Timing"] = server_timing(stats, (time.perf_counter() - start) * 1000)
+    check_repeats(stats, settings.sql_repeat_warning_threshold, f"{request.method} {request.url.path}")
+    return response
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -54,6 +86,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -88,9 +121,37 @@ async def health_check():
     return {"status": "healthy"}
 
 
+READINESS_DB_TIMEOUT_SECONDS = 2.0
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 when the database is unreachable or the API connection pool is saturated."""
+    saturation = async_pool_monitor.saturation()
+    database = "ok"
+    if saturation >= settings.db_ready_max_pool_saturation:
+        database = "skipped: pool saturated"
+    else:
+        try:
+            async with asyncio.timeout(READINESS_DB_TIMEOUT_SECONDS):
+                async with async_engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            database = f"error: {type(e).__name__}"
+
+    ready = database == "ok"
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "database": database,
+        "pool": {"async": async_pool_monitor.stats(), "sync": sync_pool_monitor.stats()},
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 # Mount MCP server — agents connect at /mcp/mcp (streamable HTTP)
 # Auth: Authorization: Bearer <MCP_API_KEY>  or  X-API-Key: <MCP_API_KEY>
-app.mount("/mcp", mcp.streamable_http_app())
+# The MCP SDK is imported on the first authenticated /mcp request (see app/mcp_mount.py)
+app.mount("/mcp", mcp_app)
 
 
 @app.get("/reset-password", response_class=HTMLResponse)
@@ -0,0 +1,73 @@
+"""Shared fixtures. Run with `python -m pytest -q` from the repository root.
+
+Settings and engines are built when app modules are imported, so the environment is pointed at a
+throwaway SQLite database here, before any test module imports the app.
+"""
+import logging
+import os
+import shutil
+import tempfile
+from itertools import count
+
+_tmp = tempfile.mkdtemp(prefix="fit-tracker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/primary.db"
+os.environ.setdefault("EMAIL_TRANSPORT", "fake")
+for name in ("DATABASE_READ_URL", "SHARD_DATABASE_URLS"):
+    os.environ.pop(name, None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.auth import create_access_token  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.db_init import init_db  # noqa: E402
+from app.models import User  # noqa: E402
+
+_usernames = count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    init_db()
+    yield
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+@pytest.fixture
+def tmp_sqlite_url(tmp_path):
+    """URL factory for extra SQLite files (replicas, shards), removed after the test."""
+    def make(name: str) -> str:
+        return f"sqlite:///{tmp_path / name}.db"
+    return make
+
+
+@pytest.fixture
+def client():
+    import main
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def make_user():
+    """Create a user in the shared database. Returns (user_id, auth headers)."""
+    def make(is_admin: bool = False) -> tuple:
+        with SessionLocal() as db:
+            user = User(username=f"user{next(_usernames)}", hashed_password="!", is_admin=is_admin)
+            db.add(user)
+            db.commit()
+            token = create_access_token(data={"sub": user.username, "user_id": user.id})
+            return user.id, {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def strict_queries(caplog):
+    """Fail the test if any request it makes repeats a statement shape past
+    `sql_repeat_warning_threshold` (the instrumentation middleware only logs a warning)."""
+    caplog.set_level(logging.WARNING, logger="app.sql_instrumentation")
+
+    def repeated() -> list:
+        return [r.getMessage() for r in caplog.records if r.name == "app.sql_instrumentation"]
+
+    yield repeated
+    assert not repeated(), "\n".join(repeated())
@@ -0,0 +1,74 @@
+import threading
+from datetime import date
+
+from app.database import SessionLocal
+from app.metric_upsert import upsert_metric_entries
+
+
+def _batch(client, headers, items) -> dict:
+    response = client.post("/api/v1/metrics/batch", json=items, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_batch_reports_a_status_per_item(make_user, client):
+    _, headers = make_user()
+    assert client.post(
+        "/api/v1/metrics", json={"metric_type": "weight", "date": "2024-01-01", "value": {"kg": 80}}, headers=headers
+    ).status_code == 201
+
+    report = _batch(client, headers, [
+        {"metric_type": "weight", "date": "2024-01-01", "value": {"kg": 81}},
+        {"metric_type": "weight", "date": "2024-01-02", "value": {"kg": 82}},
+        {"metric_type": "body_measurements", "date": "2024-01-02", "value": {"waist_cm": 85}},
+        {"metric_type": "weight", "date": "01/03/2024", "value": {"kg": 83}},
+        {"metric_type": "weight", "date": "2024-01-02", "value": {"kg": 84}},
+        {"metric_type": "weight", "date": "2024-01-04", "value": {"kg": -1}},
+        {"metric_type": "steps", "date": "2024-01-05", "value": {}},
+    ])
+    assert [item["status"] for item in report["items"]] == [
+        "updated", "inserted", "inserted", "rejected", "rejected", "rejected", "rejected",
+    ]
+    assert (report["total"], report["inserted"], report["updated"], report["rejected"]) == (7, 2, 1, 4)
+    assert report["items"][3]["error"] == "Invalid date format. Use YYYY-MM-DD."
+    assert report["items"][4]["error"] == "Duplicate weight entry for 2024-01-02 in batch"
+    assert report["items"][5]["error"].startswith("value.kg: ")
+
+    # Sending the written items again updates every one of them
+    again = _batch(client, headers, [
+        {"metric_type": "weight", "date": "2024-01-01", "value": {"kg": 81}},
+        {"metric_type": "weight", "date": "2024-01-02", "value": {"kg": 82}},
+        {"metric_type": "body_measurements", "date": "2024-01-02", "value": {"waist_cm": 86}},
+    ])
+    assert [item["status"] for item in again["items"]] == ["updated"] * 3
+    assert [item["id"] for item in again["items"]] == [item["id"] for item in report["items"][:3]]
+
+    metrics = client.get("/api/v1/metrics", headers=headers).json()
+    values = {(m["metric_type"], m["date"]): m["value"] for m in metrics}
+    assert values[("weight", "2024-01-01")]["kg"] == 81
+    assert values[("body_measurements", "2024-01-02")]["waist_cm"] == 86
+
+
+def test_concurrent_upserts_of_one_day_report_a_single_insert(make_user):
+    user_id, _ = make_user()
+    writers = 4
+    barrier, created, errors = threading.Barrier(writers), [], []
+
+    def write(kg: float):
+        try:
+            with SessionLocal() as db:
+                barrier.wait()
+                rows = [{"metric_type": "weight", "date": date(2024, 2, 1), "value": {"kg": kg}, "source": "device"}]
+                [(_, was_created)] = upsert_metric_entries(db, user_id, rows)
+                db.commit()
+                created.append(was_created)
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(70.0 + i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert sorted(created) == [False] * (writers - 1) + [True]
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import dependencies, read_routing
+from app.cache import TTLCache
+from app.database import Base, SessionLocal, create_engines
+from app.db_resilience import RetryingSession
+from app.dependencies import CurrentUser, get_async_read_db, get_read_db
+from app.models import Goal, MetricEntry
+from app.pool_monitor import PoolMonitor
+
+PIN_SECONDS = 0.3
+
+
+@pytest.fixture
+def replica(monkeypatch, tmp_sqlite_url):
+    """A second SQLite file as DATABASE_READ_URL. Nothing replicates into it, so a row written to only
+    one of the two databases shows which one a request read."""
+    url = tmp_sqlite_url("replica")
+    engine, async_engine = create_engines(url, PoolMonitor("test_read"), PoolMonitor("test_read_async"))
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(read_routing, "database_read_url", url)
+    monkeypatch.setattr(read_routing, "write_pins", TTLCache(ttl=PIN_SECONDS))
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RetryingSession)
+    monkeypatch.setattr(dependencies, "ReadSessionLocal", factory)
+    monkeypatch.setattr(dependencies, "AsyncReadSessionLocal", async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False, sync_session_class=RetryingSession
+    ))
+    yield factory
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+def _principal(user_id: int) -> CurrentUser:
+    return CurrentUser(id=user_id, username=f"user{user_id}", email=None, is_admin=False)
+
+
+def _read_database(user_id: int) -> str:
+    gen = get_read_db(_principal(user_id))
+    db = next(gen)
+    try:
+        return db.get_bind().url.database
+    finally:
+        gen.close()
+
+
+async def _async_read_database(user_id: int) -> str:
+    gen = get_async_read_db(_principal(user_id))
+    db = await gen.__anext__()
+    try:
+        return db.get_bind().url.database
+    finally:
+        await gen.aclose()
+
+
+def _titles(client, headers) -> list:
+    response = client.get("/api/v1/goals", headers=headers)
+    assert response.status_code == 200
+    return [goal["title"] for goal in response.json()]
+
+
+def test_read_dependencies_use_replica_until_user_writes(replica, make_user):
+    user_id, _ = make_user()
+    replica_path = replica.kw["bind"].url.database
+    assert _read_database(user_id) == replica_path
+    assert asyncio.run(_async_read_database(user_id)) == replica_path
+
+    with SessionLocal() as db:
+        db.info["user_id"] = user_id
+        db.add(Goal(user_id=user_id, title="Run 5k"))
+        db.commit()
+
+    primary_path = SessionLocal.kw["bind"].url.database
+    assert _read_database(user_id) == primary_path
+    assert asyncio.run(_async_read_database(user_id)) == primary_path
+    # Only the writer is pinned
+    other_id, _ = make_user()
+    assert _read_database(other_id) == replica_path
+
+
+def test_commit_without_writes_does_not_pin(replica, make_user):
+    user_id, _ = make_user()
+    with SessionLocal() as db:
+        db.info["user_id"] = user_id
+        db.get(Goal, 1)
+        db.commit()
+    assert read_routing.write_pins.get(user_id) is None
+
+
+def test_write_pins_user_to_primary_until_pin_expires(replica, make_user, client):
+    user_id, headers = make_user()
+    with replica() as db:
+        db.add(Goal(user_id=user_id, title="on replica"))
+        db.commit()
+
+    assert _titles(client, headers) == ["on replica"]
+
+    response = client.post("/api/v1/goals", json={"title": "on primary"}, headers=headers)
+    assert response.status_code == 201
+    # Read-your-writes: the goal just created is visible although the replica never received it
+    assert _titles(client, headers) == ["on primary"]
+
+    time.sleep(PIN_SECONDS + 0.1)
+    assert _titles(client, headers) == ["on replica"]
+
+
+def test_async_handlers_follow_the_same_pin(replica, make_user, client):
+    user_id, headers = make_user()
+    with replica() as db:
+        db.add(MetricEntry(user_id=user_id, metric_type="weight", date=date(2024, 1, 1), value={"kg": 70.0}))
+        db.commit()
+
+    def weights() -> list:
+        response = client.get("/api/v1/weights", headers=headers)
+        assert response.status_code == 200
+        return [w["weight"] for w in response.json()]
+
+    assert weights() == [70.0]
+    response = client.post("/api/v1/weights", json={"weight": 80.0, "date": "2024-01-02"}, headers=headers)
+    assert response.status_code == 201
+    assert weights() == [80.0]
+    time.sleep(PIN_SECONDS + 0.1)
+    assert weights() == [70.0]
@@ -0,0 +1,204 @@
+import asyncio
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+import main
+from app import account_deletion, db_init, dependencies, sharding
+from app.account_deletion import delete_account
+from app.database import Base, SessionLocal
+from app.models import Exercise, Goal, MetricEntry, RefreshToken, User, UserShard
+from app.routers import admin
+from app.seed_exercises import seed_global_exercises
+from app.sharding import ShardRouter, hash_shard
+
+SHARDS = 3
+
+
+@pytest.fixture
+def make_router(monkeypatch, tmp_sqlite_url):
+    """Build a ShardRouter over fresh SQLite files and install it wherever `shard_router` is imported."""
+    routers = []
+
+    def make(strategy: str = "hash") -> ShardRouter:
+        router = ShardRouter([tmp_sqlite_url(f"{strategy}{i}") for i in range(SHARDS)], strategy)
+        for engine in router.engines:
+            Base.metadata.create_all(bind=engine)
+        for db in router.all_sessions():
+            with db:
+                seed_global_exercises(db)
+        for module in (sharding, dependencies, account_deletion, admin, db_init, main):
+            monkeypatch.setattr(module, "shard_router", router)
+        # Loaded on the first MCP request only
+        if "app.mcp_server" in sys.modules:
+            monkeypatch.setattr(sys.modules["app.mcp_server"], "shard_router", router)
+        routers.append(router)
+        return router
+
+    yield make
+    for router in routers:
+        asyncio.run(router.dispose())
+
+
+def _count(db, model, **where) -> int:
+    return db.execute(select(func.count()).select_from(model).filter_by(**where)).scalar_one()
+
+
+def _users_on_distinct_shards(make_user, router: ShardRouter, n: int = 2) -> list:
+    """(user_id, headers) for `n` users that hash to different shards."""
+    found = {}
+    while len(found) < n:
+        user_id, headers = make_user()
+        found.setdefault(router.shard_for(user_id), (user_id, headers))
+    return list(found.values())
+
+
+def test_hash_placement_is_stable_and_spreads_users():
+    # crc32 of the decimal id: these must never change, or existing users lose their data
+    assert [hash_shard(user_id, SHARDS) for user_id in (1, 2, 3, 42, 1000)] == [2, 1, 1, 2, 0]
+    assert {hash_shard(user_id, SHARDS) for user_id in range(1, 31)} == set(range(SHARDS))
+
+
+def test_hash_strategy_needs_no_directory(make_router, make_user):
+    router = make_router("hash")
+    user_id, _ = make_user()
+    assert router.shard_for(user_id) == asyncio.run(router.ashard_for(user_id)) == hash_shard(user_id, SHARDS)
+    with SessionLocal() as db:
+        assert _count(db, UserShard, user_id=user_id) == 0
+
+
+def test_directory_assigns_by_hash_then_honours_edits(make_router, make_user):
+    router = make_router("directory")
+    user_id, _ = make_user()
+    assert router.shard_for(user_id) == hash_shard(user_id, SHARDS)
+    with SessionLocal() as db:
+        entry = db.get(UserShard, user_id)
+        assert entry.shard == hash_shard(user_id, SHARDS)
+        moved = (entry.shard + 1) % SHARDS
+        entry.shard = moved
+        db.commit()
+
+    # Cached until forgotten
+    assert router.shard_for(user_id) == hash_shard(user_id, SHARDS)
+    router.forget(user_id)
+    assert router.shard_for(user_id) == moved
+    router.forget(user_id)
+    assert asyncio.run(router.ashard_for(user_id)) == moved
+
+
+def test_concurrent_first_lookups_agree_on_one_directory_row(make_router, make_user):
+    router = make_router("directory")
+    user_id, _ = make_user()
+    barrier, results = threading.Barrier(8), []
+
+    def lookup():
+        barrier.wait()
+        results.append(router.shard_for(user_id))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [hash_shard(user_id, SHARDS)] * 8
+    with SessionLocal() as db:
+        assert _count(db, UserShard, user_id=user_id) == 1
+
+
+def test_user_data_and_stub_row_live_on_the_users_shard(make_router, make_user, client):
+    router = make_router("hash")
+    user_id, headers = make_user()
+    index = router.shard_for(user_id)
+
+    response = client.post("/api/v1/goals", json={"title": "Squat 100kg"}, headers=headers)
+    assert response.status_code == 201
+    response = client.post("/api/v1/weights", json={"weight": 80.0, "date": "2024-01-01"}, headers=headers)
+    assert response.status_code == 201
+    assert [g["title"] for g in client.get("/api/v1/goals", headers=headers).json()] == ["Squat 100kg"]
+    assert [w["weight"] for w in client.get("/api/v1/weights", headers=headers).json()] == [80.0]
+
+    for i, db in enumerate(router.all_sessions()):
+        with db:
+            on_shard = i == index
+            assert _count(db, Goal, user_id=user_id) == on_shard
+            assert _count(db, MetricEntry, user_id=user_id) == on_shard
+            stub = db.get(User, user_id)
+            assert (stub is not None) == on_shard
+            if on_shard:
+                # Just enough of a users row for foreign keys; it can never be logged in to
+                with SessionLocal() as shared:
+                    assert stub.username == shared.get(User, user_id).username
+                assert stub.hashed_password == "!"
+                assert stub.email is None
+            # Every shard has its own copy of the global catalogue
+            assert _count(db, Exercise, owner_id=None) > 0
+    with SessionLocal() as db:
+        assert _count(db, Goal, user_id=user_id) == 0
+        assert _count(db, MetricEntry, user_id=user_id) == 0
+
+
+def test_admin_lists_users_from_the_shared_database(make_router, make_user, client):
+    router = make_router("hash")
+    admin_id, admin_headers = make_user(is_admin=True)
+    users = _users_on_distinct_shards(make_user, router, SHARDS)
+    with SessionLocal() as db:
+        for user_id, _ in users:
+            db.get(User, user_id).email = f"{user_id}@example.com"
+        db.commit()
+    for _, headers in users:
+        assert client.post("/api/v1/goals", json={"title": "Goal"}, headers=headers).status_code == 201
+
+    response = client.get("/api/v1/admin/users", headers=admin_headers)
+    assert response.status_code == 200
+    listed = {u["id"]: u for u in response.json()}
+    for user_id, _ in users:
+        # The full profile from the shared database, once, not the shard's stub
+        assert listed[user_id]["email"] == f"{user_id}@example.com"
+    assert len(response.json()) == len(listed)
+
+    sharding_stats = client.get("/api/v1/admin/stats", headers=admin_headers).json()["sharding"]
+    assert sharding_stats["shards"] == SHARDS
+    assert all(n > 0 for n in sharding_stats["routed"])
+
+
+def test_delete_account_sweeps_every_shard(make_router, make_user, client):
+    router = make_router("directory")
+    user_id, headers = make_user()
+    keep_id, keep_headers = make_user()
+    for h in (headers, keep_headers):
+        assert client.post("/api/v1/goals", json={"title": "Goal"}, headers=h).status_code == 201
+        assert client.post("/api/v1/weights", json={"weight": 80.0, "date": "2024-01-01"}, headers=h).status_code == 201
+
+    # Leftovers on another shard, as after moving the user in the directory
+    home = router.shard_for(user_id)
+    other = router.all_sessions()[(home + 1) % SHARDS]
+    with other:
+        other.add(User(id=user_id, username="moved", hashed_password="!"))
+        other.add(Goal(user_id=user_id, title="Old goal"))
+        other.commit()
+    with SessionLocal() as db:
+        db.add(RefreshToken(user_id=user_id, token_hash=f"hash-{user_id}", expires_at=datetime.utcnow() + timedelta(days=1)))
+        db.commit()
+
+    deleted = delete_account(user_id, batch_size=1)
+    assert deleted["goals"] == 2
+    assert deleted["metric_entries"] == 1
+    assert deleted["refresh_tokens"] == 1
+    assert deleted["user_shards"] == 1
+    assert deleted["users"] == 1
+
+    for db in router.all_sessions():
+        with db:
+            for model in (Goal, MetricEntry):
+                assert _count(db, model, user_id=user_id) == 0
+            assert db.get(User, user_id) is None
+    with SessionLocal() as db:
+        assert db.get(User, user_id) is None
+        assert _count(db, UserShard, user_id=user_id) == 0
+        assert _count(db, RefreshToken, user_id=user_id) == 0
+
+    # Other users are untouched
+    assert [g["title"] for g in client.get("/api/v1/goals", headers=keep_headers).json()] == ["Goal"]
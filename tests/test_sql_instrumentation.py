@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+import main
+from app.config import settings
+from app.database import SessionLocal
+from app.models import MetricEntry
+from app.sql_instrumentation import statement_shape
+
+BODY_MEASUREMENTS = "body_measurements"
+
+
+def _history(user_id: int, eager: bool) -> list:
+    query = select(MetricEntry).where(MetricEntry.user_id == user_id, MetricEntry.metric_type == BODY_MEASUREMENTS)
+    if eager:
+        query = query.options(selectinload(MetricEntry.body_measurement))
+    with SessionLocal() as db:
+        return [entry.value for entry in db.execute(query).scalars().all()]
+
+
+def _app() -> TestClient:
+    app = FastAPI()
+    app.middleware("http")(main.sql_instrumentation_middleware)
+
+    @app.get("/lazy/{user_id}")
+    def lazy(user_id: int):
+        return _history(user_id, eager=False)
+
+    @app.get("/eager/{user_id}")
+    def eager(user_id: int):
+        return _history(user_id, eager=True)
+
+    return TestClient(app)
+
+
+def test_statement_shape_collapses_whitespace_and_in_lists():
+    assert statement_shape("SELECT a\n  FROM t WHERE id IN (?, ?, ?)") == "SELECT a FROM t WHERE id IN (...)"
+    assert statement_shape("SELECT a FROM t WHERE id IN (?)") == "SELECT a FROM t WHERE id IN (?)"
+
+
+def test_lazy_loop_trips_strict_queries_and_eager_load_does_not(make_user, strict_queries, caplog):
+    user_id, _ = make_user()
+    start = date(2024, 1, 1)
+    with SessionLocal() as db:
+        db.add_all(
+            MetricEntry(user_id=user_id, metric_type=BODY_MEASUREMENTS, date=start + timedelta(days=i), value={"waist_cm": 80 + i})
+            for i in range(settings.sql_repeat_warning_threshold + 2)
+        )
+        db.commit()
+    client = _app()
+
+    response = client.get(f"/eager/{user_id}")
+    assert response.status_code == 200
+    assert len(response.json()) == settings.sql_repeat_warning_threshold + 2
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]
+    assert strict_queries() == []
+
+    # The request still succeeds; only the warning the fixture fails on is logged
+    response = client.get(f"/lazy/{user_id}")
+    assert response.status_code == 200
+    assert response.json()[0]["waist_cm"] == 80
+    [warning] = strict_queries()
+    assert f"GET /lazy/{user_id}: statement repeated {settings.sql_repeat_warning_threshold + 2} times" in warning
+    assert "SELECT body_measurements." in warning
+    caplog.clear()